@@ -0,0 +1,66 @@
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.1) -> List[Dict]:
+    """
+    Compare throughput of every (document size, stage) of two benchmark results
+
+    Args:
+        baseline (Dict): results of `benchmarks.run` to compare against
+        current (Dict): results of `benchmarks.run` to be checked
+        threshold (float, optional): relative throughput drop reported as a regression. Defaults to 0.1.
+
+    Returns:
+        List[Dict]: throughput of both results, their ratio and whether it is a regression, for each
+            (document size, stage) measured by both
+
+    """
+    baseline_results = {result["sentences"]: result["stages"] for result in baseline["results"]}
+
+    rows = []
+    for result in current["results"]:
+        if result["sentences"] not in baseline_results:
+            continue
+
+        for stage, measurement in result["stages"].items():
+            before = baseline_results[result["sentences"]].get(stage, {}).get("pairs_per_sec")
+            after = measurement["pairs_per_sec"]
+            if not before or not after:
+                continue
+
+            rows.append({
+                "sentences": result["sentences"],
+                "stage": stage,
+                "baseline": before,
+                "current": after,
+                "ratio": after / before,
+                "regression": after / before < 1 - threshold,
+            })
+
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare throughput of two benchmark results")
+    parser.add_argument("baseline", help="path of the baseline JSON results")
+    parser.add_argument("current", help="path of the current JSON results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative throughput drop failing the check")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as baseline, open(args.current, encoding="utf-8") as current:
+        rows = compare(json.load(baseline), json.load(current), args.threshold)
+
+    for row in rows:
+        print("{sentences:>6} {stage:<14} {baseline:>10.2f} {current:>10.2f} {ratio:>6.2f}{flag}".format(
+            **row,
+            flag="  REGRESSION" if row["regression"] else "",
+        ))
+
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
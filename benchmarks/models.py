@@ -0,0 +1,190 @@
+import json
+import os
+from typing import Dict
+
+import torch
+
+# small vocabulary covering the synthetic documents of `benchmarks.run`, so that tokenizers can be trained offline
+CORPUS = [
+    "Lionel Andres Messi (born 24 June 1987) is an Argentine professional footballer who plays as a forward "
+    "and captains both Spanish club Barcelona and the Argentina national team.",
+    "Often considered as the best player in the world, Messi has won a record six Ballon d'Or awards.",
+    "answer: context: question: who what when where why how is was the a of in and",
+]
+
+NER_LABELS = [
+    "O",
+    "B-PERSON",
+    "I-PERSON",
+    "B-ORG",
+    "I-ORG",
+    "B-DATE",
+    "I-DATE",
+    "B-GPE",
+    "I-GPE",
+    "B-CARDINAL",
+    "I-CARDINAL",
+]
+REL_LABELS = [
+    "no_relation",
+    "per:origin",
+    "per:employee_of",
+    "per:date_of_birth",
+    "org:country_of_headquarters",
+    "org:top_members/employees",
+    "per:countries_of_residence",
+]
+
+# layer used by BERTScore for the tiny encoder (`bert_score` only knows layers of hub models)
+BERT_SCORE_LAYERS = 2
+
+
+def build_models(out_dir: str, hidden_size: int = 32, num_layers: int = 2, seed: int = 0) -> Dict[str, str]:
+    """
+    Build tiny randomly initialized checkpoints of every model FactSumm uses, so that benchmarks run without network
+
+    Checkpoints which were already built are reused.
+
+    Args:
+        out_dir (str): directory checkpoints are saved to
+        hidden_size (int, optional): hidden size of every model. Defaults to 32.
+        num_layers (int, optional): number of layers of every model. Defaults to 2.
+        seed (int, optional): seed of random weights. Defaults to 0.
+
+    Returns:
+        Dict[str, str]: path of the NER, RE, QG, QA and BERTScore checkpoints (FactSumm argument names)
+
+    """
+    paths = {
+        "ner_model": os.path.join(out_dir, "ner"),
+        "rel_model": os.path.join(out_dir, "rel"),
+        "qg_model": os.path.join(out_dir, "qg"),
+        "qa_model": os.path.join(out_dir, "qa"),
+        "bert_score_model": os.path.join(out_dir, "bert_score"),
+    }
+    if all(os.path.exists(os.path.join(path, "config.json")) for path in paths.values()):
+        return paths
+
+    import sentencepiece as spm
+    from tokenizers import ByteLevelBPETokenizer
+    from transformers import (
+        LukeConfig,
+        LukeForEntityPairClassification,
+        LukeTokenizer,
+        RobertaConfig,
+        RobertaForQuestionAnswering,
+        RobertaForTokenClassification,
+        RobertaModel,
+        RobertaTokenizer,
+        RobertaTokenizerFast,
+        T5Config,
+        T5ForConditionalGeneration,
+        T5Tokenizer,
+    )
+
+    os.makedirs(out_dir, exist_ok=True)
+    torch.manual_seed(seed)
+
+    corpus_path = os.path.join(out_dir, "corpus.txt")
+    with open(corpus_path, "w", encoding="utf-8") as corpus_file:
+        corpus_file.write("\n".join(CORPUS * 20))
+
+    # byte-level BPE vocabulary shared by RoBERTa-based models and LUKE
+    bpe_dir = os.path.join(out_dir, "bpe")
+    os.makedirs(bpe_dir, exist_ok=True)
+    bpe = ByteLevelBPETokenizer()
+    bpe.train(
+        [corpus_path],
+        vocab_size=400,
+        min_frequency=1,
+        special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"],
+    )
+    bpe.save_model(bpe_dir)
+
+    vocab_path = os.path.join(bpe_dir, "vocab.json")
+    merges_path = os.path.join(bpe_dir, "merges.txt")
+    tokenizer = RobertaTokenizerFast(vocab_path, merges_path)
+
+    config = dict(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=2,
+        intermediate_size=2 * hidden_size,
+        max_position_embeddings=520,
+    )
+
+    ner = RobertaForTokenClassification(
+        RobertaConfig(
+            **config,
+            id2label=dict(enumerate(NER_LABELS)),
+            label2id={label: i for i, label in enumerate(NER_LABELS)},
+        ))
+    ner.save_pretrained(paths["ner_model"])
+    tokenizer.save_pretrained(paths["ner_model"])
+
+    qa = RobertaForQuestionAnswering(RobertaConfig(**config))
+    qa.save_pretrained(paths["qa_model"])
+    tokenizer.save_pretrained(paths["qa_model"])
+
+    # BERTScore loads slow tokenizers
+    bert_score = RobertaModel(RobertaConfig(**config))
+    bert_score.save_pretrained(paths["bert_score_model"])
+    RobertaTokenizer(vocab_path, merges_path).save_pretrained(paths["bert_score_model"])
+
+    entity_vocab_path = os.path.join(bpe_dir, "entity_vocab.json")
+    with open(entity_vocab_path, "w", encoding="utf-8") as entity_vocab_file:
+        json.dump({"[PAD]": 0, "[UNK]": 1, "[MASK]": 2, "[MASK2]": 3}, entity_vocab_file)
+
+    luke_tokenizer = LukeTokenizer(vocab_path, merges_path, entity_vocab_path, task="entity_pair_classification")
+    rel = LukeForEntityPairClassification(
+        LukeConfig(
+            **config,
+            entity_vocab_size=4,
+            entity_emb_size=hidden_size // 2,
+            id2label=dict(enumerate(REL_LABELS)),
+            label2id={label: i for i, label in enumerate(REL_LABELS)},
+        ))
+    rel.resize_token_embeddings(len(luke_tokenizer))
+    rel.save_pretrained(paths["rel_model"])
+    luke_tokenizer.save_pretrained(paths["rel_model"])
+
+    spm_prefix = os.path.join(out_dir, "spiece")
+    spm.SentencePieceTrainer.train(
+        input=corpus_path,
+        model_prefix=spm_prefix,
+        vocab_size=100,
+        pad_id=0,
+        eos_id=1,
+        unk_id=2,
+        bos_id=-1,
+    )
+    t5_tokenizer = T5Tokenizer(f"{spm_prefix}.model", extra_ids=0)
+    qg = T5ForConditionalGeneration(
+        T5Config(
+            vocab_size=len(t5_tokenizer),
+            d_model=hidden_size,
+            d_kv=hidden_size // 2,
+            d_ff=2 * hidden_size,
+            num_layers=num_layers,
+            num_heads=2,
+            decoder_start_token_id=0,
+        ))
+    qg.save_pretrained(paths["qg_model"])
+    t5_tokenizer.save_pretrained(paths["qg_model"])
+
+    return paths
+
+
+def register_bert_score(path: str, num_layers: int = BERT_SCORE_LAYERS):
+    """
+    Let `bert_score` load a local checkpoint by telling it which layer to use
+
+    Args:
+        path (str): path of the BERTScore checkpoint
+        num_layers (int, optional): layer used for token embeddings. Defaults to `BERT_SCORE_LAYERS`.
+
+    """
+    from bert_score import scorer
+
+    scorer.model2layers[path] = num_layers
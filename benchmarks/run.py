@@ -0,0 +1,253 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.models import build_models, register_bert_score
+from factsumm import Document, FactSumm
+from factsumm.utils.utils import Config
+from factsumm.version import __version__
+
+PERSONS = ["Lionel Messi", "Andres Iniesta", "Xavi Hernandez", "Carles Puyol", "Ronaldinho", "Samuel Eto'o"]
+ORGS = ["Barcelona", "Argentina", "Paris Saint-Germain", "Inter Miami", "Real Madrid", "Newell's Old Boys"]
+PLACES = ["Rosario", "Spain", "Paris", "Miami", "Madrid", "Argentina"]
+TEMPLATES = [
+    "{person} joined {org} in {year} after leaving {place}.",
+    "{person} was born on {day} June {year} in {place}.",
+    "{org} signed {person} for {number} million euros in {year}.",
+    "In {year}, {person} won {number} trophies with {org}.",
+    "{person} and {other} played together for {org} in {place}.",
+]
+
+# stages in execution order: each one only relies on artifacts memoized by the previous ones
+STAGES = ("segmentation", "ner", "rel", "qg", "qa", "rouge", "bert_score")
+
+logger = logging.getLogger("benchmarks")
+
+
+class PeakMemory:
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Sample resident set size of the process in the background, to get the peak of a section of code
+
+        Args:
+            interval (float, optional): sampling interval in seconds. Defaults to 0.005.
+
+        """
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def rss() -> int:
+        """
+        Get current resident set size in bytes (peak resident set size if `/proc` is not available)
+
+        Returns:
+            int: resident set size in bytes
+
+        """
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def __enter__(self) -> "PeakMemory":
+        self.peak = self.rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+def make_pairs(num_pairs: int, num_sentences: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Build synthetic (source, summary) pairs, where summaries copy or perturb a few source sentences
+
+    Args:
+        num_pairs (int): number of pairs
+        num_sentences (int): number of sentences of each source
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        List[Tuple[str, str]]: (source, summary) pairs
+
+    """
+    generator = random.Random(seed)
+
+    def sentence():
+        return generator.choice(TEMPLATES).format(
+            person=generator.choice(PERSONS),
+            other=generator.choice(PERSONS),
+            org=generator.choice(ORGS),
+            place=generator.choice(PLACES),
+            year=generator.randint(1990, 2023),
+            day=generator.randint(1, 28),
+            number=generator.randint(2, 90),
+        )
+
+    pairs = []
+    for _ in range(num_pairs):
+        source = [sentence() for _ in range(num_sentences)]
+        summary = generator.sample(source, min(2, num_sentences)) + [sentence()]
+        pairs.append((" ".join(source), " ".join(summary)))
+
+    return pairs
+
+
+def stage_functions(factsumm: FactSumm, device: str) -> Dict[str, Callable[[Document, Document], object]]:
+    return {
+        "segmentation": lambda source, summary: (factsumm._lines(source), factsumm._lines(summary)),
+        "ner": lambda source, summary: factsumm._entities_batch([source, summary], device),
+        "rel": lambda source, summary: factsumm._fact_scores_batch([(source, summary)], device),
+        "qg": lambda source, summary: factsumm._questions_batch([summary], device),
+        "qa": lambda source, summary: factsumm._qa_scores_batch([(source, summary)], device),
+        "rouge": lambda source, summary: factsumm.calculate_rouge(source, summary),
+        "bert_score": lambda source, summary: factsumm._bert_scores_batch([(source, summary)], device),
+    }
+
+
+def run_stages(factsumm: FactSumm, pairs: List[Tuple[str, str]], device: str) -> Dict[str, Dict]:
+    """
+    Run every stage over every pair (stage by stage), measuring throughput, per-pair latency and peak RSS of each stage
+
+    Args:
+        factsumm (FactSumm): warmed up FactSumm object
+        pairs (List[Tuple[str, str]]): (source, summary) pairs
+        device (str): device info
+
+    Returns:
+        Dict[str, Dict]: measurements of each stage
+
+    """
+    documents = [(Document(source), Document(summary)) for source, summary in pairs]
+    functions = stage_functions(factsumm, device)
+
+    results = {}
+    for stage in STAGES:
+        latencies = []
+
+        with PeakMemory() as memory:
+            start = time.perf_counter()
+            for source, summary in documents:
+                pair_start = time.perf_counter()
+                functions[stage](source, summary)
+                latencies.append(time.perf_counter() - pair_start)
+            elapsed = time.perf_counter() - start
+
+        latencies_ms = np.array(latencies) * 1000
+        results[stage] = {
+            "pairs_per_sec": len(documents) / elapsed if elapsed > 0 else None,
+            "latency_ms": {
+                "mean": float(latencies_ms.mean()),
+                "p50": float(np.percentile(latencies_ms, 50)),
+                "p90": float(np.percentile(latencies_ms, 90)),
+                "p99": float(np.percentile(latencies_ms, 99)),
+            },
+            "peak_rss_mb": memory.peak / 2**20,
+        }
+
+    return results
+
+
+def environment() -> Dict:
+    import torch
+    import transformers
+
+    return {
+        "factsumm": __version__,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark every FactSumm stage offline with tiny random models")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="path of the JSON results")
+    parser.add_argument(
+        "--models-dir",
+        default=os.path.join(Config.CACHE_DIR, "benchmarks", "models"),
+        help="directory tiny checkpoints are built in (and reused from)",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64], help="number of sentences per source")
+    parser.add_argument("--pairs", type=int, default=16, help="number of pairs per document size")
+    parser.add_argument("--warmup-pairs", type=int, default=2, help="number of pairs run before measurements")
+    parser.add_argument("--hidden-size", type=int, default=32, help="hidden size of tiny models")
+    parser.add_argument("--num-layers", type=int, default=2, help="number of layers of tiny models")
+    parser.add_argument("--device", default="cpu", help="device info (default: cpu)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of models and documents")
+    parser.add_argument("--low-memory", action="store_true", help="only keep the model of the running stage in memory")
+    parser.add_argument("--weights-cache", action="store_true", help="memory-map weights from the local weights cache")
+    args = parser.parse_args(argv)
+
+    # per-pair scores are logged at INFO level, which would dominate stage timings
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    models = build_models(args.models_dir, args.hidden_size, args.num_layers, args.seed)
+    register_bert_score(models["bert_score_model"], args.num_layers)
+
+    factsumm = FactSumm(**models, low_memory=args.low_memory, weights_cache=args.weights_cache)
+    load_seconds = factsumm.warmup(args.device)
+
+    # first forward passes (allocator growth, lazy kernels) are not measured
+    if args.warmup_pairs > 0:
+        run_stages(factsumm, make_pairs(args.warmup_pairs, min(args.sizes), args.seed + 1), args.device)
+
+    results = []
+    for size in args.sizes:
+        logger.info("Benchmarking %s pairs of %s-sentence sources...", args.pairs, size)
+        pairs = make_pairs(args.pairs, size, args.seed)
+        stages = run_stages(factsumm, pairs, args.device)
+        results.append({"sentences": size, "pairs": args.pairs, "stages": stages})
+
+        for stage, measurement in stages.items():
+            logger.info("%s: %.2f pairs/sec", stage, measurement["pairs_per_sec"] or 0.0)
+
+    report = {
+        "environment": environment(),
+        "config": {
+            "hidden_size": args.hidden_size,
+            "num_layers": args.num_layers,
+            "device": args.device,
+            "seed": args.seed,
+            "low_memory": args.low_memory,
+            "weights_cache": args.weights_cache,
+        },
+        "load_seconds": load_seconds,
+        "results": results,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+
+    logger.info("Results are written to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
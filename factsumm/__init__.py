@@ -1,2 +1,3 @@
 from factsumm.factsumm import FactSumm  # noqa
+from factsumm.utils.document import Document  # noqa
 from factsumm.version import __version__  # noqa
@@ -0,0 +1,3 @@
+from factsumm.cli import main
+
+main()
@@ -0,0 +1,259 @@
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+from factsumm.factsumm import FactSumm
+from factsumm.server import serve
+from factsumm.utils.corpus import FORMATS, Checkpoint, iter_chunks, iter_records
+from factsumm.utils.utils import Config
+
+logger = logging.getLogger("factsumm.cli")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="factsumm",
+        description="FactSumm: Factual Consistency Scorer for Abstractive Summarization",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    score = subparsers.add_parser("score", help="score (source, summary) pairs of a JSONL/CSV/Parquet corpus")
+    score.add_argument("input", help="path of the input corpus")
+    score.add_argument("-o", "--output", required=True, help="path of the JSONL file per-pair results are written to")
+    score.add_argument("--format", choices=FORMATS, default=None, help="input format (inferred from extension by default)")
+    score.add_argument("--source-key", default="source", help="field holding the source (default: source)")
+    score.add_argument("--summary-key", default="summary", help="field holding the summary (default: summary)")
+    score.add_argument("--id-key", default=None, help="field copied to the output to identify each pair")
+    score.add_argument("--chunk-size", type=int, default=64, help="number of pairs scored between checkpoints")
+    score.add_argument("--checkpoint", default=None, help="path of the checkpoint file (default: <output>.ckpt)")
+    score.add_argument("--no-resume", action="store_true", help="ignore existing checkpoint and start over")
+    score.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    score.add_argument("--threads-per-worker", type=int, default=None, help="torch threads of each worker")
+    score.add_argument("--profile", action="store_true", help="add per-stage timings and counters to each result")
+    score.add_argument("--low-memory", action="store_true", help="only keep the model of the running stage in memory")
+    score.add_argument(
+        "--stage-chunk-size",
+        type=int,
+        default=None,
+        help="number of pairs run stage by stage at once (default: pair by pair)",
+    )
+    add_model_arguments(score)
+
+    serve = subparsers.add_parser("serve", help="serve micro-batched scoring over HTTP (TCP or Unix socket)")
+    serve.add_argument("--host", default="127.0.0.1", help="host to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="port to bind (default: 8000)")
+    serve.add_argument("--unix-socket", default=None, help="path of the Unix socket to bind instead of TCP")
+    serve.add_argument("--max-batch-size", type=int, default=16, help="maximum number of pairs per stage batch")
+    serve.add_argument("--max-wait-ms", type=float, default=10.0, help="maximum time a stage waits to fill a batch")
+    serve.add_argument("--max-queue-size", type=int, default=256, help="maximum number of pairs waiting per stage")
+    serve.add_argument("--default-budget-ms", type=float, default=None, help="latency budget of requests without one")
+    add_model_arguments(serve)
+
+    return parser
+
+
+def add_model_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--device", default="cpu", help="device info (default: cpu)")
+    parser.add_argument("--batch-size", type=int, default=32, help="number of inputs per forward pass")
+    parser.add_argument("--ner-model", default=None, help="Named Entity Recognition model")
+    parser.add_argument("--rel-model", default=None, help="Relation Extraction model")
+    parser.add_argument("--qg-model", default=None, help="Question Generation model")
+    parser.add_argument("--qa-model", default=None, help="Question Answering model")
+    parser.add_argument("--bert-score-model", default=None, help="BERTScore model")
+    parser.add_argument("--backend", choices=list(Config.BACKENDS), default="torch", help="NER, RE and QA backend")
+    parser.add_argument("--onnx-threads", type=int, default=None, help="intra-op threads of ONNX Runtime sessions")
+    parser.add_argument(
+        "--precision",
+        choices=list(Config.PRECISIONS),
+        default="fp32",
+        help="precision of PyTorch models (default: fp32)",
+    )
+    parser.add_argument(
+        "--retrieval-top-k",
+        type=int,
+        default=None,
+        help="number of source lines retrieved as QA context and BERTScore candidates (default: whole source)",
+    )
+    parser.add_argument(
+        "--weights-cache",
+        action="store_true",
+        help="memory-map PyTorch weights from a local cache (saved on first load)",
+    )
+    parser.add_argument(
+        "--artifact-store",
+        default=None,
+        help="path of the SQLite file NER, RE, QG and QA outputs are stored in and reused from across runs",
+    )
+    parser.add_argument(
+        "--artifact-store-size-mb",
+        type=float,
+        default=None,
+        help="maximum size of the artifact store, least recently used outputs being evicted (default: unbounded)",
+    )
+    parser.add_argument(
+        "--sentence-cache-size",
+        type=int,
+        default=None,
+        help="number of NER, RE, QG and QA outputs of each stage kept in memory (default: no cache)",
+    )
+    parser.add_argument("--question-budget", type=int, default=None, help="maximum number of questions per summary")
+    parser.add_argument("--question-round-size", type=int, default=4, help="questions per round with a budget")
+    parser.add_argument("--qa-tolerance", type=float, default=0.05, help="QAGS interval half width to stop at")
+    parser.add_argument(
+        "--metrics",
+        nargs="+",
+        choices=list(Config.METRICS),
+        default=None,
+        help="metric families to be calculated (default: all)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="print per-pair logs of every module")
+
+
+def score(args: argparse.Namespace):
+    """
+    Stream corpus records in chunks, write per-pair results incrementally and checkpoint progress
+
+    Args:
+        args (argparse.Namespace): parsed `score` arguments
+
+    """
+    factsumm = FactSumm(
+        ner_model=args.ner_model,
+        rel_model=args.rel_model,
+        qg_model=args.qg_model,
+        qa_model=args.qa_model,
+        bert_score_model=args.bert_score_model,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        profile=args.profile,
+        stage_chunk_size=args.stage_chunk_size,
+        low_memory=args.low_memory,
+        weights_cache=args.weights_cache,
+        artifact_store=args.artifact_store,
+        artifact_store_size_mb=args.artifact_store_size_mb,
+        sentence_cache_size=args.sentence_cache_size,
+        metrics=args.metrics,
+        backend=args.backend,
+        onnx_threads=args.onnx_threads,
+        precision=args.precision,
+        retrieval_top_k=args.retrieval_top_k,
+        question_budget=args.question_budget,
+        question_round_size=args.question_round_size,
+        qa_tolerance=args.qa_tolerance,
+    )
+
+    checkpoint = _load_checkpoint(args)
+    columns = [args.source_key, args.summary_key] + ([args.id_key] if args.id_key is not None else [])
+    records = iter_records(args.input, args.format, checkpoint.processed, columns)
+
+    try:
+        _write_scores(factsumm, args, checkpoint, records)
+
+        if factsumm.sentence_cache is not None:
+            for namespace, stats in factsumm.sentence_cache.stats()["namespaces"].items():
+                logger.info("Sentence cache hit rate of %s: %.2f%%", namespace, stats["hit_rate"] * 100)
+
+        if factsumm.artifact_store is not None:
+            for namespace, stats in factsumm.artifact_store.stats()["namespaces"].items():
+                logger.info("Artifact store hit rate of %s: %.2f%%", namespace, stats["hit_rate"] * 100)
+    finally:
+        factsumm.close()
+
+
+def _load_checkpoint(args: argparse.Namespace) -> Checkpoint:
+    checkpoint = Checkpoint(args.checkpoint if args.checkpoint is not None else f"{args.output}.ckpt")
+
+    if args.no_resume:
+        checkpoint.update(0, 0)
+    elif not checkpoint.verify(args.output):
+        # results of the checkpoint were lost (e.g. output deleted or moved), so they are computed again
+        logger.warning("%s lacks results recorded by the checkpoint, starting over", args.output)
+        checkpoint.update(0, 0)
+
+    if checkpoint.processed > 0:
+        logger.info("Resuming after %s already processed pairs", checkpoint.processed)
+
+    return checkpoint
+
+
+def _write_scores(factsumm: FactSumm, args: argparse.Namespace, checkpoint: Checkpoint, records: Iterator[Dict]):
+    processed = resumed = checkpoint.processed
+    start = time.perf_counter()
+
+    with open(args.output, "r+b" if os.path.exists(args.output) else "wb") as output:
+        # drop results written after the last checkpoint (e.g. by a killed job)
+        output.truncate(checkpoint.output_offset)
+        output.seek(checkpoint.output_offset)
+
+        for chunk in iter_chunks(records, args.chunk_size):
+            pairs = ((record[args.source_key], record[args.summary_key]) for record in chunk)
+            results = factsumm.iter_scores(pairs, verbose=args.verbose, device=args.device)
+
+            # each result is written as soon as its pair is finished
+            for i, (record, result) in enumerate(zip(chunk, results)):
+                line = {"index": processed + i}
+                if args.id_key is not None:
+                    line["id"] = record[args.id_key]
+                line.update(result.to_dict())
+
+                output.write(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+
+            output.flush()
+            os.fsync(output.fileno())
+
+            processed += len(chunk)
+            checkpoint.update(processed, output.tell())
+
+            elapsed = time.perf_counter() - start
+            logger.info("Processed %s pairs (%.2f pairs/sec)", processed, (processed - resumed) / elapsed)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+
+    # per-pair score logs of FactSumm are only printed in verbose mode
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+    logging.getLogger("factsumm.server").setLevel(logging.INFO)
+
+    if args.command == "score":
+        score(args)
+    elif args.command == "serve":
+        serve(
+            FactSumm(
+                ner_model=args.ner_model,
+                rel_model=args.rel_model,
+                qg_model=args.qg_model,
+                qa_model=args.qa_model,
+                bert_score_model=args.bert_score_model,
+                batch_size=args.batch_size,
+                metrics=args.metrics,
+                backend=args.backend,
+                onnx_threads=args.onnx_threads,
+                precision=args.precision,
+                retrieval_top_k=args.retrieval_top_k,
+                question_budget=args.question_budget,
+                question_round_size=args.question_round_size,
+                qa_tolerance=args.qa_tolerance,
+                weights_cache=args.weights_cache,
+                artifact_store=args.artifact_store,
+                artifact_store_size_mb=args.artifact_store_size_mb,
+                sentence_cache_size=args.sentence_cache_size,
+            ),
+            device=args.device,
+            host=args.host,
+            port=args.port,
+            unix_socket=args.unix_socket,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms,
+            max_queue_size=args.max_queue_size,
+            default_budget_ms=args.default_budget_ms,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,35 @@
+import contextlib
+import functools
+import hashlib
 import os
 import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from itertools import permutations
-from typing import Dict, List, Optional, Set, Tuple, Union
-
-import pysbd
-from sumeval.metrics.rouge import RougeCalculator
-
-from factsumm.utils.module_entity import load_ner, load_rel
-from factsumm.utils.module_question import load_qa, load_qg
-from factsumm.utils.module_sentence import load_bert_score
-from factsumm.utils.utils import Config, score_qags
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from factsumm.utils import registry
+from factsumm.utils.corpus import iter_chunks
+from factsumm.utils.document import Document
+from factsumm.utils.parallel import WorkerPool
+from factsumm.utils.profiler import Hook, Profiler
+from factsumm.utils.retrieval import LineIndex
+from factsumm.utils.rouge import RougeTable
+from factsumm.utils.store import ArtifactStore, SentenceCache
+from factsumm.utils.utils import (
+    Config,
+    PairScores,
+    checkpoint_fingerprint,
+    f1_score,
+    metric_fields,
+    qags_interval,
+    score_qags,
+    select_metrics,
+)
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
@@ -26,6 +46,28 @@ class FactSumm:
         qg_model: Optional[str] = None,
         qa_model: Optional[str] = None,
         bert_score_model: Optional[str] = None,
+        batch_size: int = 32,
+        prune_pairs: bool = True,
+        prune_pair_types: bool = False,
+        max_pair_distance: Optional[int] = None,
+        workers: int = 1,
+        threads_per_worker: Optional[int] = None,
+        metrics: Optional[List[str]] = None,
+        backend: str = "torch",
+        onnx_threads: Optional[int] = None,
+        precision: Union[str, Dict[str, str]] = "fp32",
+        retrieval_top_k: Optional[int] = None,
+        question_budget: Optional[int] = None,
+        question_round_size: int = 4,
+        qa_tolerance: float = 0.05,
+        profile: bool = False,
+        hooks: Optional[List[Hook]] = None,
+        stage_chunk_size: Optional[int] = None,
+        low_memory: bool = False,
+        weights_cache: bool = False,
+        artifact_store: Optional[str] = None,
+        artifact_store_size_mb: Optional[float] = None,
+        sentence_cache_size: Optional[int] = None,
     ):
         """
         FactSumm object used to calculate Factual Consistency score of Abstractive Summarization model
@@ -36,11 +78,58 @@ class FactSumm:
             qg_model (str, optional): Question Answering model to be used (HuggingFace). Defaults to None.
             qa_model (str, optional): Question Genration model to be used (HuggingFace). Defaults to None.
             bert_score_model (str, optional): BERTScore model to be used (HuggingFace). Defaults to None.
+            batch_size (int, optional): number of inputs per forward pass of batched modules. Defaults to 32.
+            prune_pairs (bool, optional): skip entity pairs that cannot produce a kept triple before RE.
+                Defaults to True.
+            prune_pair_types (bool, optional): also skip entity pairs whose types the RE model was not trained on
+                (`Config.REL_PRUNED_HEAD_TYPES` and `Config.REL_PRUNED_TAIL_TYPES`), which may drop a few triples.
+                Defaults to False.
+            max_pair_distance (int, optional): skip entity pairs more than this many words apart. Defaults to None.
+            workers (int, optional): number of worker processes scoring shards of pairs. Defaults to 1.
+            threads_per_worker (int, optional): torch threads of each worker (cores are evenly split if None).
+                Defaults to None.
+            metrics (List[str], optional): metric families to be calculated by default, among `fact_score`,
+                `qa_score`, `rouge` and `bert_score` (every family if None). Defaults to None.
+            backend (str, optional): `torch`, or `onnx` to run NER, RE and QA models on ONNX Runtime
+                (graphs are exported once and cached under `Config.CACHE_DIR`). Defaults to "torch".
+            onnx_threads (int, optional): intra-op threads of ONNX Runtime sessions. Defaults to None.
+            precision (Union[str, Dict[str, str]], optional): `fp32`, `int8` (dynamic quantization of linear layers)
+                or `bf16` (autocast), either for every model or per model (`ner`, `rel`, `qg`, `qa`, `bert_score`).
+                Defaults to "fp32".
+            retrieval_top_k (int, optional): number of source lines (retrieved by BM25) used as the QA context of
+                each question and as BERTScore candidates of each summary line (whole source if None).
+                Defaults to None.
+            question_budget (int, optional): maximum number of questions per summary, generated in rounds by entity
+                priority until the confidence interval of QAGS is tight enough (every question if None).
+                Defaults to None.
+            question_round_size (int, optional): number of questions per round with a question budget. Defaults to 4.
+            qa_tolerance (float, optional): half width of the QAGS confidence interval at which questioning stops.
+                Defaults to 0.05.
+            profile (bool, optional): add wall time, CPU time and workload counters of each stage to each result
+                (`profile` field). Defaults to False.
+            hooks (List[Hook], optional): functions called with (stage, wall seconds, CPU seconds, counters)
+                after every stage. Defaults to None.
+            stage_chunk_size (int, optional): number of consecutive pairs `score_pairs` and `iter_scores` run
+                stage by stage (each model once over the whole chunk) instead of pair by pair (if None).
+                Defaults to None.
+            low_memory (bool, optional): only keep the model of the running stage in memory, releasing models of
+                other stages and reloading them when their stage runs again. Defaults to False.
+            weights_cache (bool, optional): save PyTorch models once under `Config.CACHE_DIR` and memory-map their
+                weights from there, so that (re)loading them is cheap. Defaults to False.
+            artifact_store (str, optional): path of a SQLite file NER, RE, QG and QA outputs are stored in and reused
+                from (per line, entity pair, prompt and question), across runs and worker processes. Defaults to None.
+            artifact_store_size_mb (float, optional): maximum size of stored artifacts, beyond which least recently
+                used ones are evicted (unbounded if None). Defaults to None.
+            sentence_cache_size (int, optional): number of NER, RE, QG and QA outputs of each stage kept in memory
+                (per line, entity pair, prompt and question), so that re-scoring an edited summary only runs models
+                on its changed lines (no cache if None). Defaults to None.
 
         """
         self.config = Config()
-        self.sentence_segmenter = pysbd.Segmenter(language="en", clean=False)
-        self.rouge = RougeCalculator(stopwords=True, lang="en")
+
+        # heavy dependencies (transformers, bert_score, sumeval, pysbd) are imported on first use
+        self._sentence_segmenter = None
+        self._rouge = None
 
         # NER, RE, QG, QA models supported by HuggingFace can be used (default models can be found in `config.py`)
         self.ner = ner_model if ner_model is not None else self.config.NER_MODEL
@@ -48,413 +137,2005 @@ class FactSumm:
         self.qg = qg_model if qg_model is not None else self.config.QG_MODEL
         self.qa = qa_model if qa_model is not None else self.config.QA_MODEL
         self.bert_score = bert_score_model
+        self.batch_size = batch_size
+        self.prune_pairs = prune_pairs
+        self.prune_pair_types = prune_pair_types
+        self.max_pair_distance = max_pair_distance
+        self.metrics = select_metrics(metrics)
+
+        if backend not in self.config.BACKENDS:
+            raise ValueError(f"Unsupported backend `{backend}`, please select among {self.config.BACKENDS}")
+
+        self.backend = backend
+        self.onnx_threads = onnx_threads
+        self.precision = self._select_precision(precision)
+
+        if retrieval_top_k is not None and retrieval_top_k < 1:
+            raise ValueError("`retrieval_top_k` should be a positive integer")
+
+        self.retrieval_top_k = retrieval_top_k
+
+        if question_budget is not None and question_budget < 1:
+            raise ValueError("`question_budget` should be a positive integer")
+
+        self.question_budget = question_budget
+
+        if question_round_size < 1:
+            raise ValueError("`question_round_size` should be a positive integer")
+
+        self.question_round_size = question_round_size
+        self.qa_tolerance = qa_tolerance
+
+        # stages are only measured if results are profiled or hooks are registered
+        self.profile = profile
+        self.profiler = Profiler(hooks)
+
+        if stage_chunk_size is not None and stage_chunk_size < 1:
+            raise ValueError("`stage_chunk_size` should be a positive integer")
+
+        self.stage_chunk_size = stage_chunk_size
+
+        # in low-memory mode, models are only loaded when their stage runs, and released when another stage runs
+        self.low_memory = low_memory
+        self.weights_cache = weights_cache
+        self._model_names = {stage: getattr(self, stage) for stage in self.config.STAGES}
+        self._loaders = {stage: getattr(self, f"_load_{stage}") for stage in self.config.STAGES}
+        self._devices: Dict[str, str] = {}
+        self._resident = None
+        # models are swapped and released by one thread at a time (e.g. by stages of the scoring server)
+        self._residency_lock = threading.RLock()
+
+        self.artifact_store = ArtifactStore(artifact_store, artifact_store_size_mb) if artifact_store else None
+        self._namespaces: Dict[str, str] = {}
+
+        if sentence_cache_size is not None and sentence_cache_size < 1:
+            raise ValueError("`sentence_cache_size` should be a positive integer")
+
+        self.sentence_cache = SentenceCache(sentence_cache_size) if sentence_cache_size is not None else None
+
+        # with multiple workers, each worker process builds its own FactSumm once from these arguments
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.worker_pool = None
+        self.worker_kwargs = {
+            "ner_model": self.ner,
+            "rel_model": self.rel,
+            "qg_model": self.qg,
+            "qa_model": self.qa,
+            "bert_score_model": self.bert_score,
+            "batch_size": batch_size,
+            "prune_pairs": prune_pairs,
+            "prune_pair_types": prune_pair_types,
+            "max_pair_distance": max_pair_distance,
+            "metrics": self.metrics,
+            "backend": backend,
+            "onnx_threads": onnx_threads,
+            "precision": self.precision,
+            "retrieval_top_k": retrieval_top_k,
+            "question_budget": question_budget,
+            "question_round_size": question_round_size,
+            "qa_tolerance": qa_tolerance,
+            "stage_chunk_size": stage_chunk_size,
+            "low_memory": low_memory,
+            "weights_cache": weights_cache,
+            "artifact_store": artifact_store,
+            "artifact_store_size_mb": artifact_store_size_mb,
+            "sentence_cache_size": sentence_cache_size,
+        }
 
-    def build_perm(
-        self,
-        lines: List[str],
-        total_entities: Union[List[Dict], List[List[Dict]]],
-    ) -> List:
+    def _select_precision(self, precision: Union[str, Dict[str, str]]) -> Dict[str, str]:
         """
-        Build entity permutations for Relation Extraction
+        Validate precision of each model
 
         Args:
-            lines (List[str]): segmented document lines
-            total_entities (Union[List[Dict], List[List[Dict]]]): list of total entities
+            precision (Union[str, Dict[str, str]]): precision of every model, or precision per model
 
         Returns:
-            List: list of permutations
+            Dict[str, str]: precision of each model (`fp32` for models which were not given)
 
         """
-        total_perms = []
+        if isinstance(precision, str):
+            precision = {stage: precision for stage in self.config.STAGES}
 
-        for line, line_entities in zip(lines, total_entities):
-            line_perms = list(permutations(line_entities, 2))
+        unknown = set(precision).difference(self.config.STAGES)
+        if unknown:
+            raise ValueError(f"Unknown models {sorted(unknown)}, please select among {self.config.STAGES}")
 
-            line_perms = [{
-                "text":
-                    line,
-                "spans": [
-                    (comb[0]["start"], comb[0]["end"]),
-                    (comb[-1]["start"], comb[-1]["end"]),
-                ]
-            } for comb in line_perms]
+        precision = {stage: precision.get(stage, "fp32") for stage in self.config.STAGES}
 
-            total_perms.append(line_perms)
+        for stage, stage_precision in precision.items():
+            if stage_precision not in self.config.PRECISIONS:
+                raise ValueError(f"Unsupported precision `{stage_precision}` of `{stage}`, "
+                                 f"please select among {self.config.PRECISIONS}")
 
-        return total_perms
+            if self.backend == "onnx" and stage in ("ner", "rel", "qa") and stage_precision != "fp32":
+                logging.warning("Precision of `%s` is ignored, since it runs on ONNX Runtime", stage)
+                precision[stage] = "fp32"
 
-    def get_facts(self, lines: List[str], entities: List[List[Dict]]) -> Set:
+        return precision
+
+    @property
+    def sentence_segmenter(self):
+        if self._sentence_segmenter is None:
+            import pysbd
+
+            self._sentence_segmenter = pysbd.Segmenter(language="en", clean=False)
+        return self._sentence_segmenter
+
+    @property
+    def rouge(self):
+        if self._rouge is None:
+            from sumeval.metrics.rouge import RougeCalculator
+
+            self._rouge = RougeCalculator(stopwords=True, lang="en")
+        return self._rouge
+
+    def _load_ner(self, device: str = "cpu"):
+        if self._deferred("ner", device):
+            return
+
+        if isinstance(self.ner, str):
+            from factsumm.utils.module_entity import load_ner
+
+            # this object is registered as a user of its models, so that `release` keeps models other objects use
+            with registry.held_by(self):
+                self.ner = load_ner(
+                    self.ner,
+                    device,
+                    self.backend,
+                    self.onnx_threads,
+                    self.precision["ner"],
+                    self.weights_cache,
+                )
+
+    def _load_rel(self, device: str = "cpu"):
+        if self._deferred("rel", device):
+            return
+
+        if isinstance(self.rel, str):
+            from factsumm.utils.module_entity import load_rel
+
+            with registry.held_by(self):
+                self.rel = load_rel(
+                    self.rel,
+                    device,
+                    self.batch_size,
+                    self.backend,
+                    self.onnx_threads,
+                    self.precision["rel"],
+                    self.weights_cache,
+                )
+
+    def _load_qg(self, device: str = "cpu"):
+        if self._deferred("qg", device):
+            return
+
+        if isinstance(self.qg, str):
+            from factsumm.utils.module_question import load_qg
+
+            with registry.held_by(self):
+                self.qg = load_qg(
+                    self.qg,
+                    device,
+                    self.batch_size,
+                    precision=self.precision["qg"],
+                    weights_cache=self.weights_cache,
+                )
+
+    def _load_qa(self, device: str = "cpu"):
+        if self._deferred("qa", device):
+            return
+
+        if isinstance(self.qa, str):
+            from factsumm.utils.module_question import load_qa
+
+            with registry.held_by(self):
+                self.qa = load_qa(
+                    self.qa,
+                    device,
+                    self.batch_size,
+                    backend=self.backend,
+                    num_threads=self.onnx_threads,
+                    precision=self.precision["qa"],
+                    weights_cache=self.weights_cache,
+                )
+
+    def _load_bert_score(self, device: str = "cpu"):
+        if self._deferred("bert_score", device):
+            return
+
+        if self.bert_score is None or isinstance(self.bert_score, str):
+            from factsumm.utils.module_sentence import load_bert_score
+
+            with registry.held_by(self):
+                self.bert_score = load_bert_score(
+                    self.bert_score,
+                    device,
+                    precision=self.precision["bert_score"],
+                    weights_cache=self.weights_cache,
+                )
+
+    def _deferred(self, stage: str, device: str) -> bool:
+        # in low-memory mode, models are loaded right before their stage runs (see `_model`)
+        self._devices[stage] = device
+        return self.low_memory and self._resident != stage
+
+    def _model(self, stage: str) -> Callable:
         """
-        Get fact triples using Relation Extraction model
+        Get the model function of a stage, right before the stage runs
+
+        In low-memory mode, models of other stages are released first, so that only the model of the running stage
+        is resident, and the model of the stage is (re)loaded on the device it was last requested on.
 
         Args:
-            lines (List[str]): segmented document lines
-            entities (List[List[Dict]]): list of total entities
+            stage (str): one of `ner`, `rel`, `qg`, `qa` and `bert_score`
 
         Returns:
-            Set: set of relation inferenced from permutations
+            Callable: loaded model function
 
         """
-        perms = self.build_perm(lines, entities)
-        triples = []
+        if not self.low_memory:
+            return getattr(self, stage)
 
-        for perm, entity in zip(perms, entities):
-            entity_key = {ent["word"]: ent["entity_group"] for ent in entity}
-            facts = self.rel(perm)
-            filtered_facts = []
+        with self._residency_lock:
+            if self._resident != stage:
+                self.release([other for other in self.config.STAGES if other != stage])
+                self._resident = stage
 
-            for fact in facts:
-                head, relation, tail = fact
+            self._loaders[stage](self._devices.get(stage, "cpu"))
+            return getattr(self, stage)
 
-                head = head.strip()
-                tail = tail.strip()
+    def _namespace(self, stage: str) -> str:
+        """
+        Get the artifact store namespace of a stage, which identifies everything its outputs depend on
 
-                if head == tail:
-                    continue
+        Args:
+            stage (str): one of `ner`, `rel`, `qg` and `qa`
 
-                head_entity_type = entity_key.get(head, None)
-                tail_entity_type = entity_key.get(tail, None)
+        Returns:
+            str: namespace made of the stage, its model, backend and precision, and the revision of its checkpoint
 
-                if head_entity_type is not None and head_entity_type == "PERSON" and not relation.startswith("per:"):
-                    continue
+        """
+        if stage in self._namespaces:
+            return self._namespaces[stage]
 
-                if head_entity_type is not None and head_entity_type != "PERSON" and relation.startswith("per:"):
-                    continue
+        model = self._model_names[stage]
+        backend = self.backend if stage in ("ner", "rel", "qa") else "torch"
+        fingerprint = checkpoint_fingerprint(model)
+        digest = hashlib.sha1("|".join(fingerprint).encode("utf-8")).hexdigest()[:16]
+        namespace = f"{stage}:{model}:{backend}:{self.precision[stage]}:{digest}"
 
-                if tail_entity_type is not None and tail_entity_type != "PERSON" and "members" in relation:
-                    continue
+        # revision of a hub model is only known once it is downloaded (e.g. while computing missing outputs)
+        if fingerprint:
+            self._namespaces[stage] = namespace
+        return namespace
 
-                filtered_facts.append(tuple([head, relation, tail]))
+    def _stored(self, stage: str, keys: List[Hashable], compute: Callable[[List[Hashable]], List]) -> List:
+        """
+        Get outputs of a stage from the sentence cache, then the artifact store, only computing (and caching)
+        those which are found in neither
 
-            triples.extend(filtered_facts)
+        Args:
+            stage (str): one of `ner`, `rel`, `qg` and `qa`
+            keys (List[Hashable]): content each output is computed from (e.g. a line for NER)
+            compute (Callable[[List[Hashable]], List]): function computing the output of each given key
 
-        return set(triples)
+        Returns:
+            List: output of each key
 
-    def _segment_sentence(self, text: str) -> List[str]:
         """
-        Segment input text into (possibly) multiple sentences
+        caches = [cache for cache in (self.sentence_cache, self.artifact_store) if cache is not None]
+        if not caches:
+            return compute(keys)
+
+        namespace = self._namespace(stage)
+        outputs = {}
+        missing = list(dict.fromkeys(keys))
+        looked_up = []
+
+        for cache in caches:
+            found = cache.get_many(namespace, missing)
+
+            # outputs found in the store are kept in memory for the next lookups
+            for previous in looked_up:
+                previous.put_many(namespace, found)
+
+            outputs.update(found)
+            missing = [key for key in missing if key not in found]
+            looked_up.append(cache)
+
+            if not missing:
+                break
+
+        if missing:
+            computed = dict(zip(missing, compute(missing)))
+            for cache in looked_up:
+                cache.put_many(namespace, computed)
+            outputs.update(computed)
+
+        return [outputs[key] for key in keys]
+
+    def _load_resident(self, stage: str, device: str = "cpu"):
+        self._devices[stage] = device
+        self._model(stage)
+
+    def release(self, stages: Optional[Iterable[str]] = None):
+        """
+        Release loaded models, which are loaded again on their next use
+
+        Models are also dropped from the process-wide registry once no other FactSumm object uses them,
+        so that their memory is freed.
 
         Args:
-            text (str): text to be segmented
+            stages (Iterable[str], optional): stages whose models are released, among `ner`, `rel`, `qg`, `qa`
+                and `bert_score` (every stage if None). Defaults to None.
 
-        Returns:
-            List[str]: list of segmented lines
+        """
+        released = False
+
+        with self._residency_lock:
+            for stage in self.config.STAGES if stages is None else stages:
+                if not callable(getattr(self, stage)):
+                    continue
+
+                setattr(self, stage, self._model_names[stage])
+                # models running on ONNX Runtime (NER, RE and QA) are registered under their own task
+                onnx = self.backend != "torch" and stage in ("ner", "rel", "qa")
+                registry.release(self, f"{stage}-{self.backend}" if onnx else stage)
+                released = True
+
+                if self._resident == stage:
+                    self._resident = None
 
+        if released:
+            registry.free_memory()
+
+    def add_hook(self, hook: Hook):
         """
-        return [line.strip() for line in self.sentence_segmenter.segment(text)]
+        Register a function called with (stage, wall seconds, CPU seconds, counters) after every stage
 
-    def _print_entities(self, mode: str, total_entities: List[List[Dict]]):
-        logging.info("<%s Entities>", mode.capitalize())
-        for i, line_entities in enumerate(total_entities):
-            printable_elements = []
-            dedup = {}
-            for entity in line_entities:
-                if entity["word"] not in dedup:
-                    printable_elements.append((entity["word"], entity["entity_group"]))
-                    dedup[entity["word"]] = True
+        Stages are `segmentation`, `ner`, `build_perm`, `rel`, `qg`, `qa`, `rouge` and `bert_score`, and counters
+        are workload sizes such as `lines`, `entities`, `permutations`, `pruned_pairs`, `rel_forwards`, `questions`,
+        `qa_contexts`, `qa_features` and `tokens_encoded`.
 
-            logging.info("Line No.%s: [%s]", i+1, printable_elements)
-        logging.info("")
+        Args:
+            hook (Hook): function to be called
 
-    def calculate_rouge(
-        self,
-        source: str,
-        summary: str,
-    ) -> Tuple[float, float, float]:
         """
-        Calculate ROUGE score
+        self.profiler.hooks.append(hook)
+
+    def remove_hook(self, hook: Hook):
+        self.profiler.hooks.remove(hook)
+
+    def warmup(self, device: str = "cpu") -> Dict[str, float]:
+        """
+        Load every model required by the selected metrics concurrently, instead of on first use
+
+        Models are kept in a process-wide registry, so that FactSumm objects using the same model share it.
 
         Args:
-            source (str): original source
-            summary (str): generated summary
+            device (str): device info
 
         Returns:
-            Tuple: (ROUGE-1, ROUGE-2, ROUGE-L) tuple
+            Dict[str, float]: load time of each model (or library) in seconds, close to zero if it was already loaded
 
         """
-        source_lines = self._segment_sentence(source)
+        # sentence segmentation and ROUGE only need their libraries to be imported
+        loaders = {"sentence_segmenter": lambda device: self.sentence_segmenter}
 
-        rouge_1 = self.rouge.rouge_n(summary, source_lines, 1)
-        rouge_2 = self.rouge.rouge_n(summary, source_lines, 2)
-        rouge_l = self.rouge.rouge_l(summary, source_lines)
+        if "rouge" in self.metrics:
+            loaders["rouge"] = lambda device: self.rouge
 
-        logging.info("Avg. ROUGE-1: %s\nAvg. ROUGE-2: %s\nAvg. ROUGE-L: %s", rouge_1, rouge_2, rouge_l)
-        return rouge_1, rouge_2, rouge_l
+        if "fact_score" in self.metrics or "qa_score" in self.metrics:
+            loaders["ner"] = self._load_ner
 
-    def _print_facts(self, mode: str, facts: Set[Tuple]):
-        logging.info("<%s Facts>", mode.capitalize())
-        for fact in facts:
-            logging.info(fact)
-        logging.info("")
+        if "fact_score" in self.metrics:
+            loaders["rel"] = self._load_rel
 
-    def _filter_out(self, sources: Set, summaries: Set) -> Tuple[Set, Set]:
+        if "qa_score" in self.metrics:
+            loaders["qg"] = self._load_qg
+            loaders["qa"] = self._load_qa
+
+        if "bert_score" in self.metrics:
+            loaders["bert_score"] = self._load_bert_score
+
+        def timed(loader):
+            start = time.perf_counter()
+            loader(device)
+            return time.perf_counter() - start
+
+        if self.low_memory:
+            # models are loaded (e.g. into the weights cache) one at a time, and only the last one stays resident
+            load_times = {
+                name: timed(functools.partial(self._load_resident, name) if name in self.config.STAGES else loader)
+                for name, loader in loaders.items()
+            }
+        else:
+            with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+                futures = {name: executor.submit(timed, loader) for name, loader in loaders.items()}
+                load_times = {name: future.result() for name, future in futures.items()}
+
+        for name, load_time in load_times.items():
+            logging.info("Loaded %s in %.2fs", name, load_time)
+
+        return load_times
+
+    def precision_drift(
+        self,
+        sources: List[str],
+        summaries: List[str],
+        device: str = "cpu",
+    ) -> Dict[str, Dict]:
         """
-        Filter out triples that don't share a subject and relation for comparability
+        Measure how much reduced precision changes scores against fp32 on a reference set
+
+        Every model running in reduced precision is measured on its own (other models in fp32), and all of them
+        together, so that precision can be chosen per model with its accuracy cost known.
 
         Args:
-            sources (Set): set of triples from source
-            summaries (Set): set of triples from summary
+            sources (List[str]): reference sources
+            summaries (List[str]): reference summaries
+            device (str): device info
+
+        Raises:
+            ValueError: if no metric depending on a model is selected
 
         Returns:
-            Tuple[Set, Set]: filtered sources and summaries
+            Dict[str, Dict]: elapsed time of fp32 scoring, and precision, elapsed time and
+                mean / max absolute score difference of each (model or `all`) setting
 
         """
-        source_tuple = {(source[0], source[1]) for source in sources}
-        summary_tuple = {(summary[0], summary[1]) for summary in summaries}
+        kwargs = dict(self.worker_kwargs)
 
-        sources = {
-            source for source in sources
-            if (source[0], source[1]) in summary_tuple
-        }
-        summaries = {
-            summary for summary in summaries
-            if (summary[0], summary[1]) in source_tuple
+        settings = {
+            stage: {stage: stage_precision}
+            for stage, stage_precision in self.precision.items()
+            if stage_precision != "fp32"
         }
-        return sources, summaries
+        if len(settings) > 1:
+            settings["all"] = self.precision
+
+        # ROUGE does not depend on any model, so it is neither computed nor compared
+        metrics = [metric for metric in self.metrics if metric != "rouge"]
+        if not metrics:
+            raise ValueError("Precision drift is only measured on `fact_score`, `qa_score` and `bert_score`")
+
+        fields = metric_fields(metrics)
+
+        def run(factsumm):
+            # models are loaded before timing, so that only scoring is measured
+            factsumm.warmup(device)
+            start = time.perf_counter()
+            columns = factsumm.score_pairs(sources, summaries, device=device, columnar=True)
+            return columns, time.perf_counter() - start
+
+        # fp32 models are shared by every setting, while reduced precision models are dropped after their setting
+        baseline = FactSumm(**{**kwargs, "precision": "fp32", "metrics": metrics})
+
+        try:
+            expected, elapsed = run(baseline)
+            report = {"fp32": {"seconds": elapsed}}
+
+            for name, precision in settings.items():
+                factsumm = FactSumm(**{**kwargs, "precision": precision, "metrics": metrics})
+                try:
+                    actual, elapsed = run(factsumm)
+                finally:
+                    factsumm.release()
+                report[name] = {"precision": precision, "seconds": elapsed}
+
+                for field in fields:
+                    diff = np.abs(actual[field] - expected[field])
+                    report[name][field] = {
+                        "mean_abs_diff": float(diff.mean()) if len(diff) > 0 else 0.0,
+                        "max_abs_diff": float(diff.max()) if len(diff) > 0 else 0.0,
+                    }
+        finally:
+            baseline.release()
+
+        for name, result in report.items():
+            logging.info("<Precision Drift: %s>", name)
+            for key, value in result.items():
+                logging.info("%s: %s", key, value)
+            logging.info("")
+
+        return report
 
-    def extract_facts(
+    def build_perm(
         self,
-        source: str,
-        summary: str,
-        verbose: bool = False,
-        device: str = "cpu",
-    ):
+        lines: List[str],
+        total_entities: Union[List[Dict], List[List[Dict]]],
+    ) -> List:
         """
-        Extract (head_entity, relation, tail_entity) relation triple using NER & RE module
-
-            See also https://arxiv.org/abs/1905.13322.pdf
+        Build entity permutations for Relation Extraction
 
         Args:
-            source (str): original source
-            summary (str): generated summary
-            verbose (bool, optional): print verbose option. Defaults to False.
-            device (str): device info
+            lines (List[str]): segmented document lines
+            total_entities (Union[List[Dict], List[List[Dict]]]): list of total entities
+
+        Returns:
+            List: list of permutations
 
         """
-        if isinstance(self.ner, str):
-            self.ner = load_ner(self.ner, device)
+        total_perms = []
 
-        if isinstance(self.rel, str):
-            self.rel = load_rel(self.rel, device)
+        for line, line_entities in zip(lines, total_entities):
+            line_perms = list(permutations(line_entities, 2))
 
-        source_lines = self._segment_sentence(source)
-        summary_lines = self._segment_sentence(summary)
+            line_perms = [{
+                "text":
+                    line,
+                "spans": [
+                    (comb[0]["start"], comb[0]["end"]),
+                    (comb[-1]["start"], comb[-1]["end"]),
+                ],
+                "types": [
+                    comb[0]["entity_group"],
+                    comb[-1]["entity_group"],
+                ],
+            } for comb in line_perms]
 
-        # extract per-line named entities
-        source_entities = self.ner(source_lines)
-        summary_entities = self.ner(summary_lines)
+            total_perms.append(line_perms)
 
-        # extract entity-based triple: (head, relation, tail)
-        source_facts = self.get_facts(source_lines, source_entities)
-        summary_facts = self.get_facts(summary_lines, summary_entities)
+        return total_perms
 
-        # filter out some facts
-        source_facts, summary_facts = self._filter_out(
-            source_facts,
-            summary_facts,
-        )
+    def _filter_facts(self, facts: List[Tuple], line_entities: List[Dict]) -> List[Tuple]:
+        """
+        Filter out triples whose relation does not fit to the types of its entities
 
-        common_facts = summary_facts.intersection(source_facts)
-        diff_facts = summary_facts.difference(source_facts)
+        Args:
+            facts (List[Tuple]): triples extracted from a single line
+            line_entities (List[Dict]): entities of the line
 
-        if verbose:
-            self._print_entities("source", source_entities)
-            self._print_entities("summary", summary_entities)
+        Returns:
+            List[Tuple]: filtered triples
 
-            self._print_facts("source", source_facts)
-            self._print_facts("summary", summary_facts)
+        """
+        entity_key = {ent["word"]: ent["entity_group"] for ent in line_entities}
+        filtered_facts = []
 
-            self._print_facts("common", common_facts)
-            self._print_facts("diff", diff_facts)
+        for fact in facts:
+            head, relation, tail = fact
 
-        if not summary_facts:
-            fact_score = 0.0
-        else:
-            fact_score = len(common_facts) / len(summary_facts)
-        logging.info("Fact Score: %s", fact_score)
+            head = head.strip()
+            tail = tail.strip()
 
-        return source_entities, summary_entities, fact_score
+            if head == tail:
+                continue
 
-    def _print_qas(self, mode: str, questions: List[Dict]):
-        logging.info("Answers based on %s (Questions are generated from Summary)", mode.capitalize())
-        for question in questions:
-            logging.info("[Q] %s\t[Pred] %s", question["question"], question["prediction"])
-        logging.info("")
+            head_entity_type = entity_key.get(head, None)
+            tail_entity_type = entity_key.get(tail, None)
 
-    def extract_qas(
-        self,
-        source: str,
-        summary: str,
-        source_ents: List = None,
-        summary_ents: List = None,
-        verbose: bool = False,
-        device: str = "cpu",
-    ) -> float:
+            if head_entity_type is not None and head_entity_type == "PERSON" and not relation.startswith("per:"):
+                continue
+
+            if head_entity_type is not None and head_entity_type != "PERSON" and relation.startswith("per:"):
+                continue
+
+            if tail_entity_type is not None and tail_entity_type != "PERSON" and "members" in relation:
+                continue
+
+            filtered_facts.append(tuple([head, relation, tail]))
+
+        return filtered_facts
+
+    def prune_perm(self, total_perms: List[List[Dict]]) -> Tuple[List[List[Dict]], int]:
         """
-        Extract Question & Answering Pair generated from Question Generation module
+        Prune entity permutations which cannot produce a kept triple before Relation Extraction
 
-            See also https://arxiv.org/abs/2004.04228
+        Triples whose head equals to their tail are always filtered out, and permutations with the same spans
+        produce the same triple. Permutations of pruned entity types and distant entities are only pruned if
+        `prune_pair_types` or `max_pair_distance` is set, since their triples could be kept.
 
         Args:
-            source (str): original source
-            summary (str): generated summary
-            source_ents (List, optional): named entities extracted from source. Defaults to None.
-            summary_ents (List, optional): named entities extracted from source. Defaults to None.
-            verbose (bool, optional): print verbose option. Defaults to False.
-            device (str): device info
+            total_perms (List[List[Dict]]): per-line entity permutations built by `build_perm`
 
-        """
-        if isinstance(self.qg, str) and isinstance(self.qa, str):
-            self.qg = load_qg(self.qg, device)
-            self.qa = load_qa(self.qa, device)
+        Returns:
+            Tuple[List[List[Dict]], int]: pruned per-line permutations and the number of pruned permutations
 
-        if isinstance(self.ner, str):
-            self.ner = load_ner(self.ner, device)
+        """
+        num_pruned = 0
+        pruned_perms = []
 
-        source_lines = self._segment_sentence(source)
-        summary_lines = self._segment_sentence(summary)
+        for line_perms in total_perms:
+            kept = []
+            dedup = {}
 
-        if source_ents is None:
-            source_ents = self.ner(source_lines)
+            for perm in line_perms:
+                text = perm["text"]
+                (head_start, head_end), (tail_start, tail_end) = perm["spans"][0], perm["spans"][-1]
+                head = text[head_start:head_end].strip()
+                tail = text[tail_start:tail_end].strip()
+                head_type, tail_type = perm["types"][0], perm["types"][-1]
 
-        if summary_ents is None:
-            summary_ents = self.ner(summary_lines)
+                # other mentions of the same entities are kept, since their relation depends on their context
+                spans = ((head_start, head_end), (tail_start, tail_end))
+                if head == tail or spans in dedup:
+                    continue
 
-        summary_qas = self.qg(summary_lines, summary_ents)
+                if self.prune_pair_types and (
+                    head_type in self.config.REL_PRUNED_HEAD_TYPES or tail_type in self.config.REL_PRUNED_TAIL_TYPES
+                ):
+                    continue
 
-        source_answers = self.qa(source, summary_qas)
-        summary_answers = self.qa(summary, summary_qas)
+                if self.max_pair_distance is not None:
+                    gap = text[min(head_end, tail_end):max(head_start, tail_start)]
+                    if len(gap.split()) > self.max_pair_distance:
+                        continue
 
-        if verbose:
-            self._print_qas("source", source_answers)
-            self._print_qas("summary", summary_answers)
+                kept.append(perm)
+                dedup[spans] = True
 
-        qa_score = score_qags(source_answers, summary_answers)
-        logging.info("QAGS Score: %s\n", qa_score)
+            num_pruned += len(line_perms) - len(kept)
+            pruned_perms.append(kept)
 
-        return qa_score
+        return pruned_perms, num_pruned
 
-    def calculate_bert_score(
+    def _get_facts_batch(
         self,
-        source: str,
-        summary: str,
-        device: str = "cpu",
-    ) -> Tuple[float, float, float]:
+        total_lines: List[List[str]],
+        total_entities: List[List[List[Dict]]],
+        total_heads: Optional[List[Set[str]]] = None,
+    ) -> Tuple[List[Set], List[Dict]]:
         """
-        Calculate BERTScore
-
-            See also https://arxiv.org/abs/2005.03754
+        Get fact triples of multiple documents using a single batched Relation Extraction stream
 
         Args:
-            source (str): original source
-            summary (str): generated summary
-            device (str): device info
+            total_lines (List[List[str]]): segmented lines of each document
+            total_entities (List[List[List[Dict]]]): per-line entities of each document
+            total_heads (List[Set[str]], optional): if given, only pairs whose head is in the set of the document
+                are passed to RE. Defaults to None.
 
         Returns:
-            Tuple[float]: (Precision, Recall, F1) BERTScore tuple
+            Tuple[List[Set], List[Dict]]: set of fact triples and entity pair statistics of each document
 
         """
-        if self.bert_score is None:
-            self.bert_score = load_bert_score(device)
+        with self.profiler.stage("build_perm") as counters:
+            perms, total_stats = self._build_perms(total_lines, total_entities, total_heads)
+
+            if counters is not None:
+                counters["permutations"] += sum(stats["pairs"] for stats in total_stats)
+                counters["pruned_pairs"] += sum(stats["pruned"] for stats in total_stats)
+                counters["rel_pairs"] += sum(stats["forwarded"] for stats in total_stats)
+
+        logging.debug(
+            "Passed %s of %s entity pairs to Relation Extraction (%s pruned, %s filtered by head)",
+            sum(stats["forwarded"] for stats in total_stats),
+            sum(stats["pairs"] for stats in total_stats),
+            sum(stats["pruned"] for stats in total_stats),
+            sum(stats["head_filtered"] for stats in total_stats),
+        )
 
-        source_lines = self._segment_sentence(source)
-        summary_lines = self._segment_sentence(summary)
+        with self.profiler.stage("rel") as counters:
+            # relation of an entity pair only depends on its line and the spans of its entities
+            keys = [(perm["text"], *perm["spans"]) for line_perms in perms for perm in line_perms]
 
-        total_precision = 0.0
-        total_recall = 0.0
-        total_f1 = 0.0
+            def extract(missing: List[Tuple]) -> List[List[Tuple]]:
+                if counters is not None:
+                    counters["rel_forwards"] += -(-len(missing) // self.batch_size)
 
-        for summary_line in summary_lines:
-            precision, recall, f1 = self.bert_score([summary_line], [source_lines])
+                # every pair is passed as a line of its own, so that its (at most one) triple can be stored
+                return self._model("rel")([[{"text": text, "spans": spans}] for text, *spans in missing])
 
-            total_precision += precision.item()
-            total_recall += recall.item()
-            total_f1 += f1.item()
+            pair_facts = iter(self._stored("rel", keys, extract))
+            facts = iter([[fact for _ in line_perms for fact in next(pair_facts)] for line_perms in perms])
 
-        if len(summary_lines) > 1:
-            total_precision /= len(summary_lines)
-            total_recall /= len(summary_lines)
-            total_f1 /= len(summary_lines)
+        total_triples = []
+        for entities in total_entities:
+            triples = []
 
-        logging.info("<BERTScore Score>\nPrecision: %s\nRecall: %s\nF1: %s", total_precision, total_recall, total_f1)
+            for line_entities in entities:
+                triples.extend(self._filter_facts(next(facts), line_entities))
 
-        return total_precision, total_recall, total_f1
+            total_triples.append(set(triples))
 
-    def __call__(
+        return total_triples, total_stats
+
+    def _build_perms(
         self,
-        sources: Union[List[str], str],
-        summaries: Union[List[str], str],
-        verbose: bool = False,
-        device: str = "cpu",
-    ) -> Dict:
-        if isinstance(sources, str):
-            sources = [sources]
+        total_lines: List[List[str]],
+        total_entities: List[List[List[Dict]]],
+        total_heads: Optional[List[Set[str]]] = None,
+    ) -> Tuple[List[List[Dict]], List[Dict]]:
+        """
+        Build (and prune) per-line entity permutations of multiple documents
 
-        if  isinstance(summaries, str):
-            summaries = [summaries]
+        Args:
+            total_lines (List[List[str]]): segmented lines of each document
+            total_entities (List[List[List[Dict]]]): per-line entities of each document
+            total_heads (List[Set[str]], optional): head entities of interest of each document (every head if None).
+                Defaults to None.
 
-        if len(sources) != len(summaries):
-            raise ValueError("`sources` and `summaries` should have the same number of elements!")
+        Returns:
+            Tuple[List[List[Dict]], List[Dict]]: per-line permutations of every document (flattened) and
+                entity pair statistics of each document (`pairs`, `pruned`, `head_filtered` and `forwarded`)
 
-        num_pairs = len(sources)
+        """
+        perms = []
+        total_stats = []
 
-        fact_scores = 0
-        qags_scores = 0
-        rouge_scores = {
-            "rouge-1": 0.0,
-            "rouge-2": 0.0,
-            "rouge-l": 0.0,
-        }
-        bert_scores = {
-            "precision": 0.0,
-            "recall": 0.0,
-            "f1": 0.0,
-        }
+        for i, (lines, entities) in enumerate(zip(total_lines, total_entities)):
+            doc_perms = self.build_perm(lines, entities)
+            num_perms = sum(len(line_perms) for line_perms in doc_perms)
+            num_pruned = 0
 
-        for source, summary in zip(sources, summaries):
-            source_ents, summary_ents, fact_score = self.extract_facts(
-                source,
-                summary,
-                verbose,
-                device,
-            )
-            fact_scores += fact_score
-
-            qags_score = self.extract_qas(
-                source,
-                summary,
-                source_ents,
-                summary_ents,
-                verbose,
-                device,
-            )
-            qags_scores += qags_score
-
-            rouge_1, rouge_2, rouge_l = self.calculate_rouge(source, summary)
-            rouge_scores["rouge-1"] += rouge_1
-            rouge_scores["rouge-2"] += rouge_2
-            rouge_scores["rouge-l"] += rouge_l
-
-            precision, recall, f1 = self.calculate_bert_score(source, summary, device)
-            bert_scores["precision"] += precision
-            bert_scores["recall"] += recall
-            bert_scores["f1"] += f1
-
-        if num_pairs > 1:
-            fact_scores /= num_pairs
-            qags_scores /= num_pairs
-
-            rouge_scores["rouge-1"] /= num_pairs
-            rouge_scores["rouge-2"] /= num_pairs
-            rouge_scores["rouge-l"] /= num_pairs
-
-            bert_scores["precision"] /= num_pairs
-            bert_scores["recall"] /= num_pairs
-            bert_scores["f1"] /= num_pairs
-
-        return {
-            "fact_score": fact_scores,
-            "qa_score": qags_scores,
-            "rouge": rouge_scores,
-            "bert_score": bert_scores,
-        }
+            if self.prune_pairs:
+                doc_perms, num_pruned = self.prune_perm(doc_perms)
+
+            if total_heads is not None:
+                heads = total_heads[i]
+                doc_perms = [[
+                    perm for perm in line_perms
+                    if perm["text"][perm["spans"][0][0]:perm["spans"][0][-1]].strip() in heads
+                ] for line_perms in doc_perms]
+
+            num_forwarded = sum(len(line_perms) for line_perms in doc_perms)
+
+            perms.extend(doc_perms)
+            total_stats.append({
+                "pairs": num_perms,
+                "pruned": num_pruned,
+                "head_filtered": num_perms - num_pruned - num_forwarded,
+                "forwarded": num_forwarded,
+            })
+
+        return perms, total_stats
+
+    def get_facts_batch(
+        self,
+        total_lines: List[List[str]],
+        total_entities: List[List[List[Dict]]],
+    ) -> List[Set]:
+        """
+        Get fact triples of multiple documents using a single batched Relation Extraction stream
+
+        Args:
+            total_lines (List[List[str]]): segmented lines of each document
+            total_entities (List[List[List[Dict]]]): per-line entities of each document
+
+        Returns:
+            List[Set]: set of relation inferenced from permutations for each document
+
+        """
+        return self._get_facts_batch(total_lines, total_entities)[0]
+
+    def get_facts(self, lines: List[str], entities: List[List[Dict]]) -> Set:
+        """
+        Get fact triples using Relation Extraction model
+
+        Args:
+            lines (List[str]): segmented document lines
+            entities (List[List[Dict]]): list of total entities
+
+        Returns:
+            Set: set of relation inferenced from permutations
+
+        """
+        return self.get_facts_batch([lines], [entities])[0]
+
+    def _segment_sentence(self, text: str) -> List[str]:
+        """
+        Segment input text into (possibly) multiple sentences
+
+        Args:
+            text (str): text to be segmented
+
+        Returns:
+            List[str]: list of segmented lines
+
+        """
+        with self.profiler.stage("segmentation") as counters:
+            lines = [line.strip() for line in self.sentence_segmenter.segment(text)]
+
+            if counters is not None:
+                counters["lines"] += len(lines)
+
+        return lines
+
+    def _document(self, text: Union[str, Document]) -> Document:
+        """
+        Wrap raw text into a Document, so that its analysis can be memoized
+
+        Args:
+            text (Union[str, Document]): raw text or already analyzed document
+
+        Returns:
+            Document: document of the text
+
+        """
+        return text if isinstance(text, Document) else Document(text)
+
+    def _lines(self, document: Document) -> List[str]:
+        return document.memoize("lines", lambda: self._segment_sentence(document.text))
+
+    def _entities(self, document: Document, device: str = "cpu") -> List[List[Dict]]:
+        self._load_ner(device)
+
+        return document.memoize("entities", lambda: self._recognize_entities(self._lines(document)))
+
+    def _recognize_entities(self, lines: List[str]) -> List[List[Dict]]:
+        with self.profiler.stage("ner") as counters:
+
+            def recognize(missing: List[str]) -> List[List[Dict]]:
+                if counters is not None:
+                    counters["ner_lines"] += len(missing)
+                return self._model("ner")(missing)
+
+            total_entities = self._stored("ner", lines, recognize)
+
+            if counters is not None:
+                counters["entities"] += sum(len(line_entities) for line_entities in total_entities)
+
+        return total_entities
+
+    def _entities_batch(self, documents: List[Document], device: str = "cpu") -> List[List[List[Dict]]]:
+        """
+        Get per-line entities of documents, running Named Entity Recognition once for all documents not analyzed yet
+
+        Args:
+            documents (List[Document]): documents to be analyzed
+            device (str): device info
+
+        Returns:
+            List[List[List[Dict]]]: per-line entities of each document
+
+        """
+        self._load_ner(device)
+
+        missing = list({id(document): document for document in documents if "entities" not in document}.values())
+        entities = iter(self._recognize_entities([line for document in missing for line in self._lines(document)]))
+
+        for document in missing:
+            document["entities"] = [next(entities) for _ in self._lines(document)]
+
+        return [document["entities"] for document in documents]
+
+    def _facts(self, documents: List[Document], device: str = "cpu") -> List[Set]:
+        """
+        Get fact triples of documents, running Relation Extraction once for all documents not analyzed yet
+
+        Args:
+            documents (List[Document]): documents to be analyzed
+            device (str): device info
+
+        Returns:
+            List[Set]: set of fact triples of each document
+
+        """
+        self._load_rel(device)
+
+        missing = list({id(document): document for document in documents if "facts" not in document}.values())
+        total_facts, total_stats = self._get_facts_batch(
+            [self._lines(document) for document in missing],
+            [self._entities(document, device) for document in missing],
+        )
+
+        for document, facts, stats in zip(missing, total_facts, total_stats):
+            document["facts"] = facts
+            document["pair_stats"] = stats
+
+        return [document["facts"] for document in documents]
+
+    def _facts_with_heads_batch(
+        self,
+        documents: List[Document],
+        total_heads: List[Set[str]],
+        device: str = "cpu",
+    ) -> List[Set]:
+        """
+        Get fact triples of documents whose head is one of the given heads of each document
+
+        Only the entity pairs headed by heads which were not queried before are passed to Relation Extraction,
+        so that source RE cost scales with the summary instead of the whole source.
+
+        Args:
+            documents (List[Document]): documents to be analyzed
+            total_heads (List[Set[str]]): head entities of interest of each document
+            device (str): device info
+
+        Returns:
+            List[Set]: set of fact triples headed by the given heads of each document
+
+        """
+        # heads requested for the same document (e.g. by multiple summaries) are queried at once
+        missing = {}
+        for document, heads in zip(documents, total_heads):
+            if "facts" in document:
+                continue
+
+            facts_by_head = document.memoize("facts_by_head", dict)
+            _, missing_heads = missing.setdefault(id(document), (document, set()))
+            missing_heads.update(set(heads) - set(facts_by_head))
+
+        missing = [(document, heads) for document, heads in missing.values() if heads]
+
+        if missing:
+            self._load_rel(device)
+
+            total_facts, total_stats = self._get_facts_batch(
+                [self._lines(document) for document, _ in missing],
+                [self._entities(document, device) for document, _ in missing],
+                [heads for _, heads in missing],
+            )
+
+            for (document, heads), facts, stats in zip(missing, total_facts, total_stats):
+                facts_by_head = document["facts_by_head"]
+                for head in heads:
+                    facts_by_head[head] = set()
+
+                for fact in facts:
+                    facts_by_head[fact[0]].add(fact)
+
+                # pairs of heads queried later on are no longer filtered by head once they are forwarded
+                pair_stats = document.memoize("pair_stats", lambda: {
+                    "pairs": stats["pairs"],
+                    "pruned": stats["pruned"],
+                    "head_filtered": stats["pairs"] - stats["pruned"],
+                    "forwarded": 0,
+                })
+                pair_stats["head_filtered"] -= stats["forwarded"]
+                pair_stats["forwarded"] += stats["forwarded"]
+
+        return [
+            {fact for fact in document["facts"] if fact[0] in heads}
+            if "facts" in document else {fact for head in heads for fact in document["facts_by_head"][head]}
+            for document, heads in zip(documents, total_heads)
+        ]
+
+    def _facts_with_heads(self, document: Document, heads: Set[str], device: str = "cpu") -> Set:
+        """
+        Get fact triples of a document whose head is one of the given heads
+
+        Args:
+            document (Document): document to be analyzed
+            heads (Set[str]): head entities of interest
+            device (str): device info
+
+        Returns:
+            Set: set of fact triples headed by the given heads
+
+        """
+        return self._facts_with_heads_batch([document], [heads], device)[0]
+
+    def _print_entities(self, mode: str, total_entities: List[List[Dict]]):
+        logging.info("<%s Entities>", mode.capitalize())
+        for i, line_entities in enumerate(total_entities):
+            printable_elements = []
+            dedup = {}
+            for entity in line_entities:
+                if entity["word"] not in dedup:
+                    printable_elements.append((entity["word"], entity["entity_group"]))
+                    dedup[entity["word"]] = True
+
+            logging.info("Line No.%s: [%s]", i+1, printable_elements)
+        logging.info("")
+
+    def _print_pair_stats(self, mode: str, stats: Dict):
+        logging.info("<%s Entity Pairs>", mode.capitalize())
+        logging.info("Passed %s of %s entity pairs to Relation Extraction", stats["forwarded"], stats["pairs"])
+        logging.info("Pruned: %s, Filtered by head: %s", stats["pruned"], stats["head_filtered"])
+        logging.info("")
+
+    def calculate_rouge(
+        self,
+        source: Union[str, Document],
+        summary: Union[str, Document],
+    ) -> Tuple[float, float, float]:
+        """
+        Calculate ROUGE score
+
+        Args:
+            source (Union[str, Document]): original source
+            summary (Union[str, Document]): generated summary
+
+        Returns:
+            Tuple: (ROUGE-1, ROUGE-2, ROUGE-L) tuple
+
+        """
+        source = self._document(source)
+        summary = self._document(summary)
+
+        lines = self._lines(source)
+
+        with self.profiler.stage("rouge"):
+            # reference lines are counted once per source, and summary tokens once per summary
+            table = source.memoize("rouge", lambda: RougeTable([self.rouge.tokenize(line, True) for line in lines]))
+            tokens = summary.memoize("rouge_tokens", lambda: self.rouge.tokenize(summary.text))
+            rouge_1, rouge_2, rouge_l = table.score(tokens)
+
+        logging.info("Avg. ROUGE-1: %s\nAvg. ROUGE-2: %s\nAvg. ROUGE-L: %s", rouge_1, rouge_2, rouge_l)
+        return rouge_1, rouge_2, rouge_l
+
+    def _print_facts(self, mode: str, facts: Set[Tuple]):
+        logging.info("<%s Facts>", mode.capitalize())
+        for fact in facts:
+            logging.info(fact)
+        logging.info("")
+
+    def _filter_out(self, sources: Set, summaries: Set) -> Tuple[Set, Set]:
+        """
+        Filter out triples that don't share a subject and relation for comparability
+
+        Args:
+            sources (Set): set of triples from source
+            summaries (Set): set of triples from summary
+
+        Returns:
+            Tuple[Set, Set]: filtered sources and summaries
+
+        """
+        source_tuple = {(source[0], source[1]) for source in sources}
+        summary_tuple = {(summary[0], summary[1]) for summary in summaries}
+
+        sources = {
+            source for source in sources
+            if (source[0], source[1]) in summary_tuple
+        }
+        summaries = {
+            summary for summary in summaries
+            if (summary[0], summary[1]) in source_tuple
+        }
+        return sources, summaries
+
+    def _compare_facts(self, source_facts: Set, summary_facts: Set) -> Tuple[Set, Set, Set, Set, float]:
+        """
+        Compare comparable source and summary facts
+
+        Args:
+            source_facts (Set): set of triples from source
+            summary_facts (Set): set of triples from summary
+
+        Returns:
+            Tuple[Set, Set, Set, Set, float]: filtered source facts, filtered summary facts, common facts,
+                diff facts and fact score
+
+        """
+        source_facts, summary_facts = self._filter_out(source_facts, summary_facts)
+
+        common_facts = summary_facts.intersection(source_facts)
+        diff_facts = summary_facts.difference(source_facts)
+
+        fact_score = len(common_facts) / len(summary_facts) if summary_facts else 0.0
+        return source_facts, summary_facts, common_facts, diff_facts, fact_score
+
+    def extract_facts(
+        self,
+        source: Union[str, Document],
+        summary: Union[str, Document],
+        verbose: bool = False,
+        device: str = "cpu",
+    ):
+        """
+        Extract (head_entity, relation, tail_entity) relation triple using NER & RE module
+
+            See also https://arxiv.org/abs/1905.13322.pdf
+
+        Args:
+            source (Union[str, Document]): original source
+            summary (Union[str, Document]): generated summary
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+
+        """
+        source = self._document(source)
+        summary = self._document(summary)
+
+        # extract per-line named entities
+        source_entities = self._entities(source, device)
+        summary_entities = self._entities(summary, device)
+
+        # extract entity-based triple: (head, relation, tail)
+        # summary facts go first, since only source facts sharing their heads can survive `_filter_out`
+        summary_facts, = self._facts([summary], device)
+        source_facts = self._facts_with_heads(source, {fact[0] for fact in summary_facts}, device)
+
+        # filter out some facts
+        source_facts, summary_facts, common_facts, diff_facts, fact_score = self._compare_facts(
+            source_facts,
+            summary_facts,
+        )
+
+        if verbose:
+            self._print_entities("source", source_entities)
+            self._print_entities("summary", summary_entities)
+
+            for mode, document in (("source", source), ("summary", summary)):
+                if "pair_stats" in document:
+                    self._print_pair_stats(mode, document["pair_stats"])
+
+            self._print_facts("source", source_facts)
+            self._print_facts("summary", summary_facts)
+
+            self._print_facts("common", common_facts)
+            self._print_facts("diff", diff_facts)
+
+        logging.info("Fact Score: %s", fact_score)
+
+        return source_entities, summary_entities, fact_score
+
+    def _retrieve_lines(self, source: Document, query: str) -> List[str]:
+        """
+        Retrieve source lines most relevant to the query, indexing the source only once
+
+        Args:
+            source (Document): source document
+            query (str): query text
+
+        Returns:
+            List[str]: `retrieval_top_k` most relevant lines, in document order
+
+        """
+        lines = self._lines(source)
+        index = source.memoize("retrieval", lambda: LineIndex(lines))
+        return [lines[line_idx] for line_idx in index.search(query, self.retrieval_top_k)]
+
+    def _answer_questions(
+        self,
+        pairs: List[Tuple[Document, Document]],
+        total_questions: List[List[Dict]],
+    ) -> List[Tuple[List[Dict], List[Dict]]]:
+        """
+        Answer questions of multiple pairs based on both source and summary in a single batched stream
+
+        If `retrieval_top_k` is set, each question is answered on the source lines retrieved for that question
+        instead of the whole source, so that QA cost does not grow with the length of the source.
+
+        Args:
+            pairs (List[Tuple[Document, Document]]): (source, summary) pairs
+            total_questions (List[List[Dict]]): questions generated from the summary of each pair
+
+        Returns:
+            List[Tuple[List[Dict], List[Dict]]]: answers based on source and answers based on summary of each pair
+
+        """
+        documents = [document for pair in pairs for document in pair]
+
+        # context windows are kept in each document and reused by later calls
+        qa_cache = {document.text: document["qa"] for document in documents if "qa" in document}
+
+        if self.retrieval_top_k is None:
+            contexts = [[source.text, summary.text] for source, summary in pairs]
+            total_answers = self._answer(contexts, total_questions, qa_cache)
+        else:
+            # every question is a job of its own, whose source context is made of its retrieved lines
+            contexts, questions, owners = [], [], []
+            for pair_idx, ((source, summary), qa_pairs) in enumerate(zip(pairs, total_questions)):
+                for qa_pair in qa_pairs:
+                    lines = self._retrieve_lines(source, qa_pair["question"])
+                    context = source.text if len(lines) == len(self._lines(source)) else " ".join(lines)
+                    contexts.append([context, summary.text])
+                    questions.append([qa_pair])
+                    owners.append(pair_idx)
+
+            total_answers = [([], []) for _ in pairs]
+            answers = self._answer(contexts, questions, qa_cache)
+            for pair_idx, (source_answers, summary_answers) in zip(owners, answers):
+                total_answers[pair_idx][0].extend(source_answers)
+                total_answers[pair_idx][1].extend(summary_answers)
+
+        for document in documents:
+            if document.text in qa_cache:
+                document["qa"] = qa_cache[document.text]
+
+        return total_answers
+
+    def _answer(self, total_contexts: List[List[str]], total_questions: List[List[Dict]], cache: Dict) -> List:
+        with self.profiler.stage("qa") as counters:
+            keys = [
+                (context, qa_pair["question"])
+                for contexts, questions in zip(total_contexts, total_questions)
+                for context in contexts
+                for qa_pair in questions
+            ]
+
+            def answer(missing: List[Tuple[str, str]]) -> List[str]:
+                # questions of the same context are answered together, as a job of their own
+                jobs = {}
+                for context, question in missing:
+                    jobs.setdefault(context, []).append({"question": question, "answer": ""})
+
+                if counters is not None:
+                    counters["qa_contexts"] += sum(context not in cache for context in jobs)
+
+                total_answers = self._model("qa")([[context] for context in jobs], list(jobs.values()), cache)
+                predictions = {
+                    (context, qa_pair["question"]): qa_pair["prediction"]
+                    for context, (answers,) in zip(jobs, total_answers)
+                    for qa_pair in answers
+                }
+
+                if counters is not None:
+                    for context, questions in jobs.items():
+                        counters["questions_answered"] += len(questions)
+                        counters["qa_features"] += len(questions) * len(cache[context]["windows"])
+
+                return [predictions[key] for key in missing]
+
+            predictions = iter(self._stored("qa", keys, answer))
+            total_answers = []
+            for contexts, questions in zip(total_contexts, total_questions):
+                total_answers.append([[{
+                    "question": qa_pair["question"],
+                    "answer": qa_pair["answer"],
+                    "prediction": next(predictions),
+                } for qa_pair in questions] for _ in contexts])
+
+        return total_answers
+
+    def _bert_source_lines(self, source: Document, summary_lines: List[str]) -> List[List[str]]:
+        """
+        Select source lines each summary line is matched against in BERTScore
+
+        Args:
+            source (Document): source document
+            summary_lines (List[str]): segmented summary lines
+
+        Returns:
+            List[List[str]]: source lines of each summary line, which are every source line, or the lines retrieved
+                for that summary line if `retrieval_top_k` is set
+
+        """
+        if self.retrieval_top_k is None:
+            return [self._lines(source) for _ in summary_lines]
+
+        return [self._retrieve_lines(source, summary_line) for summary_line in summary_lines]
+
+    def _print_qas(self, mode: str, questions: List[Dict]):
+        logging.info("Answers based on %s (Questions are generated from Summary)", mode.capitalize())
+        for question in questions:
+            logging.info("[Q] %s\t[Pred] %s", question["question"], question["prediction"])
+        logging.info("")
+
+    def extract_qas(
+        self,
+        source: Union[str, Document],
+        summary: Union[str, Document],
+        source_ents: List = None,
+        summary_ents: List = None,
+        verbose: bool = False,
+        device: str = "cpu",
+    ) -> float:
+        """
+        Extract Question & Answering Pair generated from Question Generation module
+
+            See also https://arxiv.org/abs/2004.04228
+
+        Args:
+            source (Union[str, Document]): original source
+            summary (Union[str, Document]): generated summary
+            source_ents (List, optional): named entities extracted from source. Defaults to None.
+            summary_ents (List, optional): named entities extracted from source. Defaults to None.
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+
+        """
+        self._load_qg(device)
+        self._load_qa(device)
+
+        source = self._document(source)
+        summary = self._document(summary)
+
+        if source_ents is not None:
+            source["entities"] = source_ents
+
+        if summary_ents is not None:
+            summary["entities"] = summary_ents
+
+        summary_qas = summary.memoize(
+            "questions",
+            lambda: self._generate_questions([self._lines(summary)], [self._entities(summary, device)])[0],
+        )
+        source_answers, summary_answers = self._answer_questions([(source, summary)], [summary_qas])[0]
+
+        if verbose:
+            self._print_qas("source", source_answers)
+            self._print_qas("summary", summary_answers)
+
+        qa_score = score_qags(source_answers, summary_answers)
+        logging.info("QAGS Score: %s\n", qa_score)
+
+        return qa_score
+
+    def _generate_questions(self, total_lines: List[List[str]], total_entities: List[List[List[Dict]]]) -> List:
+        with self.profiler.stage("qg") as counters:
+            # like the prompts of the QG model, a question is generated for every unique entity of each line
+            total_prompts = [[
+                (line, word)
+                for line, line_entities in zip(lines, entities)
+                for word in dict.fromkeys(entity["word"] for entity in line_entities)
+            ] for lines, entities in zip(total_lines, total_entities)]
+
+            def generate(missing: List[Tuple[str, str]]) -> List[str]:
+                if counters is not None:
+                    counters["questions"] += len(missing)
+
+                total_qa_pairs = self._model("qg")(
+                    [[line] for line, _ in missing],
+                    [[[{"word": word}]] for _, word in missing],
+                )
+                return [qa_pairs[0]["question"] for qa_pairs in total_qa_pairs]
+
+            questions = iter(self._stored("qg", [prompt for prompts in total_prompts for prompt in prompts], generate))
+            total_questions = [[{
+                "question": next(questions),
+                "answer": word,
+            } for _, word in prompts] for prompts in total_prompts]
+
+        return total_questions
+
+    def _question_candidates(self, summary: Document, device: str = "cpu") -> List[Tuple[int, Dict]]:
+        """
+        List entities questions can be generated for, most informative first
+
+        Entities mentioned more often in the summary come first, then entities of types earlier in
+        `Config.QG_ENTITY_PRIORITY`, then earlier entities.
+
+        Args:
+            summary (Document): generated summary
+            device (str): device info
+
+        Returns:
+            List[Tuple[int, Dict]]: (line index, entity) of each unique entity of each line
+
+        """
+        candidates = []
+        for line_idx, line_entities in enumerate(self._entities(summary, device)):
+            dedup = {}
+            for entity in line_entities:
+                dedup.setdefault(entity["word"], entity)
+            candidates.extend((line_idx, entity) for entity in dedup.values())
+
+        priority = self.config.QG_ENTITY_PRIORITY
+        mentions = Counter(entity["word"] for _, entity in candidates)
+
+        order = sorted(
+            range(len(candidates)),
+            key=lambda i: (
+                -mentions[candidates[i][1]["word"]],
+                priority.index(candidates[i][1]["entity_group"])
+                if candidates[i][1]["entity_group"] in priority else len(priority),
+                i,
+            ),
+        )
+        return [candidates[i] for i in order]
+
+    def _estimate_qas_batch(
+        self,
+        pairs: List[Tuple[Document, Document]],
+        device: str = "cpu",
+        verbose: bool = False,
+    ) -> List[Dict]:
+        """
+        Estimate QAGS score of multiple pairs within the question budget
+
+        Questions are generated and answered in rounds of `question_round_size` (a single batched stream for every
+        pair still being questioned). A pair stops being questioned once the confidence interval of its estimate
+        is narrower than `qa_tolerance` on each side, or once `question_budget` questions have been asked.
+
+        Args:
+            pairs (List[Tuple[Document, Document]]): (source, summary) pairs
+            device (str): device info
+            verbose (bool, optional): print verbose option. Defaults to False.
+
+        Returns:
+            List[Dict]: QAGS estimate, its interval and the number of questions used of each pair
+
+        """
+        self._load_qg(device)
+        self._load_qa(device)
+
+        total_candidates = [self._question_candidates(summary, device) for _, summary in pairs]
+        budget = self.question_budget
+        if budget is None:
+            budget = max((len(candidates) for candidates in total_candidates), default=0)
+        total_scores = [[] for _ in pairs]
+        total_answers = [([], []) for _ in pairs]
+
+        active = [pair_idx for pair_idx, candidates in enumerate(total_candidates) if candidates]
+        while active:
+            rounds = []
+            for pair_idx in active:
+                asked = len(total_scores[pair_idx])
+                size = min(self.question_round_size, budget - asked)
+                rounds.append(total_candidates[pair_idx][asked:asked + size])
+
+            # QG only builds prompts for the entities of the current round
+            total_lines = [self._lines(pairs[pair_idx][1]) for pair_idx in active]
+            total_entities = []
+            for lines, candidates in zip(total_lines, rounds):
+                line_entities = [[] for _ in lines]
+                for line_idx, entity in candidates:
+                    line_entities[line_idx].append(entity)
+                total_entities.append(line_entities)
+
+            total_questions = self._generate_questions(total_lines, total_entities)
+            answers = self._answer_questions([pairs[pair_idx] for pair_idx in active], total_questions)
+
+            still_active = []
+            for pair_idx, questions, (source_answers, summary_answers) in zip(active, total_questions, answers):
+                total_answers[pair_idx][0].extend(source_answers)
+                total_answers[pair_idx][1].extend(summary_answers)
+                total_scores[pair_idx].extend(
+                    f1_score(source_answer["prediction"], summary_answer["prediction"])
+                    for source_answer, summary_answer in zip(source_answers, summary_answers))
+
+                # every candidate yields exactly one question, so the number of scores tracks progress
+                asked = len(total_scores[pair_idx])
+                estimate, low, high = qags_interval(total_scores[pair_idx], len(total_candidates[pair_idx]))
+                if (asked < min(budget, len(total_candidates[pair_idx])) and
+                        max(estimate - low, high - estimate) > self.qa_tolerance):
+                    still_active.append(pair_idx)
+
+            active = still_active
+
+        estimates = []
+        for candidates, scores, answers in zip(total_candidates, total_scores, total_answers):
+            source_answers, summary_answers = answers
+            if verbose:
+                self._print_qas("source", source_answers)
+                self._print_qas("summary", summary_answers)
+
+            estimate, low, high = qags_interval(scores, len(candidates))
+            logging.info(
+                "QAGS Score: %s (%s of %s questions, interval: [%s, %s])\n",
+                estimate,
+                len(scores),
+                len(candidates),
+                low,
+                high,
+            )
+            estimates.append({
+                "qa_score": estimate,
+                "qa_score_low": low,
+                "qa_score_high": high,
+                "qa_questions": len(scores),
+            })
+
+        return estimates
+
+    def estimate_qas(
+        self,
+        source: Union[str, Document],
+        summary: Union[str, Document],
+        verbose: bool = False,
+        device: str = "cpu",
+    ) -> Dict:
+        """
+        Estimate QAGS score within the question budget (or with every question, if there is no budget)
+
+        Args:
+            source (Union[str, Document]): original source
+            summary (Union[str, Document]): generated summary
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+
+        Returns:
+            Dict: QAGS estimate (`qa_score`), bounds of its confidence interval (`qa_score_low`, `qa_score_high`)
+                and number of questions used (`qa_questions`)
+
+        """
+        return self._estimate_qas_batch([(self._document(source), self._document(summary))], device, verbose)[0]
+
+    def calculate_bert_score(
+        self,
+        source: Union[str, Document],
+        summary: Union[str, Document],
+        device: str = "cpu",
+    ) -> Tuple[float, float, float]:
+        """
+        Calculate BERTScore
+
+            See also https://arxiv.org/abs/2005.03754
+
+        Args:
+            source (Union[str, Document]): original source
+            summary (Union[str, Document]): generated summary
+            device (str): device info
+
+        Returns:
+            Tuple[float]: (Precision, Recall, F1) BERTScore tuple
+
+        """
+        self._load_bert_score(device)
+
+        source = self._document(source)
+        summary = self._document(summary)
+
+        summary_lines = self._lines(summary)
+
+        # every line is encoded only once, then matched against all (or its retrieved) source lines at once
+        (precision, recall, f1), = self._match_pairs([(source, summary)])
+
+        total_precision = float(precision.mean()) if len(summary_lines) > 0 else 0.0
+        total_recall = float(recall.mean()) if len(summary_lines) > 0 else 0.0
+        total_f1 = float(f1.mean()) if len(summary_lines) > 0 else 0.0
+
+        logging.info("<BERTScore Score>\nPrecision: %s\nRecall: %s\nF1: %s", total_precision, total_recall, total_f1)
+
+        return total_precision, total_recall, total_f1
+
+    def _fact_scores_batch(self, pairs: List[Tuple[Document, Document]], device: str = "cpu") -> List[float]:
+        """
+        Calculate fact score of multiple pairs, running Relation Extraction once per side for all pairs
+
+        Args:
+            pairs (List[Tuple[Document, Document]]): (source, summary) pairs
+            device (str): device info
+
+        Returns:
+            List[float]: fact score of each pair
+
+        """
+        total_summary_facts = self._facts([summary for _, summary in pairs], device)
+        total_source_facts = self._facts_with_heads_batch(
+            [source for source, _ in pairs],
+            [{fact[0] for fact in summary_facts} for summary_facts in total_summary_facts],
+            device,
+        )
+
+        fact_scores = []
+        for source_facts, summary_facts in zip(total_source_facts, total_summary_facts):
+            fact_score = self._compare_facts(source_facts, summary_facts)[-1]
+            logging.info("Fact Score: %s", fact_score)
+            fact_scores.append(fact_score)
+
+        return fact_scores
+
+    def _questions_batch(self, documents: List[Document], device: str = "cpu") -> List[List[Dict]]:
+        """
+        Generate questions of documents, running Question Generation once for all documents not analyzed yet
+
+        Args:
+            documents (List[Document]): documents to be analyzed
+            device (str): device info
+
+        Returns:
+            List[List[Dict]]: question and answer (entity) pairs of each document
+
+        """
+        self._load_qg(device)
+
+        missing = list({id(document): document for document in documents if "questions" not in document}.values())
+        total_questions = self._generate_questions(
+            [self._lines(document) for document in missing],
+            [self._entities(document, device) for document in missing],
+        )
+
+        for document, questions in zip(missing, total_questions):
+            document["questions"] = questions
+
+        return [document["questions"] for document in documents]
+
+    def _qa_scores_batch(self, pairs: List[Tuple[Document, Document]], device: str = "cpu") -> List[Dict]:
+        """
+        Calculate QAGS score of multiple pairs, answering questions of every pair in a single batched stream
+
+        Args:
+            pairs (List[Tuple[Document, Document]]): (source, summary) pairs
+            device (str): device info
+
+        Returns:
+            List[Dict]: QAGS `PairScores` fields of each pair (including the interval with a question budget)
+
+        """
+        self._load_qa(device)
+
+        if self.question_budget is not None:
+            return self._estimate_qas_batch(pairs, device)
+
+        total_questions = self._questions_batch([summary for _, summary in pairs], device)
+        total_answers = self._answer_questions(pairs, total_questions)
+
+        qa_scores = []
+        for source_answers, summary_answers in total_answers:
+            qa_score = score_qags(source_answers, summary_answers)
+            logging.info("QAGS Score: %s\n", qa_score)
+            qa_scores.append({"qa_score": qa_score})
+
+        return qa_scores
+
+    def _bert_scores_batch(
+        self,
+        pairs: List[Tuple[Document, Document]],
+        device: str = "cpu",
+    ) -> List[Tuple[float, float, float]]:
+        """
+        Calculate BERTScore of multiple pairs, encoding lines of every pair in a single batched stream
+
+        Args:
+            pairs (List[Tuple[Document, Document]]): (source, summary) pairs
+            device (str): device info
+
+        Returns:
+            List[Tuple[float, float, float]]: (Precision, Recall, F1) BERTScore tuple of each pair
+
+        """
+        self._load_bert_score(device)
+
+        if not pairs:
+            return []
+
+        total_scores = self._match_pairs(pairs)
+
+        bert_scores = []
+        for scores in total_scores:
+            precision, recall, f1 = [float(score.mean()) if len(score) > 0 else 0.0 for score in scores]
+            logging.info("<BERTScore Score>\nPrecision: %s\nRecall: %s\nF1: %s", precision, recall, f1)
+            bert_scores.append((precision, recall, f1))
+
+        return bert_scores
+
+    def _match_pairs(self, pairs: List[Tuple[Document, Document]]) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Match summary lines of multiple pairs against their source lines in a single BERTScore call
+
+        Args:
+            pairs (List[Tuple[Document, Document]]): (source, summary) pairs
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray, np.ndarray]]: (Precision, Recall, F1) of each summary line of each pair
+
+        """
+        total_summary_lines = [self._lines(summary) for _, summary in pairs]
+        summary_caches = [summary.memoize("bert_score", dict) for _, summary in pairs]
+        source_caches = [source.memoize("bert_score", dict) for source, _ in pairs]
+
+        if self.retrieval_top_k is None:
+            return self._match_lines(
+                total_summary_lines,
+                [self._lines(source) for source, _ in pairs],
+                summary_caches,
+                source_caches,
+            )
+
+        # every summary line is a job of its own, matched only against the source lines retrieved for it
+        jobs = [
+            (pair_idx, summary_line, source_lines)
+            for pair_idx, ((source, _), summary_lines) in enumerate(zip(pairs, total_summary_lines))
+            for summary_line, source_lines in zip(summary_lines, self._bert_source_lines(source, summary_lines))
+        ]
+        total_scores = [([], [], []) for _ in pairs]
+
+        if jobs:
+            scores = self._match_lines(
+                [[summary_line] for _, summary_line, _ in jobs],
+                [source_lines for _, _, source_lines in jobs],
+                [summary_caches[pair_idx] for pair_idx, _, _ in jobs],
+                [source_caches[pair_idx] for pair_idx, _, _ in jobs],
+            )
+            for (pair_idx, _, _), line_scores in zip(jobs, scores):
+                for pair_scores, score in zip(total_scores[pair_idx], line_scores):
+                    pair_scores.extend(score)
+
+        return [tuple(np.array(pair_scores) for pair_scores in columns) for columns in total_scores]
+
+    def _match_lines(
+        self,
+        total_summary_lines: List[List[str]],
+        total_source_lines: List[List[str]],
+        summary_caches: List[Dict],
+        source_caches: List[Dict],
+    ) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        with self.profiler.stage("bert_score") as counters:
+            if counters is not None:
+                groups = zip(total_summary_lines + total_source_lines, summary_caches + source_caches)
+                missing = {line: cache for lines, cache in groups for line in lines if line not in cache}
+
+            bert_score = self._model("bert_score")
+            total_scores = bert_score(total_summary_lines, total_source_lines, summary_caches, source_caches)
+
+            if counters is not None:
+                counters["lines_encoded"] += len(missing)
+                counters["tokens_encoded"] += sum(len(cache[line][0]) for line, cache in missing.items())
+
+        return total_scores
+
+    def _collect_profile(self):
+        return self.profiler.collect() if self.profile else contextlib.nullcontext()
+
+    def _select_metrics(self, metrics: Optional[Iterable[str]]) -> Tuple[str, ...]:
+        return self.metrics if metrics is None else select_metrics(metrics)
+
+    def score_batch(
+        self,
+        pairs: List[Tuple[Union[str, Document], Union[str, Document]]],
+        device: str = "cpu",
+        metrics: Optional[Iterable[str]] = None,
+    ) -> List[PairScores]:
+        """
+        Score multiple pairs stage by stage, so that every model runs once over all pairs
+
+        Args:
+            pairs (List[Tuple[Union[str, Document], Union[str, Document]]]): (source, summary) pairs
+            device (str): device info
+            metrics (Iterable[str], optional): metric families to be calculated (those of the object if None).
+                Defaults to None.
+
+        Returns:
+            List[PairScores]: scores of each pair
+
+        """
+        metrics = self._select_metrics(metrics)
+        pairs = [(self._document(source), self._document(summary)) for source, summary in pairs]
+        total_scores = [{} for _ in pairs]
+
+        with self._collect_profile() as profile:
+            if "fact_score" in metrics or "qa_score" in metrics:
+                self._entities_batch([document for pair in pairs for document in pair], device)
+
+            if "fact_score" in metrics:
+                for scores, fact_score in zip(total_scores, self._fact_scores_batch(pairs, device)):
+                    scores["fact_score"] = fact_score
+
+            if "qa_score" in metrics:
+                for scores, qa_scores in zip(total_scores, self._qa_scores_batch(pairs, device)):
+                    scores.update(qa_scores)
+
+            if "rouge" in metrics:
+                for scores, (source, summary) in zip(total_scores, pairs):
+                    scores["rouge_1"], scores["rouge_2"], scores["rouge_l"] = self.calculate_rouge(source, summary)
+
+            if "bert_score" in metrics:
+                for scores, bert_score in zip(total_scores, self._bert_scores_batch(pairs, device)):
+                    scores["bert_score_precision"], scores["bert_score_recall"], scores["bert_score_f1"] = bert_score
+
+        # stages run once for the whole batch, so every pair gets the profile of the batch
+        if profile is not None:
+            profile.counters["pairs"] += len(pairs)
+            for scores in total_scores:
+                scores["profile"] = profile.to_dict()
+
+        return [PairScores(**scores) for scores in total_scores]
+
+    def _score_pair(
+        self,
+        source: Document,
+        summary: Document,
+        verbose: bool = False,
+        device: str = "cpu",
+        metrics: Tuple[str, ...] = tuple(Config.METRICS),
+    ) -> PairScores:
+        """
+        Calculate selected scores of a single (source, summary) pair
+
+        Args:
+            source (Document): original source
+            summary (Document): generated summary
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+            metrics (Tuple[str, ...], optional): metric families to be calculated. Defaults to every family.
+
+        Returns:
+            PairScores: fact, QAGS, ROUGE and BERTScore scores of the pair
+
+        """
+        scores = {}
+
+        with self._collect_profile() as profile:
+            if "fact_score" in metrics:
+                _, _, scores["fact_score"] = self.extract_facts(source, summary, verbose, device)
+
+            if "qa_score" in metrics:
+                if self.question_budget is None:
+                    scores["qa_score"] = self.extract_qas(source, summary, verbose=verbose, device=device)
+                else:
+                    scores.update(self.estimate_qas(source, summary, verbose=verbose, device=device))
+
+            if "rouge" in metrics:
+                scores["rouge_1"], scores["rouge_2"], scores["rouge_l"] = self.calculate_rouge(source, summary)
+
+            if "bert_score" in metrics:
+                (
+                    scores["bert_score_precision"],
+                    scores["bert_score_recall"],
+                    scores["bert_score_f1"],
+                ) = self.calculate_bert_score(source, summary, device)
+
+        if profile is not None:
+            scores["profile"] = profile.to_dict()
+
+        return PairScores(**scores)
+
+    def score_candidates(
+        self,
+        source: Union[str, Document],
+        summaries: List[str],
+        verbose: bool = False,
+        device: str = "cpu",
+        metrics: Optional[Iterable[str]] = None,
+    ) -> List[Dict]:
+        """
+        Score multiple candidate summaries of a single source (e.g. for reranking)
+
+        Source-side artifacts (segmented lines, entities, facts, ROUGE n-gram tables,
+        BERTScore embeddings and QA context windows) are computed once and shared by every candidate.
+
+        Args:
+            source (Union[str, Document]): original source
+            summaries (List[str]): candidate summaries
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+            metrics (Iterable[str], optional): metric families to be calculated (those of the object if None).
+                Defaults to None.
+
+        Returns:
+            List[Dict]: scores of each candidate
+
+        """
+        metrics = self._select_metrics(metrics)
+        source = self._document(source)
+        return [
+            self._score_pair(source, Document(summary), verbose, device, metrics).to_dict() for summary in summaries
+        ]
+
+    def _iter_scores(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        verbose: bool = False,
+        device: str = "cpu",
+        remaining: Optional[Counter] = None,
+        metrics: Tuple[str, ...] = tuple(Config.METRICS),
+    ) -> Iterator[PairScores]:
+        """
+        Score pairs one by one (or chunk by chunk with `stage_chunk_size`), reusing the document of sources
+        shared by multiple pairs
+
+        Within a chunk, every stage runs over all pairs of the chunk before the next stage starts, so that models
+        get larger batches while scores of each pair stay the same. Verbose scoring is always pair by pair.
+
+        Args:
+            pairs (Iterable[Tuple[str, str]]): (source, summary) pairs
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+            remaining (Counter, optional): number of pairs of each source, used to release a source document
+                after its last pair. If None, only the document of the latest source is kept. Defaults to None.
+            metrics (Tuple[str, ...], optional): metric families to be calculated. Defaults to every family.
+
+        Returns:
+            Iterator[PairScores]: scores of each pair
+
+        """
+        source_documents = {}
+        stage_major = self.stage_chunk_size is not None and not verbose
+
+        for chunk in iter_chunks(pairs, self.stage_chunk_size if stage_major else 1):
+            documents = []
+            for source, summary in chunk:
+                if remaining is None and source not in source_documents:
+                    source_documents.clear()
+
+                documents.append((source_documents.setdefault(source, Document(source)), Document(summary)))
+
+            if stage_major:
+                yield from self.score_batch(documents, device, metrics)
+            else:
+                for source, summary in documents:
+                    yield self._score_pair(source, summary, verbose, device, metrics)
+
+            if remaining is not None:
+                for source, _ in chunk:
+                    remaining[source] -= 1
+                    if remaining[source] == 0:
+                        del source_documents[source]
+
+    def _worker_pool(self) -> WorkerPool:
+        if self.worker_pool is None:
+            self.worker_pool = WorkerPool(self.workers, self.worker_kwargs, self.threads_per_worker)
+        return self.worker_pool
+
+    def close(self):
+        """
+        Shut down worker processes, if any
+
+        Worker processes are also shut down when leaving the object as a context manager, or when the object
+        is garbage collected.
+
+        """
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+
+    def __enter__(self) -> "FactSumm":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def iter_scores(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        verbose: bool = False,
+        device: str = "cpu",
+        metrics: Optional[Iterable[str]] = None,
+    ) -> Iterator[PairScores]:
+        """
+        Lazily score (source, summary) pairs, yielding each result as soon as its pair is finished
+
+        Consecutive pairs sharing the same source reuse its analysis.
+
+        Args:
+            pairs (Iterable[Tuple[str, str]]): (source, summary) pairs
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+            metrics (Iterable[str], optional): metric families to be calculated (those of the object if None).
+                Defaults to None.
+
+        Returns:
+            Iterator[PairScores]: scores of each pair
+
+        """
+        metrics = self._select_metrics(metrics)
+
+        if self.workers > 1:
+            return self._worker_pool().imap(pairs, verbose, device, metrics)
+
+        return self._iter_scores(pairs, verbose, device, metrics=metrics)
+
+    def score_pairs(
+        self,
+        sources: Union[List[str], str],
+        summaries: Union[List[str], str],
+        verbose: bool = False,
+        device: str = "cpu",
+        columnar: bool = False,
+        metrics: Optional[Iterable[str]] = None,
+    ) -> Union[List[Dict], Dict[str, np.ndarray]]:
+        """
+        Calculate scores of each (source, summary) pair
+
+        Args:
+            sources (Union[List[str], str]): original sources
+            summaries (Union[List[str], str]): generated summaries
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+            columnar (bool, optional): return a NumPy array per metric instead of a dict per pair. Defaults to False.
+            metrics (Iterable[str], optional): metric families to be calculated (those of the object if None).
+                Defaults to None.
+
+        Returns:
+            Union[List[Dict], Dict[str, np.ndarray]]: scores of each pair (or each metric, if columnar)
+
+        """
+        metrics = self._select_metrics(metrics)
+
+        if isinstance(sources, str):
+            sources = [sources]
+
+        if  isinstance(summaries, str):
+            summaries = [summaries]
+
+        if len(sources) != len(summaries):
+            raise ValueError("`sources` and `summaries` should have the same number of elements!")
+
+        if self.workers > 1:
+            results = self._worker_pool().imap(zip(sources, summaries), verbose, device, metrics)
+        else:
+            # pairs sharing the same source reuse its document, which is released after its last pair
+            results = self._iter_scores(zip(sources, summaries), verbose, device, Counter(sources), metrics)
+
+        if not columnar:
+            return [scores.to_dict() for scores in results]
+
+        fields = metric_fields(metrics, self.question_budget is not None)
+        columns = {field: np.empty(len(sources), dtype=np.float64) for field in fields}
+        for i, scores in enumerate(results):
+            for field in fields:
+                columns[field][i] = getattr(scores, field)
+
+        return columns
+
+    def __call__(
+        self,
+        sources: Union[List[str], str],
+        summaries: Union[List[str], str],
+        verbose: bool = False,
+        device: str = "cpu",
+        metrics: Optional[Iterable[str]] = None,
+    ) -> Dict:
+        columns = self.score_pairs(sources, summaries, verbose, device, columnar=True, metrics=metrics)
+
+        averages = PairScores(**{
+            field: float(column.mean()) if len(column) > 0 else 0.0
+            for field, column in columns.items()
+        })
+        return averages.to_dict()
@@ -0,0 +1,404 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from factsumm.factsumm import FactSumm
+from factsumm.utils.document import Document
+from factsumm.utils.utils import PairScores
+
+logger = logging.getLogger("factsumm.server")
+
+WARMUP_TEXT = "Lionel Messi plays for Barcelona."
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class Job:
+
+    def __init__(self, source: str, summary: str, deadline: Optional[float], future: asyncio.Future):
+        """
+        Single (source, summary) pair travelling through the stages of the server
+
+        Args:
+            source (str): original source
+            summary (str): generated summary
+            deadline (float, optional): loop time by which the pair should be scored (no budget if None)
+            future (asyncio.Future): future resolved with the scores of the pair
+
+        """
+        self.source = Document(source)
+        self.summary = Document(summary)
+        self.deadline = deadline
+        self.future = future
+        self.scores: Dict = {}
+
+
+class ScoringServer:
+
+    def __init__(
+        self,
+        factsumm: FactSumm,
+        device: str = "cpu",
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        max_queue_size: int = 256,
+        default_budget_ms: Optional[float] = None,
+    ):
+        """
+        Scoring server which micro-batches concurrent requests per stage
+
+        Each stage (NER, RE, QG, QA, ROUGE, BERTScore) needed by the selected metrics has its own bounded queue
+        and thread. A stage waits for at most `max_wait_ms` after the first queued pair to fill a batch, and
+        flushes earlier when a pair would otherwise miss its latency budget. Full queues block upstream stages,
+        and requests are rejected when the first queue is full.
+
+        Args:
+            factsumm (FactSumm): FactSumm object used to score pairs
+            device (str, optional): device info. Defaults to "cpu".
+            max_batch_size (int, optional): maximum number of pairs per stage batch. Defaults to 16.
+            max_wait_ms (float, optional): maximum time a stage waits to fill a batch. Defaults to 10.0.
+            max_queue_size (int, optional): maximum number of pairs waiting for each stage. Defaults to 256.
+            default_budget_ms (float, optional): latency budget of requests without `budget_ms`. Defaults to None.
+
+        """
+        self.factsumm = factsumm
+        self.device = device
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.default_budget_ms = default_budget_ms
+
+        # only the stages of metrics selected by the FactSumm object are run
+        metrics = factsumm.metrics
+        self.stages = []
+
+        if "fact_score" in metrics or "qa_score" in metrics:
+            self.stages.append(("ner", self._ner))
+
+        if "fact_score" in metrics:
+            self.stages.append(("fact_score", self._fact_scores))
+
+        if "qa_score" in metrics and factsumm.question_budget is not None:
+            # budgeted questions are generated round by round, together with their answers
+            self.stages.append(("qa_score", self._qa_scores))
+        elif "qa_score" in metrics:
+            self.stages.extend([("qg", self._questions), ("qa_score", self._qa_scores)])
+
+        if "rouge" in metrics:
+            self.stages.append(("rouge", self._rouge_scores))
+
+        if "bert_score" in metrics:
+            self.stages.append(("bert_score", self._bert_scores))
+
+        self.queues: List[asyncio.Queue] = []
+        self.tasks: List[asyncio.Task] = []
+
+        # every stage runs its model from its own thread, so that different stages overlap
+        self.executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=name) for name, _ in self.stages]
+
+        # in low-memory mode, a stage releases the models of other stages, so stages run one at a time instead
+        if factsumm.low_memory:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stages")
+            self.executors = [executor] * len(self.stages)
+
+    def _ner(self, pairs: List[Tuple[Document, Document]]) -> List:
+        self.factsumm._entities_batch([document for pair in pairs for document in pair], self.device)
+        return [None] * len(pairs)
+
+    def _fact_scores(self, pairs: List[Tuple[Document, Document]]) -> List[float]:
+        return self.factsumm._fact_scores_batch(pairs, self.device)
+
+    def _questions(self, pairs: List[Tuple[Document, Document]]) -> List:
+        self.factsumm._questions_batch([summary for _, summary in pairs], self.device)
+        return [None] * len(pairs)
+
+    def _qa_scores(self, pairs: List[Tuple[Document, Document]]) -> List[Dict]:
+        return self.factsumm._qa_scores_batch(pairs, self.device)
+
+    def _rouge_scores(self, pairs: List[Tuple[Document, Document]]) -> List[Tuple[float, float, float]]:
+        return [self.factsumm.calculate_rouge(source, summary) for source, summary in pairs]
+
+    def _bert_scores(self, pairs: List[Tuple[Document, Document]]) -> List[Tuple[float, float, float]]:
+        return self.factsumm._bert_scores_batch(pairs, self.device)
+
+    def _pair_scores(self, scores: Dict) -> PairScores:
+        fields = {}
+
+        if "fact_score" in scores:
+            fields["fact_score"] = scores["fact_score"]
+
+        if "qa_score" in scores:
+            fields.update(scores["qa_score"])
+
+        if "rouge" in scores:
+            fields["rouge_1"], fields["rouge_2"], fields["rouge_l"] = scores["rouge"]
+
+        if "bert_score" in scores:
+            fields["bert_score_precision"], fields["bert_score_recall"], fields["bert_score_f1"] = scores["bert_score"]
+
+        return PairScores(**fields)
+
+    def _flush_time(self, job: Job, stage_idx: int, now: float) -> float:
+        if job.deadline is None:
+            return float("inf")
+
+        # remaining slack of the pair is evenly shared by its remaining stages
+        return now + max(job.deadline - now, 0.0) / (len(self.stages) - stage_idx)
+
+    async def _run_stage(self, stage_idx: int):
+        loop = asyncio.get_running_loop()
+        name, func = self.stages[stage_idx]
+        queue = self.queues[stage_idx]
+
+        while True:
+            job = await queue.get()
+            batch = [job]
+
+            now = loop.time()
+            flush_at = min(now + self.max_wait, self._flush_time(job, stage_idx, now))
+
+            while len(batch) < self.max_batch_size:
+                timeout = flush_at - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    job = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                batch.append(job)
+                flush_at = min(flush_at, self._flush_time(job, stage_idx, loop.time()))
+
+            # pairs whose request was already abandoned (e.g. disconnected client) are dropped
+            batch = [job for job in batch if not job.future.done()]
+            if not batch:
+                continue
+
+            try:
+                results = await loop.run_in_executor(
+                    self.executors[stage_idx],
+                    func,
+                    [(job.source, job.summary) for job in batch],
+                )
+            except Exception as e:
+                logger.exception("Failed to run `%s` stage on %s pairs", name, len(batch))
+                for job in batch:
+                    # the request may have been abandoned meanwhile
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                continue
+
+            for job, result in zip(batch, results):
+                job.scores[name] = result
+
+                if stage_idx + 1 < len(self.stages):
+                    # waiting for room in the next queue propagates backpressure upstream
+                    await self.queues[stage_idx + 1].put(job)
+                elif not job.future.done():
+                    job.future.set_result(self._pair_scores(job.scores))
+
+    async def score(self, source: str, summary: str, budget_ms: Optional[float] = None) -> PairScores:
+        """
+        Score a single pair through the micro-batched stages
+
+        Args:
+            source (str): original source
+            summary (str): generated summary
+            budget_ms (float, optional): latency budget of the request (server default if None). Defaults to None.
+
+        Raises:
+            asyncio.QueueFull: if the server is saturated
+
+        Returns:
+            PairScores: scores of the pair
+
+        """
+        loop = asyncio.get_running_loop()
+        budget_ms = budget_ms if budget_ms is not None else self.default_budget_ms
+        deadline = loop.time() + budget_ms / 1000 if budget_ms is not None else None
+
+        job = Job(source, summary, deadline, loop.create_future())
+        self.queues[0].put_nowait(job)
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+
+    async def _handle_request(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        if path == "/health":
+            health = {"status": "ok", "queued": [queue.qsize() for queue in self.queues]}
+            if self.factsumm.sentence_cache is not None:
+                health["sentence_cache"] = self.factsumm.sentence_cache.stats()
+            return 200, health
+
+        if path != "/score":
+            return 404, {"error": f"Unknown path `{path}`"}
+
+        if method != "POST":
+            return 405, {"error": "`/score` only accepts POST requests"}
+
+        try:
+            request = json.loads(body)
+            source, summary = request["source"], request["summary"]
+            budget_ms = request.get("budget_ms", None)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400, {"error": "Request body should be a JSON object with `source` and `summary`"}
+
+        # booleans are integers in Python, but not budgets (and NaN is not positive either)
+        if budget_ms is not None and (isinstance(budget_ms, bool) or not isinstance(budget_ms, (int, float))
+                                      or not budget_ms > 0):
+            return 400, {"error": "`budget_ms` should be a positive number of milliseconds"}
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        try:
+            scores = await self.score(source, summary, budget_ms)
+        except asyncio.QueueFull:
+            return 503, {"error": "Server is saturated, please retry later"}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+        return 200, {"scores": scores.to_dict(), "latency_ms": (loop.time() - start) * 1000}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, response = await self._handle_request(method, path, body)
+
+                payload = json.dumps(response, ensure_ascii=False).encode("utf-8")
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+
+                writer.write((
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode("latin-1") + payload)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """
+        Load every model and start stage workers
+
+        """
+        loop = asyncio.get_running_loop()
+
+        # every model is loaded (and warmed up) before the first request arrives
+        await loop.run_in_executor(None, self.factsumm.warmup, self.device)
+        await loop.run_in_executor(None, self.factsumm.score_batch, [(WARMUP_TEXT, WARMUP_TEXT)], self.device)
+
+        self.queues = [asyncio.Queue(maxsize=self.max_queue_size) for _ in self.stages]
+        self.tasks = [asyncio.create_task(self._run_stage(i)) for i in range(len(self.stages))]
+
+    async def stop(self):
+        """
+        Stop stage workers
+
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        for executor in set(self.executors):
+            executor.shutdown(wait=False)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000, unix_socket: Optional[str] = None):
+        """
+        Serve `POST /score` and `GET /health` over HTTP (TCP or Unix socket) until cancelled
+
+        Args:
+            host (str, optional): host to bind. Defaults to "127.0.0.1".
+            port (int, optional): port to bind. Defaults to 8000.
+            unix_socket (str, optional): path of the Unix socket to bind instead of TCP. Defaults to None.
+
+        """
+        await self.start()
+
+        if unix_socket is not None:
+            server = await asyncio.start_unix_server(self._handle_connection, path=unix_socket)
+            logger.info("Serving on unix socket %s", unix_socket)
+        else:
+            server = await asyncio.start_server(self._handle_connection, host, port)
+            logger.info("Serving on http://%s:%s", host, port)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def serve(
+    factsumm: FactSumm,
+    device: str = "cpu",
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    unix_socket: Optional[str] = None,
+    **kwargs,
+):
+    """
+    Run a scoring server with locally cached models only
+
+    Args:
+        factsumm (FactSumm): FactSumm object used to score pairs
+        device (str, optional): device info. Defaults to "cpu".
+        host (str, optional): host to bind. Defaults to "127.0.0.1".
+        port (int, optional): port to bind. Defaults to 8000.
+        unix_socket (str, optional): path of the Unix socket to bind instead of TCP. Defaults to None.
+        **kwargs: micro-batching options of `ScoringServer`
+
+    """
+    # models are never downloaded while serving
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+    # libraries imported before (e.g. by the caller) read these variables at import time
+    if "huggingface_hub" in sys.modules:
+        sys.modules["huggingface_hub"].constants.HF_HUB_OFFLINE = True
+
+    if "transformers" in sys.modules:
+        sys.modules["transformers"].utils.hub._is_offline_mode = True
+
+    server = ScoringServer(factsumm, device, **kwargs)
+
+    try:
+        asyncio.run(server.serve(host, port, unix_socket))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,182 @@
+import csv
+import json
+import logging
+import mmap
+import os
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+
+def infer_format(path: str) -> str:
+    """
+    Infer corpus format from file extension
+
+    Args:
+        path (str): path of the corpus
+
+    Returns:
+        str: one of `jsonl`, `csv` and `parquet`
+
+    """
+    extension = os.path.splitext(path)[-1].lower().lstrip(".")
+
+    if extension in ("jsonl", "json", "ndjson"):
+        return "jsonl"
+
+    if extension in ("csv", "tsv"):
+        return "csv"
+
+    if extension in ("parquet", "pq"):
+        return "parquet"
+
+    raise ValueError(f"Cannot infer corpus format of `{path}`, please specify one of {FORMATS}")
+
+
+def _iter_jsonl(path: str, skip: int) -> Iterator[Dict]:
+    if os.path.getsize(path) == 0:
+        return
+
+    # lines are read from a memory map, so only the current record is materialized
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = (line for line in iter(mm.readline, b"") if line.strip())
+
+        for line in islice(lines, skip, None):
+            yield json.loads(line)
+
+
+def _iter_csv(path: str, skip: int) -> Iterator[Dict]:
+    delimiter = "\t" if path.lower().endswith(".tsv") else ","
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from islice(csv.DictReader(f, delimiter=delimiter), skip, None)
+
+
+def _iter_parquet(path: str, skip: int, columns: Optional[List[str]], batch_size: int) -> Iterator[Dict]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        logging.warning("Reading Parquet files requires `pyarrow` (pip install factsumm[parquet])")
+        raise
+
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        # skipped batches are never converted into python objects
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+
+        yield from batch.slice(skip).to_pylist()
+        skip = 0
+
+
+def iter_records(
+    path: str,
+    corpus_format: Optional[str] = None,
+    skip: int = 0,
+    columns: Optional[List[str]] = None,
+    batch_size: int = 1024,
+) -> Iterator[Dict]:
+    """
+    Stream records of a JSONL, CSV or Parquet corpus with bounded memory
+
+    Args:
+        path (str): path of the corpus
+        corpus_format (str, optional): one of `jsonl`, `csv` and `parquet` (inferred from extension if None)
+        skip (int, optional): number of leading records to be skipped (e.g. already processed ones). Defaults to 0.
+        columns (List[str], optional): columns to be read (Parquet only). Defaults to None.
+        batch_size (int, optional): number of rows decoded at once (Parquet only). Defaults to 1024.
+
+    Returns:
+        Iterator[Dict]: iterator of records
+
+    """
+    corpus_format = corpus_format if corpus_format is not None else infer_format(path)
+
+    if corpus_format == "jsonl":
+        return _iter_jsonl(path, skip)
+
+    if corpus_format == "csv":
+        return _iter_csv(path, skip)
+
+    if corpus_format == "parquet":
+        return _iter_parquet(path, skip, columns, batch_size)
+
+    raise ValueError(f"Unsupported corpus format `{corpus_format}`, please specify one of {FORMATS}")
+
+
+def iter_chunks(records: Iterator[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    """
+    Group records into chunks
+
+    Args:
+        records (Iterator[Dict]): iterator of records
+        chunk_size (int): number of records per chunk
+
+    Returns:
+        Iterator[List[Dict]]: iterator of chunks
+
+    """
+    records = iter(records)
+
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Checkpoint:
+
+    def __init__(self, path: str):
+        """
+        Progress of a scoring job, written atomically after every chunk so that a killed job can be resumed
+
+        Args:
+            path (str): path of the checkpoint file
+
+        """
+        self.path = path
+        self.processed = 0
+        self.output_offset = 0
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.processed = state["processed"]
+            self.output_offset = state["output_offset"]
+
+    def verify(self, output_path: str) -> bool:
+        """
+        Check that the output file still holds every result recorded by the checkpoint
+
+        Args:
+            output_path (str): path of the output file
+
+        Returns:
+            bool: whether the job can be resumed from the checkpoint
+
+        """
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        return size >= self.output_offset
+
+    def update(self, processed: int, output_offset: int):
+        """
+        Record progress
+
+        Args:
+            processed (int): number of records processed so far
+            output_offset (int): size of the output file after the processed records were written
+
+        """
+        self.processed = processed
+        self.output_offset = output_offset
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"processed": processed, "output_offset": output_offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
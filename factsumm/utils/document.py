@@ -0,0 +1,44 @@
+from typing import Any, Callable, Dict
+
+
+class Document:
+
+    def __init__(self, text: str):
+        """
+        Analysis of a single text whose artifacts (segmented lines, entities, facts, encoder features, ...)
+        are lazily computed on first use and memoized afterwards
+
+        Args:
+            text (str): text to be analyzed
+
+        """
+        self.text = text
+        self.artifacts: Dict[str, Any] = {}
+
+    def memoize(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Get artifact of the document, computing it only if it does not exist yet
+
+        Args:
+            key (str): name of the artifact
+            func (Callable): function computing the artifact
+
+        Returns:
+            Any: memoized artifact
+
+        """
+        if key not in self.artifacts:
+            self.artifacts[key] = func()
+        return self.artifacts[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.artifacts
+
+    def __getitem__(self, key: str) -> Any:
+        return self.artifacts[key]
+
+    def __setitem__(self, key: str, value: Any):
+        self.artifacts[key] = value
+
+    def __repr__(self) -> str:
+        return f"Document(text={self.text[:30]!r}, artifacts={list(self.artifacts)})"
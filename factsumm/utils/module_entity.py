@@ -1,17 +1,35 @@
 import logging
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
+import torch
 from requests import HTTPError
-from transformers import LukeForEntityPairClassification, LukeTokenizer, pipeline
-
-
-def load_ner(model: str, device: str) -> object:
+from transformers import AutoModelForTokenClassification, LukeForEntityPairClassification, LukeTokenizer, pipeline
+
+from factsumm.utils import registry
+from factsumm.utils.module_onnx import EXAMPLE_SPANS, EXAMPLE_TEXT, load_onnx
+from factsumm.utils.precision import autocast, quantize
+from factsumm.utils.weights import load_cached
+
+
+def load_ner(
+    model: str,
+    device: str,
+    backend: str = "torch",
+    num_threads: Optional[int] = None,
+    precision: str = "fp32",
+    weights_cache: bool = False,
+) -> object:
     """
     Load Named Entity Recognition model from HuggingFace hub
 
     Args:
         model (str): model name to be loaded
         device (str): device info
+        backend (str, optional): `torch`, or `onnx` to run the model with ONNX Runtime. Defaults to "torch".
+        num_threads (int, optional): intra-op threads of the ONNX Runtime session. Defaults to None.
+        precision (str, optional): one of `fp32`, `int8` and `bf16` (PyTorch backend only). Defaults to "fp32".
+        weights_cache (bool, optional): memory-map weights from the local weights cache (PyTorch backend only).
+            Defaults to False.
 
     Returns:
         object: Pipeline-based Named Entity Recognition model
@@ -19,22 +37,41 @@ def load_ner(model: str, device: str) -> object:
     """
     logging.debug("Loading Named Entity Recognition Pipeline...")
 
-    try:
+    def build_pipeline():
+        # with the weights cache, the pipeline wraps the memory-mapped model instead of loading the checkpoint
+        ner_model = model
+        if weights_cache and backend == "torch":
+            ner_model = load_cached("ner", model, lambda: AutoModelForTokenClassification.from_pretrained(model))
+
         ner = pipeline(
             task="ner",
-            model=model,
+            model=ner_model,
             tokenizer=model,
             ignore_labels=[],
             framework="pt",
             device=-1 if device == "cpu" else 0,
             aggregation_strategy="simple",
         )
+
+        if backend == "onnx":
+            # pipeline pre/post-processing is kept, only its forward pass runs on ONNX Runtime
+            inputs = dict(ner.tokenizer(EXAMPLE_TEXT, return_tensors="pt"))
+            ner.model = load_onnx("ner", model, lambda: ner.model, inputs, ["logits"], num_threads, device)
+        else:
+            ner.model = quantize(ner.model, precision, device)
+
+        return ner
+
+    try:
+        task = "ner" if backend == "torch" else f"ner-{backend}"
+        ner = registry.load(task, model, device, build_pipeline, precision)
     except (HTTPError, OSError):
         logging.warning("Input model is not supported by HuggingFace Hub")
         raise
 
     def extract_entities(sentences: List[str]):
-        total_entities = ner(sentences)
+        with autocast(precision, device):
+            total_entities = ner(sentences)
 
         result = []
         for line_entities in total_entities:
@@ -45,13 +82,27 @@ def load_ner(model: str, device: str) -> object:
     return extract_entities
 
 
-def load_rel(model: str, device: str):
+def load_rel(
+    model: str,
+    device: str,
+    batch_size: int = 32,
+    backend: str = "torch",
+    num_threads: Optional[int] = None,
+    precision: str = "fp32",
+    weights_cache: bool = False,
+):
     """
     Load LUKE for Relation Extraction model and return its applicable function
 
     Args:
         model (str): model name to be loaded
         device (str): device info
+        batch_size (int, optional): number of entity pairs per forward pass. Defaults to 32.
+        backend (str, optional): `torch`, or `onnx` to run the model with ONNX Runtime. Defaults to "torch".
+        num_threads (int, optional): intra-op threads of the ONNX Runtime session. Defaults to None.
+        precision (str, optional): one of `fp32`, `int8` and `bf16` (PyTorch backend only). Defaults to "fp32".
+        weights_cache (bool, optional): memory-map weights from the local weights cache (PyTorch backend only).
+            Defaults to False.
 
     Returns:
         function: LUKE-based Relation Extraction function
@@ -59,52 +110,117 @@ def load_rel(model: str, device: str):
     """
     logging.debug("Loading Relation Extraction Pipeline...")
 
+    def build_onnx():
+        tokenizer = LukeTokenizer.from_pretrained(model)
+        inputs = dict(tokenizer([EXAMPLE_TEXT], entity_spans=[EXAMPLE_SPANS], return_tensors="pt"))
+        return tokenizer, load_onnx(
+            "rel",
+            model,
+            lambda: LukeForEntityPairClassification.from_pretrained(model),
+            inputs,
+            ["logits"],
+            num_threads,
+            device,
+        )
+
+    def build_model():
+        if weights_cache:
+            return load_cached("rel", model, lambda: LukeForEntityPairClassification.from_pretrained(model))
+        return LukeForEntityPairClassification.from_pretrained(model)
+
     try:
         # yapf:disable
-        tokenizer = LukeTokenizer.from_pretrained(model)
-        model = LukeForEntityPairClassification.from_pretrained(model).to(device)
+        if backend == "onnx":
+            tokenizer, model = registry.load(f"rel-{backend}", model, device, build_onnx)
+        else:
+            tokenizer, model = registry.load("rel", model, device, lambda: (
+                LukeTokenizer.from_pretrained(model),
+                quantize(build_model().to(device), precision, device),
+            ), precision)
         # yapf:enable
     except (HTTPError, OSError):
         logging.warning("Input model is not supported by HuggingFace Hub")
+        raise
 
-    def extract_relation(sentences: List) -> List[Tuple]:
+    def predict_relations(sentences: List[Dict]) -> List[str]:
+        """
+        Predict relation labels of entity pairs using length-bucketed batches
+
+        Args:
+            sentences (List[Dict]): entity pairs containing `text` and `spans` information
+
+        Returns:
+            List[str]: relation label of each entity pair (in input order)
+
+        """
+        if not sentences:
+            return []
+
+        encodings = tokenizer(
+            [sentence["text"] for sentence in sentences],
+            entity_spans=[[
+                (sentence["spans"][0][0], sentence["spans"][0][-1]),
+                (sentence["spans"][-1][0], sentence["spans"][-1][-1]),
+            ] for sentence in sentences],
+        )
+        features = [{key: values[i] for key, values in encodings.items()} for i in range(len(sentences))]
+
+        # sort by token length so that each batch is only padded to its own longest sequence
+        order = sorted(range(len(features)), key=lambda i: len(features[i]["input_ids"]))
+        relations = [None] * len(features)
+
+        with torch.inference_mode(), autocast(precision, device):
+            for i in range(0, len(order), batch_size):
+                indices = order[i:i + batch_size]
+                tokens = tokenizer.pad(
+                    [features[idx] for idx in indices],
+                    return_tensors="pt",
+                ).to(device)
+                predicted_ids = model(**tokens).logits.argmax(-1).tolist()
+
+                for idx, predicted_id in zip(indices, predicted_ids):
+                    relations[idx] = model.config.id2label[predicted_id]
+
+        return relations
+
+    def extract_relation(sentences: Union[List[Dict], List[List[Dict]]]) -> Union[List[Tuple], List[List[Tuple]]]:
         """
         Extraction Relation based on Entity Information
 
         Args:
-            sentence (str): original sentence containing context
-            head_entity (Dict): head entity containing position information
-            tail_entity (Dict): tail entity containing position information
+            sentences (Union[List[Dict], List[List[Dict]]]): entity pairs (or per-line entity pairs) containing
+                the original sentence and the position information of head and tail entities
 
         Returns:
-            List[Tuple]: list of (head_entity, relation, tail_entity) formatted triples
+            Union[List[Tuple], List[List[Tuple]]]: list of (head_entity, relation, tail_entity) formatted triples
+                (per line, if per-line entity pairs are given)
 
         """
-        triples = []
-
-        # TODO: batchify
-        for sentence in sentences:
-            tokens = tokenizer(
-                sentence["text"],
-                entity_spans=[
-                    (sentence["spans"][0][0], sentence["spans"][0][-1]),
-                    (sentence["spans"][-1][0], sentence["spans"][-1][-1]),
-                ],
-                return_tensors="pt",
-            ).to(device)
-            outputs = model(**tokens)
-            predicted_id = int(outputs.logits[0].argmax())
-            relation = model.config.id2label[predicted_id]
-
-            if relation != "no_relation":
-                triples.append((
-                    sentence["text"]
-                    [sentence["spans"][0][0]:sentence["spans"][0][-1]],
-                    relation,
-                    sentence["text"]
-                    [sentence["spans"][-1][0]:sentence["spans"][-1][-1]],
-                ))
-
-        return triples
+        nested = bool(sentences) and isinstance(sentences[0], list)
+        total_sentences = sentences if nested else [sentences]
+
+        # every entity pair across all lines goes through a single batched stream
+        flattened = [sentence for line_sentences in total_sentences for sentence in line_sentences]
+        relations = iter(predict_relations(flattened))
+
+        total_triples = []
+        for line_sentences in total_sentences:
+            triples = []
+
+            for sentence in line_sentences:
+                relation = next(relations)
+
+                if relation != "no_relation":
+                    triples.append((
+                        sentence["text"]
+                        [sentence["spans"][0][0]:sentence["spans"][0][-1]],
+                        relation,
+                        sentence["text"]
+                        [sentence["spans"][-1][0]:sentence["spans"][-1][-1]],
+                    ))
+
+            total_triples.append(triples)
+
+        return total_triples if nested else total_triples[0]
 
     return extract_relation
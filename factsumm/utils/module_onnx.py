@@ -0,0 +1,222 @@
+import inspect
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+
+from factsumm.utils.utils import Config, atomic_write, cache_path
+
+# inputs used to trace the models during export and to check parity of the exported graphs
+EXAMPLE_TEXT = "Lionel Messi plays for Barcelona."
+EXAMPLE_SPANS = [(0, 12), (23, 32)]
+EXAMPLE_QUESTION = "Who plays for Barcelona?"
+
+# ONNX exporter relies on global state, so models loaded concurrently are exported one at a time
+_export_lock = threading.Lock()
+
+
+class OnnxOutput(dict):
+    """
+    Model outputs of an ONNX Runtime session, accessible both as keys and as attributes (like `ModelOutput`)
+    """
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class OnnxModel:
+
+    def __init__(self, path: str, config, num_threads: Optional[int] = None, device: str = "cpu"):
+        """
+        ONNX Runtime session which can be called like the PyTorch model it was exported from
+
+        Args:
+            path (str): path of the exported graph
+            config (PretrainedConfig): config of the original model (e.g. for `id2label`)
+            num_threads (int, optional): intra-op threads of the session (ONNX Runtime default if None).
+                Defaults to None.
+            device (str, optional): device info. Defaults to "cpu".
+
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            logging.warning("ONNX backend requires `onnxruntime` (pip install factsumm[onnx])")
+            raise
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+
+        providers = ["CPUExecutionProvider"]
+        if device != "cpu" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+
+        self.config = config
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=providers)
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        self.output_names = [node.name for node in self.session.get_outputs()]
+
+    def __call__(self, **inputs) -> OnnxOutput:
+        feed = {name: inputs[name].detach().cpu().numpy() for name in self.input_names}
+        outputs = self.session.run(self.output_names, feed)
+        return OnnxOutput({name: torch.from_numpy(output) for name, output in zip(self.output_names, outputs)})
+
+
+def graph_path(task: str, model: str) -> Optional[str]:
+    """
+    Get the cache path of the exported graph of a model, which depends on the revision of its checkpoint
+    and on library versions
+
+    Args:
+        task (str): task the model is loaded for
+        model (str): model name or path of the local checkpoint
+
+    Returns:
+        Optional[str]: path of the exported graph (None if the revision of the checkpoint is unknown, e.g. a hub model
+            which is not downloaded yet)
+
+    """
+    import transformers
+
+    path = cache_path("onnx", task, model, [transformers.__version__, torch.__version__, str(Config.ONNX_OPSET)])
+    return os.path.join(path, "model.onnx") if path is not None else None
+
+
+def export(model: torch.nn.Module, inputs: Dict[str, torch.Tensor], output_names: List[str], path: str):
+    """
+    Export PyTorch model into an ONNX graph whose every input and output dimension is dynamic
+
+    Args:
+        model (torch.nn.Module): model to be exported
+        inputs (Dict[str, torch.Tensor]): example inputs (keyword arguments of the model)
+        output_names (List[str]): names of the outputs to be exported
+        path (str): path of the exported graph
+
+    """
+    logging.info("Exporting %s into %s...", type(model).__name__, path)
+
+    # graph inputs are named in the order of forward arguments, not in the order of the given inputs
+    inputs = {name: inputs[name] for name in inspect.signature(model.forward).parameters if name in inputs}
+
+    dynamic_axes = {name: {axis: f"{name}_{axis}" for axis in range(tensor.dim())} for name, tensor in inputs.items()}
+    dynamic_axes.update({name: {0: "batch", 1: f"{name}_1"} for name in output_names})
+
+    # TorchScript-based exporter keeps `dynamic_axes`, and is not the default anymore in recent PyTorch
+    options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    model = model.eval()
+    with atomic_write(path) as tmp_path, _export_lock, torch.no_grad():
+        torch.onnx.export(
+            model,
+            (),
+            tmp_path,
+            kwargs=dict(inputs),
+            input_names=list(inputs),
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=Config.ONNX_OPSET,
+            do_constant_folding=True,
+            **options,
+        )
+
+
+def check_parity(
+    model: torch.nn.Module,
+    onnx_model: OnnxModel,
+    inputs: Dict[str, torch.Tensor],
+    atol: float = 1e-3,
+) -> float:
+    """
+    Compare outputs of the ONNX graph against those of the original PyTorch model
+
+    Args:
+        model (torch.nn.Module): original model
+        onnx_model (OnnxModel): exported model
+        inputs (Dict[str, torch.Tensor]): inputs to be compared on
+        atol (float, optional): maximum absolute difference allowed. Defaults to 1e-3.
+
+    Raises:
+        ValueError: if outputs differ more than `atol`
+
+    Returns:
+        float: maximum absolute difference between outputs
+
+    """
+    with torch.inference_mode():
+        expected = model(**inputs)
+    actual = onnx_model(**inputs)
+
+    diff = max(
+        float(np.abs(expected[name].float().cpu().numpy() - actual[name].numpy()).max())
+        for name in onnx_model.output_names
+    )
+    logging.debug("Max. absolute difference between PyTorch and ONNX outputs of %s: %s", onnx_model.path, diff)
+
+    if diff > atol:
+        raise ValueError(f"ONNX outputs of {onnx_model.path} differ from PyTorch outputs by {diff} (> {atol})")
+
+    return diff
+
+
+def load_onnx(
+    task: str,
+    model_name: str,
+    load_model: Callable[[], torch.nn.Module],
+    inputs: Dict[str, torch.Tensor],
+    output_names: List[str],
+    num_threads: Optional[int] = None,
+    device: str = "cpu",
+) -> OnnxModel:
+    """
+    Load ONNX graph of a model, exporting (and checking parity of) the graph if it is not cached yet
+
+    PyTorch weights are only loaded to export the graph, so cached graphs only need the config of the model.
+
+    Args:
+        task (str): task the model is loaded for
+        model_name (str): model name or path of the local checkpoint
+        load_model (Callable[[], torch.nn.Module]): function loading the PyTorch model
+        inputs (Dict[str, torch.Tensor]): example inputs used for export and parity check
+        output_names (List[str]): names of the outputs to be exported
+        num_threads (int, optional): intra-op threads of the session. Defaults to None.
+        device (str, optional): device info. Defaults to "cpu".
+
+    Returns:
+        OnnxModel: exported model
+
+    """
+    path = graph_path(task, model_name)
+
+    if path is not None and os.path.exists(path):
+        from transformers import AutoConfig
+
+        return OnnxModel(path, AutoConfig.from_pretrained(model_name), num_threads, device)
+
+    model = load_model().to("cpu")
+
+    # revision of a hub model is only known once it is downloaded
+    path = graph_path(task, model_name)
+    if path is None:
+        raise ValueError(f"Revision of {model_name} is unknown, so its ONNX graph cannot be cached")
+
+    inputs = {name: tensor.to("cpu") for name, tensor in inputs.items()}
+    export(model, inputs, output_names, path)
+
+    onnx_model = OnnxModel(path, model.config, num_threads, device)
+
+    try:
+        check_parity(model, onnx_model, inputs)
+    except ValueError:
+        os.remove(path)
+        raise
+
+    return onnx_model
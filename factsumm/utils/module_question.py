@@ -1,17 +1,35 @@
 import logging
-from typing import List
+from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
+import torch
 from requests import HTTPError
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+from transformers import AutoModelForQuestionAnswering, AutoModelForSeq2SeqLM, AutoTokenizer
 
+from factsumm.utils import registry
+from factsumm.utils.module_onnx import EXAMPLE_QUESTION, EXAMPLE_TEXT, load_onnx
+from factsumm.utils.precision import autocast, quantize
+from factsumm.utils.weights import load_cached
 
-def load_qg(model: str, device: str):
+
+def load_qg(
+    model: str,
+    device: str,
+    batch_size: int = 32,
+    max_new_tokens: int = 63,
+    precision: str = "fp32",
+    weights_cache: bool = False,
+):
     """
     Load Question Generation model from HuggingFace hub
 
     Args:
         model (str): model name to be loaded
         device (str): device info
+        batch_size (int, optional): number of prompts per generation batch. Defaults to 32.
+        max_new_tokens (int, optional): maximum number of tokens to be generated per question. Defaults to 63.
+        precision (str, optional): one of `fp32`, `int8` and `bf16`. Defaults to "fp32".
+        weights_cache (bool, optional): memory-map weights from the local weights cache. Defaults to False.
 
     Returns:
         function: question generation function
@@ -19,25 +37,33 @@ def load_qg(model: str, device: str):
     """
     logging.debug("Loading Question Generation Pipeline...")
 
+    def build_model():
+        if weights_cache:
+            return load_cached("qg", model, lambda: AutoModelForSeq2SeqLM.from_pretrained(model))
+        return AutoModelForSeq2SeqLM.from_pretrained(model)
+
     try:
-        tokenizer = AutoTokenizer.from_pretrained(model)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model).to(device)
+        tokenizer, model = registry.load("qg", model, device, lambda: (
+            AutoTokenizer.from_pretrained(model),
+            quantize(build_model().to(device), precision, device),
+        ), precision)
     except (HTTPError, OSError):
         logging.warning("Input model is not supported by HuggingFace Hub")
+        raise
 
-    def generate_question(sentences: List[str], total_entities: List):
+    def build_prompts(sentences: List[str], total_entities: List) -> List[Dict]:
         """
-        Generation question using context and entity information
+        Build `answer: ... context: ...` prompts for every unique entity of each line
 
         Args:
             sentences (List[str]): list of sentences
             total_entities (List): list of entities
 
         Returns:
-            List[Dict] list of question and answer (entity) pairs
+            List[Dict]: list of prompt and answer (entity) pairs
 
         """
-        qa_pairs = []
+        prompts = []
 
         for sentence, line_entities in zip(sentences, total_entities):
             dedup = {}
@@ -46,42 +72,112 @@ def load_qg(model: str, device: str):
                 if entity in dedup:
                     continue
 
-                template = f"answer: {entity}  context: {sentence} </s>"
+                prompts.append({
+                    "template": f"answer: {entity}  context: {sentence} </s>",
+                    "answer": entity,
+                })
+
+                dedup[entity] = True
+
+        return prompts
+
+    def generate(templates: List[str]) -> List[str]:
+        """
+        Generate questions from length-bucketed, dynamically padded prompt batches
+
+        Args:
+            templates (List[str]): list of prompts
+
+        Returns:
+            List[str]: generated questions (in input order)
+
+        """
+        if not templates:
+            return []
+
+        encodings = tokenizer(templates, max_length=512, truncation=True)["input_ids"]
+        order = sorted(range(len(templates)), key=lambda i: len(encodings[i]))
+        questions = [None] * len(templates)
 
-                # TODO: batchify
-                tokens = tokenizer(
-                    template,
-                    padding="max_length",
-                    max_length=512,
-                    truncation=True,
+        with torch.inference_mode(), autocast(precision, device):
+            for i in range(0, len(order), batch_size):
+                indices = order[i:i + batch_size]
+                tokens = tokenizer.pad(
+                    {"input_ids": [encodings[idx] for idx in indices]},
                     return_tensors="pt",
                 ).to(device)
 
-                outputs = model.generate(**tokens, max_length=64)
+                outputs = model.generate(**tokens, max_new_tokens=max_new_tokens)
+                decoded = tokenizer.batch_decode(outputs)
 
-                question = tokenizer.decode(outputs[0])
-                question = question.replace("</s>", "")
-                question = question.replace("<pad> question: ", "")
+                for idx, question in zip(indices, decoded):
+                    # finished sequences are right-padded, so drop everything after the end of sequence
+                    question = question.split("</s>")[0]
+                    questions[idx] = question.replace("<pad> question: ", "")
 
-                qa_pairs.append({
-                    "question": question,
-                    "answer": entity,
-                })
+        return questions
 
-                dedup[entity] = True
+    def generate_question(sentences: Union[List[str], List[List[str]]], total_entities: List):
+        """
+        Generation question using context and entity information
+
+        Args:
+            sentences (Union[List[str], List[List[str]]]): list of sentences (or sentences of each document)
+            total_entities (List): list of entities (or entities of each document)
+
+        Returns:
+            List[Dict] list of question and answer (entity) pairs (per document, if multiple documents are given)
+
+        """
+        nested = bool(sentences) and isinstance(sentences[0], list)
+        total_sentences = sentences if nested else [sentences]
+        total_entities = total_entities if nested else [total_entities]
+
+        # prompts of every document are generated in a single batched stream
+        total_prompts = [build_prompts(lines, entities) for lines, entities in zip(total_sentences, total_entities)]
+        questions = iter(generate([prompt["template"] for prompts in total_prompts for prompt in prompts]))
 
-        return qa_pairs
+        total_qa_pairs = []
+        for prompts in total_prompts:
+            total_qa_pairs.append([{
+                "question": next(questions),
+                "answer": prompt["answer"],
+            } for prompt in prompts])
+
+        return total_qa_pairs if nested else total_qa_pairs[0]
 
     return generate_question
 
 
-def load_qa(model: str, device: str):
+def load_qa(
+    model: str,
+    device: str,
+    batch_size: int = 32,
+    max_seq_len: int = 384,
+    doc_stride: int = 128,
+    max_question_len: int = 64,
+    max_answer_len: int = 15,
+    backend: str = "torch",
+    num_threads: Optional[int] = None,
+    precision: str = "fp32",
+    weights_cache: bool = False,
+):
     """
     Load Question Answering model from HuggingFace hub
 
     Args:
         model (str): model name to be loaded
         device (str): device info
+        batch_size (int, optional): number of (question, context window) features per forward pass. Defaults to 32.
+        max_seq_len (int, optional): maximum length of each (question, context window) feature. Defaults to 384.
+        doc_stride (int, optional): overlap between consecutive context windows. Defaults to 128.
+        max_question_len (int, optional): maximum length of the question after tokenization. Defaults to 64.
+        max_answer_len (int, optional): maximum length of predicted answers. Defaults to 15.
+        backend (str, optional): `torch`, or `onnx` to run the model with ONNX Runtime. Defaults to "torch".
+        num_threads (int, optional): intra-op threads of the ONNX Runtime session. Defaults to None.
+        precision (str, optional): one of `fp32`, `int8` and `bf16` (PyTorch backend only). Defaults to "fp32".
+        weights_cache (bool, optional): memory-map weights from the local weights cache (PyTorch backend only).
+            Defaults to False.
 
     Returns:
         function: question answering function
@@ -89,38 +185,285 @@ def load_qa(model: str, device: str):
     """
     logging.debug("Loading Question Answering Pipeline...")
 
-    try:
-        qa = pipeline(
-            "question-answering",
-            model=model,
-            tokenizer=model,
-            framework="pt",
-            device=-1 if device == "cpu" else 0,
+    def build_onnx():
+        tokenizer = AutoTokenizer.from_pretrained(model)
+        inputs = dict(tokenizer(EXAMPLE_QUESTION, EXAMPLE_TEXT, return_tensors="pt"))
+        return tokenizer, load_onnx(
+            "qa",
+            model,
+            lambda: AutoModelForQuestionAnswering.from_pretrained(model),
+            inputs,
+            ["start_logits", "end_logits"],
+            num_threads,
+            device,
         )
+
+    def build_model():
+        if weights_cache:
+            return load_cached("qa", model, lambda: AutoModelForQuestionAnswering.from_pretrained(model))
+        return AutoModelForQuestionAnswering.from_pretrained(model)
+
+    try:
+        if backend == "onnx":
+            tokenizer, model = registry.load(f"qa-{backend}", model, device, build_onnx)
+        else:
+            tokenizer, model = registry.load("qa", model, device, lambda: (
+                AutoTokenizer.from_pretrained(model),
+                quantize(build_model().to(device), precision, device),
+            ), precision)
     except (HTTPError, OSError):
         logging.warning("Input model is not supported by HuggingFace Hub")
+        raise
+
+    max_seq_len = min(tokenizer.model_max_length, max_seq_len)
+    doc_stride = min(max_seq_len // 2, doc_stride)
+
+    # context windows are shared by every question, so they are sized for the longest allowed question
+    window_size = max_seq_len - max_question_len - tokenizer.num_special_tokens_to_add(pair=True)
+
+    if window_size <= doc_stride:
+        raise ValueError("`max_seq_len` leaves no room for context windows longer than `doc_stride`")
 
-    def answer_question(context: str, qa_pairs: List):
+    def encode_context(context: str) -> Dict:
         """
-        Answer question via Span Prediction
+        Tokenize context once and split it into overlapping windows
 
         Args:
             context (str): context to be encoded
-            qa_pairs (List): Question & Answer pairs generated from Question Generation pipe
-
-        """
-        answers = []
-        for qa_pair in qa_pairs:
-            pred = qa(
-                question=qa_pair["question"],
-                context=context,
-                handle_impossible_answer=True,
-            )["answer"]
-            answers.append({
-                "question": qa_pair["question"],
-                "answer": qa_pair["answer"],
-                "prediction": pred if pred != "" else "<unanswerable>"
-            })
-        return answers
+
+        Returns:
+            Dict: context text, its token encoding and (start, end) token boundaries of each window
+
+        """
+        encoding = tokenizer(context, add_special_tokens=False)
+        num_tokens = len(encoding["input_ids"])
+
+        windows = []
+        window_start = 0
+        while True:
+            window_end = min(window_start + window_size, num_tokens)
+            windows.append((window_start, window_end))
+
+            if window_end == num_tokens:
+                break
+            window_start += window_size - doc_stride
+
+        return {
+            "text": context,
+            "input_ids": encoding["input_ids"],
+            "encoding": encoding.encodings[0],
+            "windows": windows,
+        }
+
+    def build_features(contexts: List[Dict], questions: List[str]) -> List[Dict]:
+        """
+        Build (question, context window) features for every context and question
+
+        Args:
+            contexts (List[Dict]): encoded contexts
+            questions (List[str]): list of questions
+
+        Returns:
+            List[Dict]: model inputs and bookkeeping of each feature
+
+        """
+        features = []
+
+        for question_idx, question in enumerate(questions):
+            question_ids = tokenizer(question, add_special_tokens=False)["input_ids"][:max_question_len]
+            # position where context tokens start, found through a placeholder token
+            offset = tokenizer.build_inputs_with_special_tokens(question_ids, [-1]).index(-1)
+
+            for context_idx, context in enumerate(contexts):
+                for window_start, window_end in context["windows"]:
+                    window_ids = context["input_ids"][window_start:window_end]
+                    feature = {
+                        "input_ids": tokenizer.build_inputs_with_special_tokens(question_ids, window_ids),
+                    }
+                    if "token_type_ids" in tokenizer.model_input_names:
+                        feature["token_type_ids"] = tokenizer.create_token_type_ids_from_sequences(
+                            question_ids,
+                            window_ids,
+                        )
+
+                    features.append({
+                        "inputs": feature,
+                        "context_idx": context_idx,
+                        "question_idx": question_idx,
+                        "offset": offset,
+                        "window": (window_start, window_end),
+                    })
+
+        return features
+
+    def select_span(start: np.ndarray, end: np.ndarray, feature: Dict) -> Tuple[float, float, Tuple[int, int]]:
+        """
+        Select best answer span of a single feature (mirrors HuggingFace question answering pipeline)
+
+        Args:
+            start (np.ndarray): start logits of the feature
+            end (np.ndarray): end logits of the feature
+            feature (Dict): feature bookkeeping information
+
+        Returns:
+            Tuple[float, float, Tuple[int, int]]: null score, best span score and best span in context token indices
+
+        """
+        offset = feature["offset"]
+        window_start, window_end = feature["window"]
+
+        # only context tokens and the cls token can be selected
+        desired = np.zeros(len(start), dtype=bool)
+        desired[0] = True
+        desired[offset:offset + window_end - window_start] = True
+
+        start = np.where(desired, start, -10000.0)
+        end = np.where(desired, end, -10000.0)
+
+        start = np.exp(start - start.max())
+        start = start / start.sum()
+
+        end = np.exp(end - end.max())
+        end = end / end.sum()
+
+        null_score = (start[0] * end[0]).item()
+        start[0] = end[0] = 0.0
+
+        candidates = np.tril(np.triu(np.outer(start, end)), max_answer_len - 1)
+        span_start, span_end = np.unravel_index(np.argmax(candidates), candidates.shape)
+
+        if not (desired[span_start] and desired[span_end]):
+            return null_score, float("-inf"), None
+
+        score = candidates[span_start, span_end].item()
+        if span_start == 0 or span_end == 0:
+            return null_score, score, None
+
+        return null_score, score, (
+            span_start - offset + window_start,
+            span_end - offset + window_start,
+        )
+
+    def span_to_answer(context: Dict, span: Tuple[int, int]) -> str:
+        """
+        Convert context token span into answer text aligned to word boundaries
+
+        Args:
+            context (Dict): encoded context
+            span (Tuple[int, int]): (start, end) token indices of the answer in the context
+
+        Returns:
+            str: answer text
+
+        """
+        if span is None:
+            return ""
+
+        encoding = context["encoding"]
+        span_start, span_end = span
+
+        try:
+            start_index = encoding.word_to_chars(encoding.token_to_word(span_start))[0]
+            end_index = encoding.word_to_chars(encoding.token_to_word(span_end))[1]
+        except Exception:
+            start_index = encoding.offsets[span_start][0]
+            end_index = encoding.offsets[span_end][1]
+
+        return context["text"][start_index:end_index]
+
+    def answer_question(
+        context: Union[str, List[str], List[List[str]]],
+        qa_pairs: Union[List, List[List]],
+        cache: Optional[Dict] = None,
+    ):
+        """
+        Answer question via Span Prediction
+
+        Args:
+            context (Union[str, List[str], List[List[str]]]): context (or contexts) to be encoded,
+                or contexts of each job when questions of multiple jobs are given
+            qa_pairs (Union[List, List[List]]): Question & Answer pairs generated from Question Generation pipe
+                (or those of each job)
+            cache (Dict, optional): encoded contexts to be reused (and filled). Defaults to None.
+
+        Returns:
+            List[Dict]: list of question, answer and prediction (per context, if multiple contexts are given,
+                and per job, if multiple jobs are given)
+
+        """
+        nested = isinstance(context, list) and bool(context) and isinstance(context[0], list)
+        multiple = isinstance(context, list)
+        cache = cache if cache is not None else {}
+
+        if nested:
+            jobs = list(zip(context, qa_pairs))
+        else:
+            jobs = [(context if multiple else [context], qa_pairs)]
+
+        total_contexts = []
+        features = []
+        for job_idx, (texts, job_qa_pairs) in enumerate(jobs):
+            contexts = []
+            for text in texts:
+                if text not in cache:
+                    cache[text] = encode_context(text)
+                contexts.append(cache[text])
+            total_contexts.append(contexts)
+
+            for feature in build_features(contexts, [qa_pair["question"] for qa_pair in job_qa_pairs]):
+                feature["job_idx"] = job_idx
+                features.append(feature)
+
+        # every (question, window) feature of every context (and job) goes through a single batched stream
+        order = sorted(range(len(features)), key=lambda i: len(features[i]["inputs"]["input_ids"]))
+
+        null_scores = {}
+        best_spans = {}
+
+        with torch.inference_mode(), autocast(precision, device):
+            for i in range(0, len(order), batch_size):
+                indices = order[i:i + batch_size]
+                tokens = tokenizer.pad(
+                    [features[idx]["inputs"] for idx in indices],
+                    return_tensors="pt",
+                ).to(device)
+                outputs = model(**tokens)
+                lengths = tokens["attention_mask"].sum(-1).tolist()
+
+                for j, idx in enumerate(indices):
+                    feature = features[idx]
+                    key = (feature["job_idx"], feature["context_idx"], feature["question_idx"])
+
+                    null_score, score, span = select_span(
+                        outputs.start_logits[j, :lengths[j]].float().cpu().numpy(),
+                        outputs.end_logits[j, :lengths[j]].float().cpu().numpy(),
+                        feature,
+                    )
+
+                    null_scores[key] = min(null_scores.get(key, 1000000), null_score)
+                    # windows are visited out of order, so ties are broken by window position
+                    candidate = (score, -feature["window"][0], span)
+                    if key not in best_spans or candidate[:2] > best_spans[key][:2]:
+                        best_spans[key] = candidate
+
+        total_jobs = []
+        for job_idx, ((_, job_qa_pairs), contexts) in enumerate(zip(jobs, total_contexts)):
+            total_answers = []
+            for context_idx, encoded_context in enumerate(contexts):
+                answers = []
+                for question_idx, qa_pair in enumerate(job_qa_pairs):
+                    key = (job_idx, context_idx, question_idx)
+                    score, _, span = best_spans[key]
+
+                    pred = span_to_answer(encoded_context, span) if score >= null_scores[key] else ""
+                    answers.append({
+                        "question": qa_pair["question"],
+                        "answer": qa_pair["answer"],
+                        "prediction": pred if pred != "" else "<unanswerable>"
+                    })
+                total_answers.append(answers)
+            total_jobs.append(total_answers if multiple else total_answers[0])
+
+        return total_jobs if nested else total_jobs[0]
 
     return answer_question
@@ -1,15 +1,31 @@
 import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple, Union
 
-from bert_score import BERTScorer
+import numpy as np
+from bert_score.utils import get_bert_embedding, get_model, get_tokenizer, lang2model, model2layers
 
+from factsumm.utils import registry
+from factsumm.utils.precision import autocast, quantize
+from factsumm.utils.weights import load_cached
 
-def load_bert_score(device: str):
+
+def load_bert_score(
+    model: Optional[str],
+    device: str,
+    batch_size: int = 64,
+    precision: str = "fp32",
+    weights_cache: bool = False,
+):
     """
     Load BERTScore model from HuggingFace hub
 
     Args:
-        model (str): model name to be loaded
+        model (str, optional): model name to be loaded (default model for English if None)
         device (str): device info
+        batch_size (int, optional): number of lines per encoding batch. Defaults to 64.
+        precision (str, optional): one of `fp32`, `int8` and `bf16`. Defaults to "fp32".
+        weights_cache (bool, optional): memory-map weights from the local weights cache. Defaults to False.
 
     Returns:
         function: BERTScore score function
@@ -17,11 +33,180 @@ def load_bert_score(device: str):
     """
     logging.debug("Loading BERTScore Pipeline...")
 
+    # same tokenizer and truncated model as `BERTScorer`, whose other features are not used
+    model_type = model if model is not None else lang2model["en"]
+
+    def build_model():
+        num_layers = model2layers[model_type]
+        if weights_cache:
+            return load_cached("bert_score", model_type, lambda: get_model(model_type, num_layers))
+        return get_model(model_type, num_layers)
+
     try:
-        scorer = BERTScorer(
-            lang="en",
-            device=device,
-        )
-        return scorer.score
+        tokenizer, bert = registry.load("bert_score", model, device, lambda: (
+            get_tokenizer(model_type),
+            quantize(build_model().to(device), precision, device),
+        ), precision)
     except KeyError:
         logging.warning("Input model is not supported by BERTScore")
+        raise
+
+    # same weighting as `BERTScorer.score` without idf: special tokens are ignored
+    idf_dict = defaultdict(lambda: 1.0)
+    idf_dict[tokenizer.sep_token_id] = 0
+    idf_dict[tokenizer.cls_token_id] = 0
+
+    def encode(groups: List[Tuple[List[str], Dict]]):
+        """
+        Encode lines which are not in their cache yet into normalized token embeddings
+
+        Args:
+            groups (List[Tuple[List[str], Dict]]): lines and the cache they belong to, where each cache maps
+                a line to its (token embeddings, token weights)
+
+        """
+        missing = {}
+        for lines, cache in groups:
+            for line in lines:
+                if line not in cache:
+                    missing.setdefault(line, []).append(cache)
+
+        # lines missing from multiple caches are encoded only once
+        order = sorted(missing, key=lambda x: len(x.split(" ")), reverse=True)
+
+        for i in range(0, len(order), batch_size):
+            batch = order[i:i + batch_size]
+            with autocast(precision, device):
+                embeddings, masks, weights = get_bert_embedding(
+                    batch,
+                    bert,
+                    tokenizer,
+                    idf_dict,
+                    device=device,
+                )
+
+            for j, line in enumerate(batch):
+                length = int(masks[j].sum().item())
+                embedding = embeddings[j, :length].float()
+                embedding = embedding / embedding.norm(dim=-1, keepdim=True)
+                encoded = (embedding.cpu().numpy(), weights[j, :length].cpu().numpy())
+
+                for cache in missing[line]:
+                    cache[line] = encoded
+
+    def concatenate(lines: List[str], cache: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Concatenate cached line embeddings into a single token matrix
+
+        Args:
+            lines (List[str]): encoded lines
+            cache (Dict): mapping from line to its (token embeddings, token weights)
+
+        Returns:
+            Tuple: token embeddings, token weights, start offset of each line and total weight of each line
+
+        """
+        embeddings = [cache[line][0] for line in lines]
+        weights = [cache[line][1] for line in lines]
+        offsets = np.cumsum([0] + [len(embedding) for embedding in embeddings[:-1]])
+        return (
+            np.concatenate(embeddings),
+            np.concatenate(weights),
+            offsets,
+            np.array([weight.sum() for weight in weights]),
+        )
+
+    def match(
+        summary_lines: List[str],
+        source_lines: List[str],
+        summary_cache: Dict,
+        source_cache: Dict,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Match encoded summary lines against encoded source lines
+
+        Args:
+            summary_lines (List[str]): segmented summary lines
+            source_lines (List[str]): segmented source lines
+            summary_cache (Dict): summary line embeddings
+            source_cache (Dict): source line embeddings
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (Precision, Recall, F1) of each summary line
+
+        """
+        if not summary_lines or not source_lines:
+            # nothing to match (e.g. an empty summary or source), so every summary line scores zero
+            return np.zeros(len(summary_lines)), np.zeros(len(summary_lines)), np.zeros(len(summary_lines))
+
+        summary_embeddings, summary_weights, summary_offsets, summary_norms = concatenate(summary_lines, summary_cache)
+        source_embeddings, source_weights, source_offsets, source_norms = concatenate(source_lines, source_cache)
+
+        # token-level cosine similarity of every summary token against every source token
+        similarity = summary_embeddings @ source_embeddings.T
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # greedy matching per (summary line, source line) block
+            best_source_tokens = np.maximum.reduceat(similarity, source_offsets, axis=1)
+            precision = np.add.reduceat(
+                best_source_tokens * summary_weights[:, None],
+                summary_offsets,
+                axis=0,
+            ) / summary_norms[:, None]
+
+            best_summary_tokens = np.maximum.reduceat(similarity, summary_offsets, axis=0)
+            recall = np.add.reduceat(
+                best_summary_tokens * source_weights[None, :],
+                source_offsets,
+                axis=1,
+            ) / source_norms[None, :]
+
+            f1 = 2 * precision * recall / (precision + recall)
+        f1 = np.nan_to_num(f1, nan=0.0)
+
+        # each summary line takes its best score among all source lines
+        return precision.max(axis=1), recall.max(axis=1), f1.max(axis=1)
+
+    def score(
+        summary_lines: Union[List[str], List[List[str]]],
+        source_lines: Union[List[str], List[List[str]]],
+        summary_cache: Optional[Union[Dict, List[Dict]]] = None,
+        source_cache: Optional[Union[Dict, List[Dict]]] = None,
+    ):
+        """
+        Calculate BERTScore of each summary line against its best matching source line
+
+        Args:
+            summary_lines (Union[List[str], List[List[str]]]): segmented summary lines (or those of each pair)
+            source_lines (Union[List[str], List[List[str]]]): segmented source lines (or those of each pair)
+            summary_cache (Union[Dict, List[Dict]], optional): summary line embeddings to be reused (and filled).
+                Defaults to None.
+            source_cache (Union[Dict, List[Dict]], optional): source line embeddings to be reused (and filled).
+                Defaults to None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (Precision, Recall, F1) of each summary line
+                (per pair, if multiple pairs are given)
+
+        """
+        nested = bool(summary_lines) and isinstance(summary_lines[0], list)
+        total_summary_lines = summary_lines if nested else [summary_lines]
+        total_source_lines = source_lines if nested else [source_lines]
+
+        if nested:
+            summary_caches = summary_cache if summary_cache is not None else [{} for _ in summary_lines]
+            source_caches = source_cache if source_cache is not None else [{} for _ in source_lines]
+        else:
+            summary_caches = [summary_cache if summary_cache is not None else {}]
+            source_caches = [source_cache if source_cache is not None else {}]
+
+        # lines of every pair are encoded in a single batched stream
+        groups = list(zip(total_summary_lines, summary_caches)) + list(zip(total_source_lines, source_caches))
+        encode(groups)
+
+        total_scores = [
+            match(*args) for args in zip(total_summary_lines, total_source_lines, summary_caches, source_caches)
+        ]
+        return total_scores if nested else total_scores[0]
+
+    return score
@@ -0,0 +1,171 @@
+import logging
+import multiprocessing
+import os
+import weakref
+from collections import deque
+from multiprocessing.pool import Pool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from factsumm.utils.corpus import iter_chunks
+from factsumm.utils.utils import Config, PairScores, metric_fields
+
+# FactSumm instance of the current worker process, loaded once by `_init_worker`
+_factsumm = None
+
+
+def _init_worker(factsumm_kwargs: Dict, num_threads: int):
+    global _factsumm
+
+    import torch
+
+    from factsumm.factsumm import FactSumm
+
+    torch.set_num_threads(num_threads)
+    _factsumm = FactSumm(**factsumm_kwargs)
+
+
+def _score_shard(shard: Tuple) -> np.ndarray:
+    sources, summaries, verbose, device, metrics = shard
+    columns = _factsumm.score_pairs(sources, summaries, verbose, device, columnar=True, metrics=metrics)
+
+    # a single (num_pairs, num_fields) array is much cheaper to send back than a dict per pair
+    fields = metric_fields(metrics, _factsumm.question_budget is not None)
+    return np.stack([columns[field] for field in fields], axis=1)
+
+
+def shard_by_source(pairs: List[Tuple[str, str]], shard_size: int) -> List[List[int]]:
+    """
+    Split pairs into shards of about `shard_size` pairs, where pairs sharing the same source are never split
+
+    Each source is analyzed (segmented, tagged, ...) once per shard, so keeping its pairs together lets a single
+    worker reuse its analysis for all of them.
+
+    Args:
+        pairs (List[Tuple[str, str]]): (source, summary) pairs
+        shard_size (int): number of pairs per shard (shards of a single source can be larger)
+
+    Returns:
+        List[List[int]]: indices of the pairs of each shard
+
+    """
+    groups = {}
+    for i, (source, _) in enumerate(pairs):
+        groups.setdefault(source, []).append(i)
+
+    shards = [[]]
+    for indices in groups.values():
+        if shards[-1] and len(shards[-1]) + len(indices) > shard_size:
+            shards.append([])
+        shards[-1].extend(indices)
+
+    return [shard for shard in shards if shard]
+
+
+def _shutdown(pool: Pool):
+    pool.terminate()
+    pool.join()
+
+
+class WorkerPool:
+
+    def __init__(
+        self,
+        workers: int,
+        factsumm_kwargs: Dict,
+        threads_per_worker: Optional[int] = None,
+        shard_size: int = 16,
+    ):
+        """
+        Process pool scoring shards of pairs, where each worker loads its models once
+
+        Workers are shut down by `close` (or when leaving the pool as a context manager), and at the latest
+        when the pool is garbage collected.
+
+        Args:
+            workers (int): number of worker processes
+            factsumm_kwargs (Dict): arguments used to build the FactSumm instance of each worker
+            threads_per_worker (int, optional): torch intra-op threads of each worker
+                (available cores are evenly split if None). Defaults to None.
+            shard_size (int, optional): number of pairs per shard. Defaults to 16.
+
+        """
+        if threads_per_worker is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+
+        logging.debug("Starting %s workers with %s threads each...", workers, threads_per_worker)
+
+        self.workers = workers
+        self.question_budget = factsumm_kwargs.get("question_budget") is not None
+        self.shard_size = shard_size
+        self.pool = multiprocessing.get_context("spawn").Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(factsumm_kwargs, threads_per_worker),
+        )
+        self._finalizer = weakref.finalize(self, _shutdown, self.pool)
+
+    def imap(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        verbose: bool = False,
+        device: str = "cpu",
+        metrics: Tuple[str, ...] = tuple(Config.METRICS),
+    ) -> Iterator[PairScores]:
+        """
+        Score pairs in worker processes, yielding results in input order
+
+        Pairs are read by windows of `workers * shard_size` pairs, whose pairs sharing the same source are scored
+        by the same worker.
+
+        Args:
+            pairs (Iterable[Tuple[str, str]]): (source, summary) pairs
+            verbose (bool, optional): print verbose option. Defaults to False.
+            device (str): device info
+            metrics (Tuple[str, ...], optional): metric families to be calculated. Defaults to every family.
+
+        Returns:
+            Iterator[PairScores]: scores of each pair
+
+        """
+        # only two windows are in flight, so that huge (or lazy) inputs are not materialized at once
+        pending = deque()
+        fields = metric_fields(metrics, self.question_budget)
+
+        for window in iter_chunks(pairs, self.workers * self.shard_size):
+            shards = shard_by_source(window, self.shard_size)
+            results = [
+                self.pool.apply_async(_score_shard, ((
+                    [window[i][0] for i in shard],
+                    [window[i][1] for i in shard],
+                    verbose,
+                    device,
+                    metrics,
+                ),)) for shard in shards
+            ]
+            pending.append((shards, results))
+
+            if len(pending) >= 2:
+                yield from self._unpack(*pending.popleft(), fields)
+
+        while pending:
+            yield from self._unpack(*pending.popleft(), fields)
+
+    def _unpack(self, shards: List[List[int]], results: List, fields: Tuple[str, ...]) -> Iterator[PairScores]:
+        rows = [None] * sum(len(shard) for shard in shards)
+        for shard, result in zip(shards, results):
+            for i, row in zip(shard, result.get().tolist()):
+                rows[i] = row
+
+        for row in rows:
+            yield PairScores(**dict(zip(fields, row)))
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,46 @@
+import contextlib
+import logging
+
+import torch
+
+
+def quantize(model: torch.nn.Module, precision: str, device: str) -> torch.nn.Module:
+    """
+    Apply weight precision to a loaded model
+
+    Args:
+        model (torch.nn.Module): loaded fp32 model
+        precision (str): one of `fp32`, `int8` and `bf16`
+        device (str): device info
+
+    Returns:
+        torch.nn.Module: model whose linear layers are dynamically quantized to int8 (if `int8`),
+            or the given model otherwise (`bf16` is applied through `autocast`)
+
+    """
+    if precision != "int8":
+        return model
+
+    if device != "cpu":
+        raise ValueError("int8 dynamic quantization only supports `cpu` device")
+
+    logging.debug("Quantizing linear layers of %s into int8...", type(model).__name__)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def autocast(precision: str, device: str):
+    """
+    Get context manager running forward passes in the given precision
+
+    Args:
+        precision (str): one of `fp32`, `int8` and `bf16`
+        device (str): device info
+
+    Returns:
+        ContextManager: bf16 autocast context (if `bf16`), or a no-op context otherwise
+
+    """
+    if precision != "bf16":
+        return contextlib.nullcontext()
+
+    return torch.autocast(device_type="cpu" if device == "cpu" else "cuda", dtype=torch.bfloat16)
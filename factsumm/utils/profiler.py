@@ -0,0 +1,154 @@
+import contextlib
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional
+
+# (stage, wall seconds, CPU seconds, counters of the stage)
+Hook = Callable[[str, float, float, Dict[str, int]], None]
+
+_disabled = contextlib.nullcontext()
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset peak resident set size of the process, so that the next peak only covers what runs from now on (Linux only)
+
+    Returns:
+        bool: whether the peak was reset
+
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> int:
+    """
+    Get peak resident set size of the process since its last reset (or since the process started)
+
+    Returns:
+        int: peak resident set size in bytes (0 if unknown)
+
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profile:
+
+    def __init__(self):
+        """
+        Wall time, CPU time, number of calls and peak RSS of each stage, and workload counters (lines, entities, ...)
+
+        """
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Counter = Counter()
+
+    def add(self, stage: str, wall: float, cpu: float, counters: Dict[str, int], peak_rss: int = 0):
+        timings = self.stages.setdefault(stage, {"wall": 0.0, "cpu": 0.0, "calls": 0, "peak_rss_mb": 0.0})
+        timings["wall"] += wall
+        timings["cpu"] += cpu
+        timings["calls"] += 1
+        timings["peak_rss_mb"] = max(timings["peak_rss_mb"], peak_rss / 2**20)
+        self.counters.update(counters)
+
+    def to_dict(self) -> Dict:
+        return {
+            "stages": {stage: dict(timings) for stage, timings in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class Profiler:
+
+    def __init__(self, hooks: Optional[List[Hook]] = None):
+        """
+        Measure stages of FactSumm, reporting each measurement to hooks and to the profile being collected (if any)
+
+        Profiles are collected per thread, so concurrent stages (e.g. of the scoring server) are not mixed up.
+        CPU time and peak RSS are those of the whole process, including intra-op threads of the models.
+
+        Args:
+            hooks (List[Hook], optional): functions called with (stage, wall seconds, CPU seconds, counters)
+                after every measured stage. Defaults to None.
+
+        """
+        self.hooks: List[Hook] = list(hooks) if hooks is not None else []
+        self._local = threading.local()
+
+    def current(self) -> Optional[Profile]:
+        return getattr(self._local, "profile", None)
+
+    @contextlib.contextmanager
+    def collect(self) -> Iterator[Profile]:
+        """
+        Collect measurements of the stages run by the current thread within the context
+
+        Returns:
+            Iterator[Profile]: profile filled by the stages of the context
+
+        """
+        previous = self.current()
+        self._local.profile = Profile()
+
+        try:
+            yield self._local.profile
+        finally:
+            self._local.profile = previous
+
+    def stage(self, name: str):
+        """
+        Measure a stage, which yields a counter to be filled (or None if nothing is measured)
+
+        Stages are only measured when there are hooks or a profile is being collected, so that disabled
+        profiling costs a single check per stage.
+
+        Args:
+            name (str): name of the stage
+
+        Returns:
+            ContextManager: context measuring the stage
+
+        """
+        if not self.hooks and self.current() is None:
+            return _disabled
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name: str) -> Iterator[Counter]:
+        profile = self.current()
+        if profile is not None:
+            reset_peak_rss()
+
+        counters = Counter()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+
+        yield counters
+
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+
+        if profile is not None:
+            profile.add(name, wall, cpu, counters, peak_rss())
+
+        for hook in self.hooks:
+            hook(name, wall, cpu, dict(counters))
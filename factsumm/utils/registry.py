@@ -0,0 +1,151 @@
+import contextlib
+import ctypes
+import gc
+import logging
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# loaded models shared by every FactSumm object of the process
+_models: Dict[Tuple, Any] = {}
+_load_times: Dict[Tuple, float] = {}
+
+# objects using each model, so that a model is only dropped once none of them uses it anymore
+_holders: Dict[Tuple, weakref.WeakSet] = {}
+_local = threading.local()
+
+_lock = threading.Lock()
+_key_locks: Dict[Tuple, threading.Lock] = {}
+
+
+@contextlib.contextmanager
+def held_by(holder: Any) -> Iterator[None]:
+    """
+    Register the object models loaded by the current thread within the context are used by
+
+    Args:
+        holder (Any): object using the loaded models (e.g. a FactSumm object)
+
+    """
+    previous = getattr(_local, "holder", None)
+    _local.holder = holder
+
+    try:
+        yield
+    finally:
+        _local.holder = previous
+
+
+def load(
+    task: str,
+    model: Optional[str],
+    device: str,
+    loader: Callable[[], Any],
+    precision: str = "fp32",
+) -> Any:
+    """
+    Get a loaded model from the process-wide registry, loading it only if it was not loaded yet
+
+    Different models are loaded concurrently by different threads, while threads requesting the same model
+    wait for a single load.
+
+    Args:
+        task (str): task the model is loaded for (e.g. `ner`), since a checkpoint can be loaded with different heads
+        model (str, optional): model name
+        device (str): device info
+        loader (Callable): function loading the model
+        precision (str, optional): numerical precision of the model. Defaults to "fp32".
+
+    Returns:
+        Any: loaded model
+
+    """
+    key = (task, model, device, precision)
+
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        if key not in _models:
+            start = time.perf_counter()
+            _models[key] = loader()
+            _load_times[key] = time.perf_counter() - start
+            logging.debug("Loaded %s model %s on %s (%s) in %.2fs", task, model, device, precision, _load_times[key])
+
+        holder = getattr(_local, "holder", None)
+        with _lock:
+            if holder is not None:
+                _holders.setdefault(key, weakref.WeakSet()).add(holder)
+            return _models[key]
+
+
+def loaded() -> List[Tuple]:
+    """
+    List (task, model, device, precision) keys of loaded models
+
+    Returns:
+        List[Tuple]: keys of loaded models
+
+    """
+    return list(_models)
+
+
+def load_time(task: str, model: Optional[str], device: str, precision: str = "fp32") -> Optional[float]:
+    """
+    Get the time it took to load a model
+
+    Args:
+        task (str): task the model was loaded for
+        model (str, optional): model name
+        device (str): device info
+        precision (str, optional): numerical precision of the model. Defaults to "fp32".
+
+    Returns:
+        float: load time in seconds (None if not loaded)
+
+    """
+    return _load_times.get((task, model, device, precision), None)
+
+
+def release(holder: Any, task: Optional[str] = None):
+    """
+    Release models loaded for a holder, which are dropped from the registry (and freed) once no other live holder
+    uses them
+
+    Args:
+        holder (Any): object the models were loaded for (see `held_by`)
+        task (str, optional): task whose models are released (every model of the holder if None). Defaults to None.
+
+    """
+    with _lock:
+        for key in list(_models):
+            holders = _holders.get(key)
+            if holders is None or holder not in holders or (task is not None and key[0] != task):
+                continue
+
+            holders.discard(holder)
+            if not holders:
+                del _models[key]
+                del _load_times[key]
+                del _holders[key]
+
+
+def free_memory():
+    """
+    Collect released models and give their memory back to the OS, instead of keeping it in allocator pools
+
+    """
+    gc.collect()
+
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+    # glibc keeps freed heap memory mapped until it is explicitly trimmed
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
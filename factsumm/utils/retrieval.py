@@ -0,0 +1,86 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LineIndex:
+
+    def __init__(self, lines: List[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Lexical BM25 index over the segmented lines of a single document
+
+        Args:
+            lines (List[str]): segmented lines to be indexed
+            k1 (float, optional): term frequency saturation. Defaults to 1.5.
+            b (float, optional): line length normalization. Defaults to 0.75.
+
+        """
+        self.lines = lines
+        self.k1 = k1
+        self.b = b
+
+        total_tokens = [tokenize(line) for line in lines]
+        self.lengths = [len(tokens) for tokens in total_tokens]
+        avg_length = sum(self.lengths) / len(lines) if lines else 0.0
+
+        # postings of each term: (line index, term frequency) pairs
+        self.postings: Dict[str, List] = {}
+        for line_idx, tokens in enumerate(total_tokens):
+            for term, freq in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((line_idx, freq))
+
+        self.idf = {
+            term: math.log(1 + (len(lines) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        self.norms = [k1 * (1 - b + b * length / avg_length) if avg_length > 0 else k1 for length in self.lengths]
+
+    def scores(self, query: str) -> List[float]:
+        """
+        Calculate BM25 score of every line against the query
+
+        Args:
+            query (str): query text
+
+        Returns:
+            List[float]: score of each line
+
+        """
+        scores = [0.0] * len(self.lines)
+
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+
+            idf = self.idf[term]
+            for line_idx, freq in self.postings[term]:
+                scores[line_idx] += idf * freq * (self.k1 + 1) / (freq + self.norms[line_idx])
+
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[int]:
+        """
+        Search lines most relevant to the query
+
+        Args:
+            query (str): query text
+            top_k (int): number of lines to be retrieved
+
+        Returns:
+            List[int]: indices of the retrieved lines, in document order
+
+        """
+        if len(self.lines) <= top_k:
+            return list(range(len(self.lines)))
+
+        scores = self.scores(query)
+        # ties (e.g. lines sharing no term with the query) are broken by document order
+        ranked = sorted(range(len(scores)), key=lambda i: (-scores[i], i))
+        return sorted(ranked[:top_k])
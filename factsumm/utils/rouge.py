@@ -0,0 +1,123 @@
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+def count_ngrams(tokens: List[str], n: int) -> Counter:
+    if n == 1:
+        return Counter(tokens)
+    return Counter(zip(*[tokens[i:] for i in range(n)]))
+
+
+def calc_f1(matches: int, count_for_recall: int, count_for_precision: int, alpha: float = 0.5) -> float:
+    """
+    Calculate F-measure exactly like `RougeCalculator._calc_f1` of sumeval
+
+    Args:
+        matches (int): number of matched n-grams (or LCS length)
+        count_for_recall (int): number of reference n-grams
+        count_for_precision (int): number of summary n-grams
+        alpha (float, optional): weight of recall. Defaults to 0.5.
+
+    Returns:
+        float: F-measure
+
+    """
+
+    def safe_div(x1, x2):
+        return 0 if x2 == 0 else x1 / x2
+
+    recall = safe_div(matches, count_for_recall)
+    precision = safe_div(matches, count_for_precision)
+    denom = (1.0 - alpha) * precision + alpha * recall
+    return safe_div(precision * recall, denom)
+
+
+def lcs(masks: Dict[str, int], length: int, tokens: List[str]) -> int:
+    """
+    Calculate length of the longest common subsequence with a bit-parallel algorithm
+
+        See also https://doi.org/10.1007/978-3-540-27810-8_33 (Hyyrö, 2004)
+
+    Every row of the dynamic programming table is a single integer, so that the cost per token
+    is a few big integer operations instead of a Python loop over the other sequence.
+
+    Args:
+        masks (Dict[str, int]): bit mask of the positions of each token in the other sequence
+        length (int): length of the other sequence
+        tokens (List[str]): tokens of this sequence
+
+    Returns:
+        int: length of the longest common subsequence
+
+    """
+    full = (1 << length) - 1
+    row = full
+
+    for token in tokens:
+        matched = row & masks.get(token, 0)
+        row = ((row + matched) | (row - matched)) & full
+
+    return length - bin(row).count("1")
+
+
+class RougeTable:
+
+    def __init__(self, total_tokens: List[List[str]]):
+        """
+        Pre-counted n-grams and LCS bit masks of tokenized reference lines, so that each summary scored
+        against the same references is only matched against these tables
+
+        Args:
+            total_tokens (List[List[str]]): tokens of each reference line (as tokenized by sumeval)
+
+        """
+        self.num_refs = len(total_tokens)
+        self.num_tokens = sum(len(tokens) for tokens in total_tokens)
+
+        # recall denominators, and reference counts of each n-gram (only for lines containing it)
+        self.lengths = {n: sum(max(len(tokens) - n + 1, 0) for tokens in total_tokens) for n in (1, 2)}
+        self.postings: Dict[int, Dict] = {1: {}, 2: {}}
+        for n in (1, 2):
+            for tokens in total_tokens:
+                for ngram, count in count_ngrams(tokens, n).items():
+                    self.postings[n].setdefault(ngram, []).append(count)
+
+        self.masks = []
+        for tokens in total_tokens:
+            masks = {}
+            for position, token in enumerate(tokens):
+                masks[token] = masks.get(token, 0) | (1 << position)
+            self.masks.append((masks, len(tokens)))
+
+    def score(self, tokens: List[str], alpha: float = 0.5) -> Tuple[float, float, float]:
+        """
+        Calculate ROUGE-1, ROUGE-2 and ROUGE-L of a summary against every reference line,
+        with the same numbers as `RougeCalculator.rouge_n` and `rouge_l` of sumeval
+
+        Args:
+            tokens (List[str]): tokens of the summary (as tokenized by sumeval)
+            alpha (float, optional): weight of recall. Defaults to 0.5.
+
+        Returns:
+            Tuple[float, float, float]: (ROUGE-1, ROUGE-2, ROUGE-L) tuple
+
+        """
+        scores = []
+
+        for n in (1, 2):
+            matches = 0
+            for ngram, count in count_ngrams(tokens, n).items():
+                for ref_count in self.postings[n].get(ngram, ()):
+                    matches += min(count, ref_count)
+
+            scores.append(calc_f1(
+                matches,
+                self.lengths[n],
+                self.num_refs * max(len(tokens) - n + 1, 0),
+                alpha,
+            ))
+
+        matches = sum(lcs(masks, length, tokens) for masks, length in self.masks if length > 0)
+        scores.append(calc_f1(matches, self.num_tokens, self.num_refs * len(tokens), alpha))
+
+        return tuple(scores)
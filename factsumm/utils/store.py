@@ -0,0 +1,318 @@
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, List, Optional
+
+# SQLite limits the number of host parameters of a single statement
+_MAX_PARAMS = 500
+
+# total size and number of artifacts are kept up to date by triggers, so that eviction never scans the table
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS artifacts_accessed ON artifacts (accessed);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL,
+    entries INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS artifacts_insert AFTER INSERT ON artifacts BEGIN
+    UPDATE usage SET size = size + new.size, entries = entries + 1 WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS artifacts_delete AFTER DELETE ON artifacts BEGIN
+    UPDATE usage SET size = size - old.size, entries = entries - 1 WHERE id = 0;
+END;
+CREATE TABLE IF NOT EXISTS stats (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL
+);
+"""
+
+
+def artifact_key(key: Hashable) -> str:
+    """
+    Hash the content an artifact is computed from (e.g. a line, or a line and the spans of an entity pair)
+
+    Args:
+        key (Hashable): string, or (nested) tuple of strings and numbers
+
+    Returns:
+        str: SHA-256 digest of the content
+
+    """
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _placeholders(values: List) -> str:
+    return ",".join("?" * len(values))
+
+
+class ArtifactStore:
+
+    def __init__(self, path: str, max_size_mb: Optional[float] = None, timeout: float = 60.0):
+        """
+        Persistent content-addressed store of model outputs, shared by every process scoring the same texts
+
+        Artifacts are grouped by namespace (a stage and the revision of its model), and addressed by the hash
+        of the content they are computed from. The store is a single SQLite file in WAL mode, so that worker
+        processes read concurrently while their writes are serialized, and least recently used artifacts are
+        evicted once the total size of artifacts grows over the maximum size.
+
+        Args:
+            path (str): path of the SQLite file (created if missing)
+            max_size_mb (float, optional): maximum total size of stored artifacts in MB (unbounded if None).
+                Defaults to None.
+            timeout (float, optional): seconds to wait for a lock held by another process. Defaults to 60.0.
+
+        """
+        self.path = path
+        self.max_size = int(max_size_mb * 2**20) if max_size_mb is not None else None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # a single connection is shared by the threads of a process (e.g. stages of the scoring server)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(f"BEGIN IMMEDIATE;{_SCHEMA}COMMIT;")
+
+    @contextlib.contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        # writers take the database lock upfront, instead of failing to upgrade a read lock under contention
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._connection
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def get_many(self, namespace: str, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Get stored artifacts of a namespace, marking them as recently used and counting hits and misses
+
+        Args:
+            namespace (str): namespace of the artifacts
+            keys (List[Hashable]): content each artifact is computed from
+
+        Returns:
+            Dict[Hashable, Any]: artifact of each key found in the store
+
+        """
+        digests = {artifact_key(key): key for key in dict.fromkeys(keys)}
+        if not digests:
+            return {}
+
+        found = {}
+        candidates = list(digests)
+
+        with self._lock:
+            for i in range(0, len(candidates), _MAX_PARAMS):
+                chunk = candidates[i:i + _MAX_PARAMS]
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM artifacts WHERE namespace = ? AND key IN ({_placeholders(chunk)})",
+                    [namespace] + chunk,
+                )
+                for digest, value in rows:
+                    found[digest] = pickle.loads(value)
+
+            hits = list(found)
+            with self._write() as connection:
+                now = time.time()
+                for i in range(0, len(hits), _MAX_PARAMS):
+                    chunk = hits[i:i + _MAX_PARAMS]
+                    connection.execute(
+                        f"UPDATE artifacts SET accessed = ? WHERE namespace = ? AND key IN ({_placeholders(chunk)})",
+                        [now, namespace] + chunk,
+                    )
+
+                connection.execute(
+                    "INSERT INTO stats VALUES (?, ?, ?) ON CONFLICT (namespace) "
+                    "DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+                    (namespace, len(hits), len(digests) - len(hits)),
+                )
+
+        return {digests[digest]: value for digest, value in found.items()}
+
+    def put_many(self, namespace: str, artifacts: Dict[Hashable, Any]):
+        """
+        Store artifacts of a namespace, evicting least recently used artifacts if the store gets too large
+
+        Args:
+            namespace (str): namespace of the artifacts
+            artifacts (Dict[Hashable, Any]): artifact of each key (picklable)
+
+        """
+        if not artifacts:
+            return
+
+        now = time.time()
+        rows = []
+        for key, artifact in artifacts.items():
+            value = pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((namespace, artifact_key(key), value, len(value), now))
+
+        with self._lock, self._write() as connection:
+            # another process may have stored the same artifact meanwhile, which is then only marked as used
+            connection.executemany(
+                "INSERT INTO artifacts VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET accessed = excluded.accessed",
+                rows,
+            )
+
+            if self.max_size is not None:
+                self._evict(connection, self.max_size)
+
+    def _evict(self, connection: sqlite3.Connection, max_size: int) -> int:
+        (size,) = connection.execute("SELECT size FROM usage WHERE id = 0").fetchone()
+        if size <= max_size:
+            return 0
+
+        # evict down to 90% of the maximum size, so that eviction does not run again on every write
+        evicted = connection.execute(
+            """
+            DELETE FROM artifacts WHERE (namespace, key) IN (
+                SELECT namespace, key FROM (
+                    SELECT namespace, key, size, SUM(size) OVER (ORDER BY accessed, namespace, key) AS freed
+                    FROM artifacts
+                ) WHERE freed - size < ?
+            )
+            """,
+            (size - int(max_size * 0.9),),
+        )
+        return evicted.rowcount
+
+    def stats(self) -> Dict:
+        """
+        Get size of the store and hit/miss counts of each namespace, accumulated over every process using the store
+
+        Returns:
+            Dict: total size (`size_mb`, artifacts only) and number of artifacts (`entries`),
+                and `hits`, `misses` and `hit_rate` of each namespace (`namespaces`)
+
+        """
+        with self._lock:
+            size, entries = self._connection.execute("SELECT size, entries FROM usage WHERE id = 0").fetchone()
+            rows = self._connection.execute("SELECT namespace, hits, misses FROM stats ORDER BY namespace").fetchall()
+
+        return {
+            "size_mb": size / 2**20,
+            "entries": entries,
+            "namespaces": {
+                namespace: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0.0,
+                } for namespace, hits, misses in rows
+            },
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class SentenceCache:
+
+    def __init__(self, max_entries: int):
+        """
+        In-memory LRU cache of model outputs, so that re-scoring an edited text only runs models on changed lines
+
+        Outputs are grouped by namespace like in `ArtifactStore`, but addressed by the content itself, and kept
+        as objects (callers must not modify them). Each namespace keeps at most `max_entries` outputs.
+
+        Args:
+            max_entries (int): maximum number of outputs kept per namespace
+
+        """
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, OrderedDict] = {}
+        self._stats: Dict[str, List[int]] = {}
+
+    def get_many(self, namespace: str, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Get cached outputs of a namespace, marking them as recently used and counting hits and misses
+
+        Args:
+            namespace (str): namespace of the outputs
+            keys (List[Hashable]): content each output is computed from
+
+        Returns:
+            Dict[Hashable, Any]: output of each key found in the cache
+
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+
+        with self._lock:
+            entries = self._entries.setdefault(namespace, OrderedDict())
+            for key in keys:
+                if key in entries:
+                    entries.move_to_end(key)
+                    found[key] = entries[key]
+
+            stats = self._stats.setdefault(namespace, [0, 0])
+            stats[0] += len(found)
+            stats[1] += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, namespace: str, outputs: Dict[Hashable, Any]):
+        """
+        Cache outputs of a namespace, evicting least recently used outputs beyond the maximum number of entries
+
+        Args:
+            namespace (str): namespace of the outputs
+            outputs (Dict[Hashable, Any]): output of each key
+
+        """
+        with self._lock:
+            entries = self._entries.setdefault(namespace, OrderedDict())
+            for key, output in outputs.items():
+                entries[key] = output
+                entries.move_to_end(key)
+
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """
+        Get number of cached outputs and hit/miss counts of each namespace
+
+        Returns:
+            Dict: number of cached outputs (`entries`), and `entries`, `hits`, `misses` and `hit_rate`
+                of each namespace (`namespaces`)
+
+        """
+        with self._lock:
+            namespaces = {
+                namespace: {
+                    "entries": len(self._entries.get(namespace, ())),
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0.0,
+                } for namespace, (hits, misses) in sorted(self._stats.items())
+            }
+
+        return {"entries": sum(stats["entries"] for stats in namespaces.values()), "namespaces": namespaces}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
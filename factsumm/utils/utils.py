@@ -1,9 +1,12 @@
+import contextlib
+import hashlib
+import math
+import os
 import re
 import string
+import threading
 from collections import Counter
-from typing import List
-
-from transformers import pipeline
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 
 class Config:
@@ -13,6 +16,163 @@ class Config:
     QA_MODEL: str = "deepset/roberta-base-squad2"
     SUMM_MODEL: str = "sshleifer/distilbart-cnn-12-6"
 
+    # TACRED subjects are persons or organizations and its objects are never ordinals, percents, money or quantities,
+    # so entity pairs with these (OntoNotes) types rarely produce a relation (only pruned with `prune_pair_types`)
+    REL_PRUNED_HEAD_TYPES: Tuple[str, ...] = ("CARDINAL", "DATE", "MONEY", "ORDINAL", "PERCENT", "QUANTITY", "TIME")
+    REL_PRUNED_TAIL_TYPES: Tuple[str, ...] = ("MONEY", "ORDINAL", "PERCENT", "QUANTITY")
+
+    # exported graphs and other artifacts are cached under this directory
+    CACHE_DIR: str = os.environ.get("FACTSUMM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "factsumm"))
+    ONNX_OPSET: int = 17
+
+    # NER, RE and QA models can also run on ONNX Runtime
+    BACKENDS: Tuple[str, ...] = ("torch", "onnx")
+
+    # numerical precision can be chosen for each model
+    STAGES: Tuple[str, ...] = ("ner", "rel", "qg", "qa", "bert_score")
+    PRECISIONS: Tuple[str, ...] = ("fp32", "int8", "bf16")
+
+    # with a question budget, questions are generated for entities of these types first (OntoNotes types)
+    QG_ENTITY_PRIORITY: Tuple[str, ...] = (
+        "PERSON",
+        "ORG",
+        "GPE",
+        "LOC",
+        "NORP",
+        "FAC",
+        "EVENT",
+        "WORK_OF_ART",
+        "PRODUCT",
+        "LAW",
+        "LANGUAGE",
+        "DATE",
+        "TIME",
+        "MONEY",
+        "PERCENT",
+        "QUANTITY",
+        "CARDINAL",
+        "ORDINAL",
+    )
+    # z value of the confidence interval of budgeted QAGS estimates (95%)
+    QA_CONFIDENCE_Z: float = 1.96
+
+    # metric families which can be selected, and the `PairScores` fields of each family
+    METRICS: Dict[str, Tuple[str, ...]] = {
+        "fact_score": ("fact_score",),
+        "qa_score": ("qa_score",),
+        "rouge": ("rouge_1", "rouge_2", "rouge_l"),
+        "bert_score": ("bert_score_precision", "bert_score_recall", "bert_score_f1"),
+    }
+    # additional `PairScores` fields of QAGS estimated with a question budget
+    QA_BUDGET_FIELDS: Tuple[str, ...] = ("qa_score_low", "qa_score_high", "qa_questions")
+
+
+class PairScores(NamedTuple):
+    """
+    Compact scores of a single (source, summary) pair (None for metrics which were not requested)
+    """
+    fact_score: Optional[float] = None
+    qa_score: Optional[float] = None
+    qa_score_low: Optional[float] = None
+    qa_score_high: Optional[float] = None
+    qa_questions: Optional[float] = None
+    rouge_1: Optional[float] = None
+    rouge_2: Optional[float] = None
+    rouge_l: Optional[float] = None
+    bert_score_precision: Optional[float] = None
+    bert_score_recall: Optional[float] = None
+    bert_score_f1: Optional[float] = None
+    profile: Optional[Dict] = None
+
+    def to_dict(self) -> Dict:
+        """
+        Convert scores into the nested format returned by `FactSumm.__call__`
+
+        Returns:
+            Dict: fact, QAGS, ROUGE and BERTScore scores (of requested metrics only)
+
+        """
+        scores = {}
+
+        if self.fact_score is not None:
+            scores["fact_score"] = self.fact_score
+
+        if self.qa_score is not None:
+            scores["qa_score"] = self.qa_score
+
+        if self.qa_questions is not None:
+            scores["qa_interval"] = (self.qa_score_low, self.qa_score_high)
+            scores["qa_questions"] = self.qa_questions
+
+        if self.rouge_1 is not None:
+            scores["rouge"] = {
+                "rouge-1": self.rouge_1,
+                "rouge-2": self.rouge_2,
+                "rouge-l": self.rouge_l,
+            }
+
+        if self.bert_score_precision is not None:
+            scores["bert_score"] = {
+                "precision": self.bert_score_precision,
+                "recall": self.bert_score_recall,
+                "f1": self.bert_score_f1,
+            }
+
+        if self.profile is not None:
+            scores["profile"] = self.profile
+
+        return scores
+
+
+def select_metrics(metrics: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Validate selected metric families
+
+    Args:
+        metrics (Iterable[str], optional): selected metric families (every family if None)
+
+    Returns:
+        Tuple[str, ...]: selected metric families, in `Config.METRICS` order
+
+    """
+    if metrics is None:
+        return tuple(Config.METRICS)
+
+    metrics = set(metrics)
+    unknown = metrics.difference(Config.METRICS)
+
+    if unknown:
+        raise ValueError(f"Unknown metrics {sorted(unknown)}, please select among {list(Config.METRICS)}")
+
+    if not metrics:
+        raise ValueError("At least one metric should be selected")
+
+    return tuple(metric for metric in Config.METRICS if metric in metrics)
+
+
+def metric_fields(metrics: Iterable[str], question_budget: bool = False) -> Tuple[str, ...]:
+    """
+    Get `PairScores` fields of metric families
+
+    Args:
+        metrics (Iterable[str]): metric families
+        question_budget (bool, optional): whether QAGS is estimated with a question budget, which adds
+            its interval and number of questions. Defaults to False.
+
+    Returns:
+        Tuple[str, ...]: fields of the metric families
+
+    """
+    fields = []
+
+    for metric in metrics:
+        fields.extend(Config.METRICS[metric])
+
+        if metric == "qa_score" and question_budget:
+            fields.extend(Config.QA_BUDGET_FIELDS)
+
+    return tuple(fields)
+
 
 def load_summarizer(model: str) -> object:
     """
@@ -25,6 +185,8 @@ def load_summarizer(model: str) -> object:
         object: Pipeline-based Summarization model
 
     """
+    from transformers import pipeline
+
     return pipeline(
         "summarization",
         model=model,
@@ -100,3 +262,118 @@ def score_qags(source_answers: List, summary_answers: List) -> float:
     if not scores:
         return 0.0
     return sum(scores) / len(scores)
+
+
+def qags_interval(scores: List[float], total: int, z: float = Config.QA_CONFIDENCE_Z) -> Tuple[float, float, float]:
+    """
+    Estimate QAGS Score and its confidence interval from the scores of a subset of questions
+
+    Args:
+        scores (List[float]): token-level F1 score of each answered question
+        total (int): number of questions which could have been asked
+        z (float, optional): z value of the interval. Defaults to `Config.QA_CONFIDENCE_Z`.
+
+    Returns:
+        Tuple[float, float, float]: estimate, lower bound and upper bound of QAGS Score
+
+    """
+    if not scores:
+        # nothing is known about summaries with unanswered questions, and summaries without any are scored 0
+        return (0.0, 0.0, 1.0) if total > 0 else (0.0, 0.0, 0.0)
+
+    estimate = sum(scores) / len(scores)
+
+    if len(scores) >= total:
+        return estimate, estimate, estimate
+
+    if len(scores) == 1:
+        return estimate, 0.0, 1.0
+
+    variance = sum((score - estimate)**2 for score in scores) / (len(scores) - 1)
+    # questions are drawn without replacement from a finite set of questions
+    correction = (total - len(scores)) / (total - 1)
+    margin = z * math.sqrt(variance / len(scores) * correction)
+
+    return estimate, max(0.0, estimate - margin), min(1.0, estimate + margin)
+
+
+def checkpoint_fingerprint(model: str) -> List[str]:
+    """
+    Identify the revision of a checkpoint, so that artifacts cached from its outputs are not reused once it changes
+
+    Args:
+        model (str): model name or path of the local checkpoint
+
+    Returns:
+        List[str]: file names, sizes and modification times of a local checkpoint, or the commit of the cached
+            snapshot of a HuggingFace Hub model (empty if it is not downloaded yet)
+
+    """
+    if os.path.isdir(model):
+        fingerprint = []
+        for filename in sorted(os.listdir(model)):
+            filepath = os.path.join(model, filename)
+            fingerprint.append(f"{filename}:{os.path.getsize(filepath)}:{os.path.getmtime(filepath)}")
+        return fingerprint
+
+    try:
+        from huggingface_hub import try_to_load_from_cache
+
+        config_path = try_to_load_from_cache(model, "config.json")
+    except (ImportError, ValueError):
+        return []
+
+    # snapshots of the hub cache are stored as `.../snapshots/<commit>/config.json`
+    if isinstance(config_path, str):
+        return [os.path.basename(os.path.dirname(config_path))]
+    return []
+
+
+def cache_path(kind: str, task: str, model: str, versions: List[str]) -> Optional[str]:
+    """
+    Get the cache path of an artifact derived from a checkpoint (e.g. its exported graph), which changes with
+    the revision of the checkpoint and with the versions the artifact depends on
+
+    Args:
+        kind (str): kind of the artifact, which is also the cache directory it is stored in
+        task (str): task the model is loaded for
+        model (str): model name or path of the local checkpoint
+        versions (List[str]): versions of the libraries (or formats) the artifact depends on
+
+    Returns:
+        Optional[str]: path of the artifact without extension (None if the revision of the checkpoint is unknown,
+            e.g. a hub model which is not downloaded yet)
+
+    """
+    revision = checkpoint_fingerprint(model)
+    if not revision:
+        return None
+
+    digest = hashlib.sha1("|".join([task, model] + versions + revision).encode("utf-8")).hexdigest()[:16]
+    name = os.path.basename(os.path.normpath(model)) or "model"
+    return os.path.join(Config.CACHE_DIR, kind, f"{task}-{name}-{digest}")
+
+
+@contextlib.contextmanager
+def atomic_write(path: str) -> Iterator[str]:
+    """
+    Write a file through a temporary path, which only replaces the file once it is fully written
+
+    Concurrent writers of the same file (e.g. worker processes) never let readers load it partially written.
+
+    Args:
+        path (str): path of the file
+
+    Returns:
+        Iterator[str]: temporary path the file should be written to
+
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
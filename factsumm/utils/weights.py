@@ -0,0 +1,63 @@
+import logging
+import os
+from typing import Callable, Optional
+
+import torch
+
+from factsumm.utils.utils import atomic_write, cache_path
+
+
+def weights_path(task: str, model: str) -> Optional[str]:
+    """
+    Get the cache path of the saved weights of a model, which depends on the revision of its checkpoint
+    and on library versions
+
+    Args:
+        task (str): task the model is loaded for
+        model (str): model name or path of the local checkpoint
+
+    Returns:
+        Optional[str]: path of the saved weights (None if the revision of the checkpoint is unknown, e.g. a hub model
+            which is not downloaded yet)
+
+    """
+    import transformers
+
+    path = cache_path("weights", task, model, [transformers.__version__, torch.__version__])
+    return f"{path}.pt" if path is not None else None
+
+
+def load_cached(task: str, model_name: str, load_model: Callable[[], torch.nn.Module]) -> torch.nn.Module:
+    """
+    Load a model whose weights are memory-mapped from the local weights cache, saving the model first
+    if it is not cached yet
+
+    Mapped weights are paged in from the file instead of being copied into process memory, so that reloading
+    a released model is cheap, and their pages are shared by worker processes and can be reclaimed by the OS.
+
+    Args:
+        task (str): task the model is loaded for
+        model_name (str): model name or path of the local checkpoint
+        load_model (Callable[[], torch.nn.Module]): function loading the model (only called on cache miss)
+
+    Returns:
+        torch.nn.Module: loaded model (on CPU)
+
+    """
+    path = weights_path(task, model_name)
+
+    if path is None or not os.path.exists(path):
+        model = load_model()
+
+        # revision of a hub model is only known once it is downloaded
+        path = weights_path(task, model_name)
+        if path is None:
+            logging.warning("Revision of %s is unknown, so its weights are not cached", model_name)
+            return model
+
+        logging.info("Saving weights of %s into %s...", model_name, path)
+        with atomic_write(path) as tmp_path:
+            torch.save(model, tmp_path)
+
+    # the cache only holds models saved above, so the whole module (not only its tensors) is unpickled
+    return torch.load(path, map_location="cpu", mmap=True, weights_only=False)
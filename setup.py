@@ -8,6 +8,7 @@ requirements = [
     "protobuf==4.25.1",
     "sentencepiece==0.1.99",
     "sumeval==0.2.2",
+    "numpy>=1.20",
 ]
 
 VERSION = {}
@@ -33,5 +34,11 @@ setup(
     packages=find_packages(include=["factsumm", "factsumm.*"]),
     install_requires=requirements,
     python_requires=">=3.8.0",
-    extras_require={},
+    extras_require={
+        "parquet": ["pyarrow"],
+        "onnx": ["onnx", "onnxruntime"],
+    },
+    entry_points={
+        "console_scripts": ["factsumm=factsumm.cli:main"],
+    },
 )
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import pytest
+
+from benchmarks.models import build_models, register_bert_score
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "tiny_models: set the `models` class attribute to the tiny checkpoints")
+
+
+@pytest.fixture(scope="session")
+def tiny_models():
+    """
+    Tiny randomly initialized checkpoints of every model FactSumm uses, built once without network
+    """
+    models = build_models(os.path.join(tempfile.gettempdir(), "factsumm-tests", "models"))
+    register_bert_score(models["bert_score_model"])
+    return models
+
+
+@pytest.fixture(scope="class", autouse=True)
+def _class_models(request):
+    # unittest classes cannot request fixtures, and their `setUpClass` runs after class fixtures
+    if request.cls is not None and request.node.get_closest_marker("tiny_models") is not None:
+        request.cls.models = request.getfixturevalue("tiny_models")
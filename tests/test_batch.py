@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+import pytest
+import torch
+from transformers import LukeForEntityPairClassification
+
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+
+
+@pytest.mark.tiny_models
+class TestScoreBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pairs = make_pairs(3, 2, seed=1)
+        # two summaries of the same source share its analysis
+        cls.pairs.append((cls.pairs[0][0], cls.pairs[1][1]))
+
+    def test_same_scores_as_score_pairs(self):
+        sources, summaries = zip(*self.pairs)
+        expected = FactSumm(**self.models).score_pairs(list(sources), list(summaries))
+
+        scores = FactSumm(**self.models).score_batch(self.pairs)
+        self.assertEqual([pair_scores.to_dict() for pair_scores in scores], expected)
+
+    def test_same_scores_with_question_budget(self):
+        sources, summaries = zip(*self.pairs)
+        expected = FactSumm(**self.models, question_budget=2).score_pairs(list(sources), list(summaries))
+
+        scores = FactSumm(**self.models, question_budget=2).score_batch(self.pairs)
+        self.assertEqual([pair_scores.to_dict() for pair_scores in scores], expected)
+
+
+@pytest.mark.tiny_models
+class TestScoreCandidates(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the random RE model predicts a single label, so its classifier is scaled up for candidates to have facts
+        cls.directory = tempfile.TemporaryDirectory()
+        rel_model = shutil.copytree(cls.models["rel_model"], os.path.join(cls.directory.name, "rel"))
+        model = LukeForEntityPairClassification.from_pretrained(rel_model)
+        torch.manual_seed(0)
+        model.classifier.weight.data.normal_(std=10.0)
+        model.save_pretrained(rel_model)
+        cls.models = {**cls.models, "rel_model": rel_model}
+
+        ((cls.source, _),) = make_pairs(1, 4, seed=2)
+        # candidates copy overlapping lines of the source, so that they query some of its facts
+        cls.lines = FactSumm()._segment_sentence(cls.source)
+        cls.summaries = [" ".join(cls.lines[i:i + 2]) for i in range(3)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def score(self, source, summaries):
+        factsumm = FactSumm(**self.models)
+        counters, forwarded = Counter(), Counter()
+        factsumm.add_hook(lambda stage, wall, cpu, stage_counters: counters.update(stage_counters))
+
+        model = factsumm._model
+
+        def recorded(task):
+            if task != "rel":
+                return model(task)
+
+            def extract(total_lines):
+                forwarded.update((line["text"], *line["spans"]) for lines in total_lines for line in lines)
+                return model(task)(total_lines)
+
+            return extract
+
+        factsumm._model = recorded
+        return factsumm.score_candidates(source, summaries), counters, forwarded
+
+    def test_same_scores_as_call(self):
+        scores, _, _ = self.score(self.source, self.summaries)
+        factsumm = FactSumm(**self.models)
+        self.assertEqual(scores, [factsumm(self.source, summary) for summary in self.summaries])
+
+    def test_source_analyzed_once(self):
+        _, counters, forwarded = self.score(self.source, self.summaries)
+
+        # the same work as scoring every candidate against a source of its own, but for the source side
+        expected = Counter()
+        for summary in self.summaries:
+            expected.update(self.score(self.source, [summary])[1])
+
+        source_lines = len(self.lines)
+        extra = len(self.summaries) - 1
+        self.assertEqual(counters["lines"], expected["lines"] - extra * source_lines)
+        self.assertEqual(counters["ner_lines"], expected["ner_lines"] - extra * source_lines)
+        self.assertEqual(counters["qa_contexts"], expected["qa_contexts"] - extra)
+        # lines of the first candidate are encoded along with the (same) lines of the source
+        self.assertEqual(counters["lines_encoded"], source_lines + 2 * extra)
+
+        # entity pairs of a line are passed to Relation Extraction once for each candidate copying the line,
+        # and at most once for the source, whichever candidates queried them
+        copies = {key: sum(key[0] in summary for summary in self.summaries) for key in forwarded}
+        self.assertTrue(all(forwarded[key] - copies[key] in (0, 1) for key in forwarded))
+        self.assertIn(1, [forwarded[key] - copies[key] for key in forwarded])
+        self.assertEqual(counters["rel_pairs"], sum(forwarded.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
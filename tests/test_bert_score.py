@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+import pytest
+from bert_score import BERTScorer
+
+from benchmarks.models import BERT_SCORE_LAYERS
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+from factsumm.utils.module_sentence import load_bert_score
+
+
+@pytest.mark.tiny_models
+class TestBertScore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.factsumm = FactSumm(**cls.models, metrics=["bert_score"])
+        cls.pairs = make_pairs(2, 3, seed=4)
+
+    def test_same_scores_as_bert_scorer(self):
+        scorer = BERTScorer(model_type=self.models["bert_score_model"], num_layers=BERT_SCORE_LAYERS, device="cpu")
+        score = load_bert_score(self.models["bert_score_model"], "cpu")
+
+        for source, summary in self.pairs:
+            source_lines = self.factsumm._segment_sentence(source)
+            summary_lines = self.factsumm._segment_sentence(summary)
+
+            # each summary line takes its best score among all source lines, as `BERTScorer` does with references
+            for scores, line in zip(zip(*score(summary_lines, source_lines)), summary_lines):
+                expected = [float(value) for value in scorer.score([line], [source_lines])]
+                for value, expected_value in zip(scores, expected):
+                    self.assertAlmostEqual(float(value), expected_value, places=5)
+
+    def test_retrieved_lines(self):
+        factsumm = FactSumm(**self.models, metrics=["bert_score"], retrieval_top_k=1)
+        score = load_bert_score(self.models["bert_score_model"], "cpu")
+        source, summary = make_pairs(1, 6, seed=8)[0]
+        source_lines = factsumm._segment_sentence(source)
+        summary_lines = factsumm._segment_sentence(summary)
+
+        # each summary line is only matched against the source lines retrieved for it
+        document = factsumm._document(source)
+        retrieved = [factsumm._retrieve_lines(document, line) for line in summary_lines]
+        expected = [score([line], lines) for line, lines in zip(summary_lines, retrieved)]
+        expected = tuple(float(np.mean([line_scores[i] for line_scores in expected])) for i in range(3))
+        self.assertEqual(factsumm.calculate_bert_score(source, summary), expected)
+        (scores,) = factsumm.score_pairs(source, summary)
+        self.assertEqual(tuple(scores["bert_score"].values()), expected)
+
+        # lines retrieved for other summary lines are not matched
+        union = score(summary_lines, [line for line in source_lines if any(line in lines for lines in retrieved)])
+        self.assertNotEqual(expected, tuple(float(np.mean(values)) for values in union))
+
+    def test_empty_lines(self):
+        source, summary = self.pairs[0]
+
+        for empty in ("", "   "):
+            self.assertEqual(self.factsumm.calculate_bert_score(source, empty), (0.0, 0.0, 0.0))
+            self.assertEqual(self.factsumm.calculate_bert_score(empty, summary), (0.0, 0.0, 0.0))
+
+        (scores,) = self.factsumm.score_pairs(source, "")
+        self.assertEqual(scores["bert_score"], {"precision": 0.0, "recall": 0.0, "f1": 0.0})
+
+        score = load_bert_score(self.models["bert_score_model"], "cpu")
+        precision, recall, f1 = score(self.factsumm._segment_sentence(summary), [])
+        self.assertEqual((precision.tolist(), recall.tolist(), f1.tolist()), ([0.0] * len(precision),) * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import tempfile
+import unittest
+
+from factsumm.cli import _load_checkpoint, _write_scores
+from factsumm.utils.corpus import Checkpoint, iter_chunks, iter_records
+from factsumm.utils.utils import PairScores
+
+
+class Scorer:
+    """
+    Scores each pair with the length of its summary, failing after `fail_after` pairs if given
+    """
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.scored = 0
+
+    def iter_scores(self, pairs, verbose=False, device="cpu"):
+        for _, summary in pairs:
+            if self.fail_after is not None and self.scored == self.fail_after:
+                raise RuntimeError("killed")
+            self.scored += 1
+            yield PairScores(rouge_1=float(len(summary)), rouge_2=0.0, rouge_l=0.0)
+
+
+class TestCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, "corpus.jsonl")
+        self.output = os.path.join(self.directory.name, "scores.jsonl")
+
+        self.records = [{"id": i, "source": "source", "summary": "s" * (i + 1)} for i in range(7)]
+        with open(self.input, "w", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+            f.write("\n")
+
+        self.args = argparse.Namespace(
+            input=self.input,
+            output=self.output,
+            format=None,
+            source_key="source",
+            summary_key="summary",
+            id_key="id",
+            chunk_size=2,
+            checkpoint=None,
+            no_resume=False,
+            verbose=False,
+            device="cpu",
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_job(self, scorer: Scorer):
+        checkpoint = _load_checkpoint(self.args)
+        records = iter_records(self.input, skip=checkpoint.processed)
+        _write_scores(scorer, self.args, checkpoint, records)
+
+    def read_output(self):
+        with open(self.output, "rb") as f:
+            content = f.read()
+        self.assertNotIn(b"\0", content)
+        return [json.loads(line) for line in content.splitlines()]
+
+    def assert_complete(self):
+        lines = self.read_output()
+        self.assertEqual([line["index"] for line in lines], list(range(len(self.records))))
+        self.assertEqual([line["id"] for line in lines], [record["id"] for record in self.records])
+        self.assertEqual([line["rouge"]["rouge-1"] for line in lines], [i + 1.0 for i in range(len(self.records))])
+
+    def test_iter_records(self):
+        self.assertEqual(list(iter_records(self.input)), self.records)
+        self.assertEqual(list(iter_records(self.input, skip=5)), self.records[5:])
+
+        csv_path = os.path.join(self.directory.name, "corpus.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("source,summary\na,b\nc,d\n")
+        self.assertEqual(list(iter_records(csv_path, skip=1)), [{"source": "c", "summary": "d"}])
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_chunks([], 2)), [])
+
+    def test_checkpoint(self):
+        path = os.path.join(self.directory.name, "job.ckpt")
+        Checkpoint(path).update(4, 120)
+
+        checkpoint = Checkpoint(path)
+        self.assertEqual((checkpoint.processed, checkpoint.output_offset), (4, 120))
+        self.assertFalse(os.path.exists(f"{path}.tmp"))
+        self.assertFalse(checkpoint.verify(self.output))
+
+    def test_resume_after_kill(self):
+        # the 5th pair fails, after the 3rd chunk was only partially written
+        with self.assertRaises(RuntimeError):
+            self.run_job(Scorer(fail_after=5))
+
+        self.assertEqual(Checkpoint(f"{self.output}.ckpt").processed, 4)
+        self.assertEqual(len(self.read_output()), 5)
+
+        # results written after the checkpoint are dropped and computed again
+        scorer = Scorer()
+        self.run_job(scorer)
+        self.assertEqual(scorer.scored, 3)
+        self.assert_complete()
+
+    def test_missing_output(self):
+        with self.assertRaises(RuntimeError):
+            self.run_job(Scorer(fail_after=5))
+        os.remove(self.output)
+
+        scorer = Scorer()
+        with self.assertLogs("factsumm.cli", level="WARNING"):
+            self.run_job(scorer)
+        self.assertEqual(scorer.scored, len(self.records))
+        self.assert_complete()
+
+    def test_truncated_output(self):
+        with self.assertRaises(RuntimeError):
+            self.run_job(Scorer(fail_after=5))
+
+        with open(self.output, "r+b") as f:
+            f.truncate(10)
+
+        scorer = Scorer()
+        with self.assertLogs("factsumm.cli", level="WARNING"):
+            self.run_job(scorer)
+        self.assertEqual(scorer.scored, len(self.records))
+        self.assert_complete()
+
+    def test_no_resume(self):
+        self.run_job(Scorer())
+        self.args.no_resume = True
+
+        scorer = Scorer()
+        self.run_job(scorer)
+        self.assertEqual(scorer.scored, len(self.records))
+        self.assert_complete()
+
+
+if __name__ == "__main__":
+    unittest.main()
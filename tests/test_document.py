@@ -0,0 +1,74 @@
+import unittest
+from collections import Counter
+
+import pytest
+
+from benchmarks.run import make_pairs
+from factsumm import Document, FactSumm
+
+
+class TestDocument(unittest.TestCase):
+
+    def test_memoize(self):
+        document = Document("Messi joined Barcelona.")
+        calls = []
+
+        def segment():
+            calls.append(document.text)
+            return [document.text]
+
+        self.assertEqual(document.memoize("lines", segment), ["Messi joined Barcelona."])
+        self.assertEqual(document.memoize("lines", segment), ["Messi joined Barcelona."])
+        self.assertEqual(calls, ["Messi joined Barcelona."])
+        self.assertIn("lines", document)
+        self.assertNotIn("entities", document)
+
+
+@pytest.mark.tiny_models
+class TestDocumentReuse(unittest.TestCase):
+
+    def setUp(self):
+        ((source, summary),) = make_pairs(1, 3, seed=4)
+        self.source, self.summary = Document(source), Document(summary)
+        self.factsumm = FactSumm(**self.models)
+
+        self.counters = Counter()
+        self.factsumm.add_hook(lambda stage, wall, cpu, counters: self.counters.update({stage: 1, **counters}))
+
+    def work(self, func):
+        self.counters.clear()
+        func(self.source, self.summary)
+        return dict(self.counters)
+
+    def test_reuse(self):
+        facts = self.work(self.factsumm.extract_facts)
+        self.assertEqual(facts["segmentation"], 2)
+        self.assertEqual(facts["ner_lines"], facts["lines"])
+
+        # lines and entities of both documents are reused to generate and answer questions
+        qas = self.work(self.factsumm.extract_qas)
+        self.assertEqual(qas["qg"], 1)
+        self.assertEqual(qas["qa_contexts"], 2)
+        self.assertNotIn("segmentation", qas)
+        self.assertNotIn("ner", qas)
+
+        lines = set(self.source["lines"]) | set(self.summary["lines"])
+        bert_score = self.work(self.factsumm.calculate_bert_score)
+        self.assertEqual(bert_score["lines_encoded"], len(lines))
+        self.assertNotIn("segmentation", bert_score)
+
+        # every artifact is reused by later calls, which only run the stages whose outputs are not memoized
+        entities = self.source["entities"]
+        facts = self.work(self.factsumm.extract_facts)
+        qas = self.work(self.factsumm.extract_qas)
+        bert_score = self.work(self.factsumm.calculate_bert_score)
+
+        self.assertIs(self.source["entities"], entities)
+        self.assertEqual(facts["rel_pairs"], 0)
+        self.assertNotIn("qg", qas)
+        self.assertEqual(qas["qa_contexts"], 0)
+        self.assertEqual(bert_score["lines_encoded"], 0)
+        self.assertFalse({"segmentation", "ner"} & (set(facts) | set(qas) | set(bert_score)))
+
+if __name__ == "__main__":
+    unittest.main()
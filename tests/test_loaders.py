@@ -0,0 +1,20 @@
+import tempfile
+import unittest
+
+from factsumm.utils.module_entity import load_ner, load_rel
+from factsumm.utils.module_question import load_qa, load_qg
+
+
+class TestLoaders(unittest.TestCase):
+
+    def test_load_errors_reach_the_caller(self):
+        # a directory without checkpoint files fails to load without network
+        with tempfile.TemporaryDirectory() as model:
+            for load in (load_ner, load_rel, load_qg, load_qa):
+                with self.subTest(load=load.__name__), self.assertLogs(level="WARNING"):
+                    with self.assertRaises(OSError):
+                        load(model, "cpu")
+
+
+if __name__ == "__main__":
+    unittest.main()
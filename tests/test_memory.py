@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.models import build_models, register_bert_score
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+from factsumm.utils import registry
+from factsumm.utils.utils import Config, atomic_write
+from factsumm.utils.weights import load_cached, weights_path
+
+
+class TestLowMemory(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # checkpoints of their own, so that models loaded by other tests are not mistaken for these
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.models = build_models(os.path.join(cls.directory.name, "models"))
+        register_bert_score(cls.models["bert_score_model"])
+
+        sources, summaries = zip(*make_pairs(2, 1, seed=3))
+        cls.sources, cls.summaries = list(sources), list(summaries)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def loaded_tasks(self) -> set:
+        return {task for task, model, _, _ in registry.loaded() if model in self.models.values()}
+
+    def test_only_running_stage_is_resident(self):
+        factsumm = FactSumm(**self.models, low_memory=True)
+        resident = []
+        factsumm.add_hook(lambda stage, wall, cpu, counters: resident.append((stage, self.loaded_tasks())))
+
+        scores = factsumm.score_pairs(self.sources, self.summaries)
+        for stage, tasks in resident:
+            if stage in Config.STAGES:
+                self.assertEqual(tasks, {stage})
+        self.assertEqual({stage for stage, _ in resident if stage in Config.STAGES}, set(Config.STAGES))
+
+        factsumm.release()
+        self.assertEqual(self.loaded_tasks(), set())
+
+        full = FactSumm(**self.models)
+        try:
+            self.assertEqual(scores, full.score_pairs(self.sources, self.summaries))
+            self.assertEqual(self.loaded_tasks(), set(Config.STAGES))
+        finally:
+            full.release()
+
+    def test_weights_cache(self):
+        factsumm = FactSumm(**self.models, low_memory=True)
+        expected = factsumm.score_pairs(self.sources, self.summaries)
+        factsumm.release()
+
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.object(Config, "CACHE_DIR", cache_dir):
+            # models released between stages are reloaded from memory-mapped weights
+            factsumm = FactSumm(**self.models, low_memory=True, weights_cache=True)
+            self.assertEqual(factsumm.score_pairs(self.sources, self.summaries), expected)
+            self.assertEqual(factsumm.score_pairs(self.sources, self.summaries), expected)
+            factsumm.release()
+
+            cached = os.listdir(os.path.join(cache_dir, "weights"))
+            self.assertEqual(sorted(name.split("-")[0] for name in cached), sorted(Config.STAGES))
+
+
+class TestWeightsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = mock.patch.object(Config, "CACHE_DIR", self.directory.name)
+        self.cache_dir.start()
+
+        self.checkpoint = os.path.join(self.directory.name, "checkpoint")
+        os.makedirs(self.checkpoint)
+        with open(os.path.join(self.checkpoint, "config.json"), "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        self.cache_dir.stop()
+        self.directory.cleanup()
+
+    def test_weights_path(self):
+        path = weights_path("qa", self.checkpoint)
+        self.assertTrue(path.startswith(os.path.join(self.directory.name, "weights", "qa-checkpoint-")))
+        self.assertEqual(weights_path("qa", self.checkpoint), path)
+        self.assertNotEqual(weights_path("qg", self.checkpoint), path)
+
+        # weights saved from a modified checkpoint are never reused
+        with open(os.path.join(self.checkpoint, "config.json"), "w") as f:
+            f.write('{"hidden_size": 32}')
+        self.assertNotEqual(weights_path("qa", self.checkpoint), path)
+
+    def test_load_cached(self):
+        import torch
+
+        calls = []
+
+        def load_model():
+            calls.append(None)
+            return torch.nn.Linear(4, 2)
+
+        model = load_cached("qa", self.checkpoint, load_model)
+        cached = load_cached("qa", self.checkpoint, load_model)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(os.path.exists(weights_path("qa", self.checkpoint)))
+        for tensor, cached_tensor in zip(model.state_dict().values(), cached.state_dict().values()):
+            self.assertTrue(torch.equal(tensor, cached_tensor))
+
+    def test_hub_revision(self):
+        import torch
+
+        snapshot = os.path.join("models--org--model", "snapshots", "{}", "config.json")
+
+        with mock.patch("huggingface_hub.try_to_load_from_cache", return_value=snapshot.format("a1")):
+            path = weights_path("qa", "org/model")
+        with mock.patch("huggingface_hub.try_to_load_from_cache", return_value=snapshot.format("b2")):
+            self.assertNotEqual(weights_path("qa", "org/model"), path)
+
+        # weights of an unknown revision are never cached
+        with mock.patch("huggingface_hub.try_to_load_from_cache", return_value=None):
+            self.assertIsNone(weights_path("qa", "org/model"))
+            model = load_cached("qa", "org/model", lambda: torch.nn.Linear(4, 2))
+
+        self.assertIsInstance(model, torch.nn.Linear)
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "weights")))
+
+    def test_atomic_write(self):
+        path = os.path.join(self.directory.name, "weights", "model.pt")
+
+        with self.assertRaises(RuntimeError), atomic_write(path) as tmp_path:
+            with open(tmp_path, "w") as f:
+                f.write("partial")
+            raise RuntimeError("killed")
+
+        self.assertEqual(os.listdir(os.path.dirname(path)), [])
+
+        with atomic_write(path) as tmp_path:
+            with open(tmp_path, "w") as f:
+                f.write("complete")
+            self.assertFalse(os.path.exists(path))
+
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["model.pt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+import unittest
+
+import pytest
+
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+
+MODELS = {
+    "fact_score": ["ner", "rel"],
+    "qa_score": ["ner", "qg", "qa"],
+    "rouge": [],
+    "bert_score": ["bert_score"],
+}
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def imported(self, code: str) -> list:
+        code = f"import sys\n{code}\nprint(' '.join(sorted(set(sys.modules) & {{'torch', 'transformers'}})))"
+        return subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True).stdout.split()
+
+    def test_import(self):
+        self.assertEqual(self.imported("import factsumm"), [])
+
+    def test_rouge(self):
+        # ROUGE alone is scored without the deep learning stack
+        code = "from factsumm import FactSumm\nFactSumm(metrics=['rouge'])('Messi joined Barcelona.', 'Messi won.')"
+        self.assertEqual(self.imported(code), [])
+
+
+@pytest.mark.tiny_models
+class TestMetricSelection(unittest.TestCase):
+
+    def test_unselected_models_are_not_loaded(self):
+        ((source, summary),) = make_pairs(1, 2, seed=7)
+
+        for metrics in (["fact_score"], ["qa_score"], ["rouge", "bert_score"]):
+            factsumm = FactSumm(**self.models, metrics=metrics)
+            factsumm.score_pairs(source, summary)
+
+            selected = {stage for metric in metrics for stage in MODELS[metric]}
+            for stage in ("ner", "rel", "qg", "qa", "bert_score"):
+                # models are given as checkpoint paths, which are only replaced by models once loaded
+                self.assertEqual(isinstance(getattr(factsumm, stage), str), stage not in selected, (metrics, stage))
+
+            factsumm.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pytest
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, LukeForEntityPairClassification, LukeTokenizer, pipeline
+
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+from factsumm.utils.module_entity import load_rel
+from factsumm.utils.module_question import load_qa, load_qg
+
+LINES = [
+    "Messi joined Barcelona in 2004.",
+    "Ronaldo left Madrid for Turin after nine seasons with Real Madrid in Spain.",
+    "Kane and Son played for Tottenham in London.",
+]
+
+
+def entities(line: str, words: list) -> list:
+    return [{"word": word, "entity_group": "ORG", "start": line.index(word), "end": line.index(word) + len(word)}
+            for word in words]
+
+
+@pytest.mark.tiny_models
+class TestRelationExtraction(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the random RE model predicts a single label, so its classifier is scaled up to spread predictions
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.rel_model = shutil.copytree(cls.models["rel_model"], os.path.join(cls.directory.name, "rel"))
+        model = LukeForEntityPairClassification.from_pretrained(cls.rel_model)
+        torch.manual_seed(0)
+        model.classifier.weight.data.normal_(std=10.0)
+        model.save_pretrained(cls.rel_model)
+
+        total_entities = [
+            entities(LINES[0], ["Messi", "Barcelona", "2004"]),
+            entities(LINES[1], ["Ronaldo", "Madrid", "Turin", "Real Madrid", "Spain"]),
+            entities(LINES[2], ["Kane", "Son", "Tottenham", "London"]),
+        ]
+        cls.perms = FactSumm().build_perm(LINES, total_entities)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_batch_size(self):
+        # pairs of every length are padded together, yet predictions are those of unpadded pairs
+        expected = load_rel(self.rel_model, "cpu", batch_size=1)(self.perms)
+        triples = load_rel(self.rel_model, "cpu", batch_size=8)(self.perms)
+
+        self.assertEqual(triples, expected)
+        self.assertEqual(len(triples), len(LINES))
+        self.assertGreater(len({relation for line_triples in triples for _, relation, _ in line_triples}), 1)
+
+    def test_same_triples_as_single_pairs(self):
+        # batched pairs are predicted like pairs forwarded one by one without padding
+        tokenizer = LukeTokenizer.from_pretrained(self.rel_model)
+        model = LukeForEntityPairClassification.from_pretrained(self.rel_model).eval()
+
+        expected = []
+        for line_perms in self.perms:
+            line_triples = []
+            for perm in line_perms:
+                (head_start, head_end), (tail_start, tail_end) = perm["spans"][0], perm["spans"][-1]
+                tokens = tokenizer(
+                    perm["text"],
+                    entity_spans=[(head_start, head_end), (tail_start, tail_end)],
+                    return_tensors="pt",
+                )
+                with torch.no_grad():
+                    relation = model.config.id2label[int(model(**tokens).logits[0].argmax())]
+
+                if relation != "no_relation":
+                    line_triples.append(
+                        (perm["text"][head_start:head_end], relation, perm["text"][tail_start:tail_end]))
+            expected.append(line_triples)
+
+        self.assertEqual(load_rel(self.rel_model, "cpu", batch_size=8)(self.perms), expected)
+        self.assertGreater(sum(len(line_triples) for line_triples in expected), 0)
+
+    def test_flat_input(self):
+        extract_relation = load_rel(self.rel_model, "cpu", batch_size=4)
+        triples = extract_relation(self.perms)
+
+        for line_perms, line_triples in zip(self.perms, triples):
+            self.assertEqual(extract_relation(line_perms), line_triples)
+        self.assertEqual(extract_relation([]), [])
+
+
+@pytest.mark.tiny_models
+class TestQuestionGeneration(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the random QG model repeats a single token, so its weights are scaled up to vary questions
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.qg_model = shutil.copytree(cls.models["qg_model"], os.path.join(cls.directory.name, "qg"))
+        model = AutoModelForSeq2SeqLM.from_pretrained(cls.qg_model)
+        torch.manual_seed(0)
+        for parameter in model.parameters():
+            parameter.data.normal_(std=1.0)
+        model.save_pretrained(cls.qg_model)
+
+        cls.total_entities = [
+            entities(LINES[0], ["Messi", "Barcelona", "2004"]),
+            entities(LINES[1], ["Ronaldo", "Madrid", "Turin", "Real Madrid", "Spain"]),
+            # repeated entities of a line are asked about once
+            entities(LINES[2], ["Kane", "Son", "Tottenham", "London", "Kane"]),
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_batch_size(self):
+        # prompts of every length are padded together, yet questions are those of unpadded prompts
+        expected = load_qg(self.qg_model, "cpu", batch_size=1, max_new_tokens=8)(LINES, self.total_entities)
+        qa_pairs = load_qg(self.qg_model, "cpu", batch_size=8, max_new_tokens=8)(LINES, self.total_entities)
+
+        self.assertEqual(qa_pairs, expected)
+        self.assertEqual([qa_pair["answer"] for qa_pair in qa_pairs][-4:], ["Kane", "Son", "Tottenham", "London"])
+        self.assertTrue(all("</s>" not in qa_pair["question"] for qa_pair in qa_pairs))
+        self.assertGreater(len({qa_pair["question"] for qa_pair in qa_pairs}), 1)
+
+    def test_same_questions_as_single_prompts(self):
+        # batched prompts are generated like prompts padded to the maximum length one by one
+        tokenizer = AutoTokenizer.from_pretrained(self.qg_model)
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.qg_model).eval()
+
+        expected = []
+        for line, line_entities in zip(LINES, self.total_entities):
+            for entity in dict.fromkeys(entity["word"] for entity in line_entities):
+                tokens = tokenizer(
+                    f"answer: {entity}  context: {line} </s>",
+                    padding="max_length",
+                    max_length=512,
+                    truncation=True,
+                    return_tensors="pt",
+                )
+                with torch.no_grad():
+                    question = tokenizer.decode(model.generate(**tokens, max_new_tokens=8)[0])
+                question = question.replace("</s>", "").replace("<pad> question: ", "")
+                expected.append({"question": question, "answer": entity})
+
+        qa_pairs = load_qg(self.qg_model, "cpu", batch_size=8, max_new_tokens=8)(LINES, self.total_entities)
+        self.assertEqual(qa_pairs, expected)
+
+    def test_nested_input(self):
+        generate_question = load_qg(self.qg_model, "cpu", batch_size=4, max_new_tokens=8)
+        documents = [LINES[:2], LINES[2:]]
+        total_qa_pairs = generate_question(documents, [self.total_entities[:2], self.total_entities[2:]])
+
+        self.assertEqual(len(total_qa_pairs), len(documents))
+        self.assertEqual(total_qa_pairs[0], generate_question(LINES[:2], self.total_entities[:2]))
+        self.assertEqual(total_qa_pairs[1], generate_question(LINES[2:], self.total_entities[2:]))
+
+
+@pytest.mark.tiny_models
+class TestQuestionAnswering(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pipeline = pipeline("question-answering", model=cls.models["qa_model"], framework="pt", device=-1)
+        cls.contexts = [source for source, _ in make_pairs(4, 2, seed=5)]
+        cls.qa_pairs = [{"question": question, "answer": ""} for question in (
+            "Who plays for Barcelona?",
+            "When was he born?",
+            "Where is the club?",
+            "What did the team win in the final season?",
+        )]
+
+    def expected(self, context: str, question: str, **kwargs) -> dict:
+        return self.pipeline(question=question, context=context, handle_impossible_answer=True, **kwargs)
+
+    def test_same_answers_as_pipeline(self):
+        answer_question = load_qa(self.models["qa_model"], "cpu", batch_size=3)
+
+        # every context fits in a single window, where spans are selected exactly like the pipeline
+        for context, answers in zip(self.contexts, answer_question(self.contexts, self.qa_pairs)):
+            for qa_pair, answer in zip(self.qa_pairs, answers):
+                expected = self.expected(context, qa_pair["question"])["answer"]
+                self.assertEqual(answer["prediction"], expected or "<unanswerable>")
+
+    def test_long_context(self):
+        context = " ".join(self.contexts)
+
+        for qa_pair in self.qa_pairs:
+            # windows are shared by every question, so they only match those of the pipeline for questions
+            # of `max_question_len` tokens
+            num_tokens = len(self.pipeline.tokenizer(qa_pair["question"], add_special_tokens=False)["input_ids"])
+            answer_question = load_qa(
+                self.models["qa_model"],
+                "cpu",
+                max_seq_len=64,
+                doc_stride=16,
+                max_question_len=num_tokens,
+            )
+            (answer,) = answer_question(context, [qa_pair])
+            expected = self.expected(context, qa_pair["question"], max_seq_len=64, doc_stride=16)
+
+            if expected["start"] > 0 and context[expected["start"] - 1].isalnum():
+                # unlike the pipeline, a span cut by the start of its window is extended to the whole word
+                self.assertTrue(answer["prediction"].endswith(expected["answer"]))
+                self.assertNotEqual(answer["prediction"], expected["answer"])
+            else:
+                self.assertEqual(answer["prediction"], expected["answer"] or "<unanswerable>")
+
+    def test_windows_too_short(self):
+        with self.assertRaises(ValueError):
+            load_qa(self.models["qa_model"], "cpu", max_seq_len=64, max_question_len=64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pytest
+import torch
+from transformers import LukeForEntityPairClassification, LukeTokenizer
+
+from factsumm.utils.module_onnx import EXAMPLE_SPANS, EXAMPLE_TEXT, check_parity, graph_path, load_onnx
+from factsumm.utils.utils import Config
+
+
+@pytest.mark.tiny_models
+class TestOnnx(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = mock.patch.object(Config, "CACHE_DIR", self.directory.name)
+        self.cache_dir.start()
+
+        self.checkpoint = self.models["rel_model"]
+        tokenizer = LukeTokenizer.from_pretrained(self.checkpoint)
+        self.inputs = dict(tokenizer([EXAMPLE_TEXT], entity_spans=[EXAMPLE_SPANS], return_tensors="pt"))
+
+    def tearDown(self):
+        self.cache_dir.stop()
+        self.directory.cleanup()
+
+    def load_model(self):
+        return LukeForEntityPairClassification.from_pretrained(self.checkpoint)
+
+    def test_export(self):
+        onnx_model = load_onnx("rel", self.checkpoint, self.load_model, self.inputs, ["logits"])
+        self.assertEqual(onnx_model.path, graph_path("rel", self.checkpoint))
+        self.assertTrue(os.path.exists(onnx_model.path))
+
+        # every dimension is dynamic, so that inputs of other shapes run on the same graph
+        tokenizer = LukeTokenizer.from_pretrained(self.checkpoint)
+        inputs = dict(tokenizer(
+            [EXAMPLE_TEXT, "Cristiano Ronaldo left Real Madrid for Juventus in 2018."],
+            entity_spans=[EXAMPLE_SPANS, [(0, 17), (23, 34)]],
+            padding=True,
+            return_tensors="pt",
+        ))
+        self.assertLess(check_parity(self.load_model(), onnx_model, inputs), 1e-4)
+
+    def test_cached_graph(self):
+        load_onnx("rel", self.checkpoint, self.load_model, self.inputs, ["logits"])
+
+        def load_model():
+            raise AssertionError("cached graphs do not need PyTorch weights")
+
+        onnx_model = load_onnx("rel", self.checkpoint, load_model, self.inputs, ["logits"])
+        self.assertEqual(onnx_model.config.id2label, self.load_model().config.id2label)
+
+    def test_parity_failure(self):
+        model = self.load_model()
+        onnx_model = load_onnx("rel", self.checkpoint, lambda: model, self.inputs, ["logits"])
+
+        with torch.no_grad():
+            model.classifier.weight.mul_(2.0)
+        with self.assertRaises(ValueError):
+            check_parity(model, onnx_model, self.inputs)
+
+    def test_graph_path(self):
+        checkpoint = shutil.copytree(self.checkpoint, os.path.join(self.directory.name, "rel"))
+        path = graph_path("rel", checkpoint)
+        self.assertEqual(graph_path("rel", checkpoint), path)
+        self.assertNotEqual(graph_path("qa", checkpoint), path)
+
+        # graphs exported from a modified checkpoint are never reused
+        with open(os.path.join(checkpoint, "config.json"), "a") as f:
+            f.write("\n")
+        self.assertNotEqual(graph_path("rel", checkpoint), path)
+
+    def test_hub_revision(self):
+        snapshot = os.path.join("models--org--model", "snapshots", "{}", "config.json")
+
+        with mock.patch("huggingface_hub.try_to_load_from_cache", return_value=None):
+            self.assertIsNone(graph_path("rel", "org/model"))
+
+        with mock.patch("huggingface_hub.try_to_load_from_cache", return_value=snapshot.format("a1")):
+            path = graph_path("rel", "org/model")
+        with mock.patch("huggingface_hub.try_to_load_from_cache", return_value=snapshot.format("b2")):
+            self.assertNotEqual(graph_path("rel", "org/model"), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
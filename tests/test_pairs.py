@@ -0,0 +1,101 @@
+import unittest
+
+from factsumm import FactSumm
+
+RELATIONS = [
+    "per:employee_of",
+    "per:origin",
+    "per:date_of_birth",
+    "org:top_members/employees",
+    "org:country_of_headquarters",
+    "org:founded",
+    "org:members",
+]
+
+
+def entity(line: str, word: str, entity_group: str, occurrence: int = 0) -> dict:
+    start = -1
+    for _ in range(occurrence + 1):
+        start = line.index(word, start + 1)
+    return {"word": word, "entity_group": entity_group, "start": start, "end": start + len(word)}
+
+
+class TestPrunePairs(unittest.TestCase):
+
+    def setUp(self):
+        self.line = (
+            "Messi joined Barcelona in 2004 for 10 million dollars, his first club, "
+            "and Messi left Barcelona with 25 percent of the 3 trophies."
+        )
+        self.entities = [
+            entity(self.line, "Messi", "PERSON"),
+            entity(self.line, "Barcelona", "ORG"),
+            entity(self.line, "2004", "DATE"),
+            entity(self.line, "10 million dollars", "MONEY"),
+            entity(self.line, "first", "ORDINAL"),
+            entity(self.line, "Messi", "PERSON", 1),
+            entity(self.line, "Barcelona", "ORG", 1),
+            entity(self.line, "25 percent", "PERCENT"),
+            entity(self.line, "3", "CARDINAL"),
+        ]
+        # the same entity twice, as produced by overlapping NER outputs
+        self.entities.append(dict(self.entities[1]))
+
+    def triples(self, perm: dict, relation: str) -> list:
+        (head_start, head_end), (tail_start, tail_end) = perm["spans"]
+        return [(perm["text"][head_start:head_end], relation, perm["text"][tail_start:tail_end])]
+
+    def test_never_prunes_kept_triples(self):
+        factsumm = FactSumm()
+        perms = factsumm.build_perm([self.line], [self.entities])
+        (kept,), num_pruned = factsumm.prune_perm(perms)
+
+        kept_spans = [tuple(perm["spans"]) for perm in kept]
+        self.assertEqual(len(kept_spans), len(set(kept_spans)))
+        self.assertEqual(num_pruned, len(perms[0]) - len(kept))
+        self.assertGreater(num_pruned, 0)
+
+        for perm in perms[0]:
+            if tuple(perm["spans"]) in kept_spans:
+                continue
+
+            # whatever relation RE would predict, the triple of a pruned pair is filtered out
+            for relation in RELATIONS:
+                self.assertEqual(factsumm._filter_facts(self.triples(perm, relation), self.entities), [])
+
+        # every mention of the same entities is kept, since RE depends on the context of each mention
+        mentions = [spans for spans, perm in zip(kept_spans, kept) if perm["types"] == ["PERSON", "ORG"]]
+        self.assertEqual(len(mentions), 4)
+
+    def test_prune_pair_types(self):
+        perms = FactSumm().build_perm([self.line], [self.entities])
+        (kept,), _ = FactSumm().prune_perm(perms)
+        (typed,), _ = FactSumm(prune_pair_types=True).prune_perm(perms)
+
+        self.assertTrue(any(perm["types"][0] == "DATE" for perm in kept))
+        self.assertFalse(any(perm["types"][0] == "DATE" for perm in typed))
+        self.assertFalse(any(perm["types"][-1] == "PERCENT" for perm in typed))
+        self.assertTrue(all(perm in kept for perm in typed))
+
+    def test_max_pair_distance(self):
+        perms = FactSumm().build_perm([self.line], [self.entities])
+        (kept,), _ = FactSumm(max_pair_distance=2).prune_perm(perms)
+
+        for perm in kept:
+            (head_start, head_end), (tail_start, tail_end) = perm["spans"]
+            self.assertLessEqual(len(self.line[min(head_end, tail_end):max(head_start, tail_start)].split()), 2)
+
+    def test_pair_stats(self):
+        factsumm = FactSumm()
+        perms, (stats,) = factsumm._build_perms([[self.line]], [[self.entities]])
+        _, (head_stats,) = factsumm._build_perms([[self.line]], [[self.entities]], [{"Messi"}])
+        (kept,), num_pruned = factsumm.prune_perm(factsumm.build_perm([self.line], [self.entities]))
+
+        self.assertEqual(stats, {"pairs": 90, "pruned": num_pruned, "head_filtered": 0, "forwarded": len(kept)})
+        self.assertEqual(head_stats["pruned"], num_pruned)
+        self.assertEqual(head_stats["forwarded"], sum(self.line[perm["spans"][0][0]] == "M" for perm in kept))
+        self.assertEqual(head_stats["head_filtered"], len(kept) - head_stats["forwarded"])
+
+
+if __name__ == "__main__":
+    unittest.main()
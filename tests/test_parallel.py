@@ -0,0 +1,51 @@
+import gc
+import unittest
+
+from factsumm import FactSumm
+from factsumm.utils.parallel import WorkerPool, shard_by_source
+
+SOURCES = [
+    "Lionel Messi plays for Barcelona. He was born in Rosario.",
+    "Cristiano Ronaldo plays for Madrid. He was born in Funchal.",
+    "Neymar plays for Paris. He was born in Mogi das Cruzes.",
+]
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_shard_by_source(self):
+        pairs = [("a", "1"), ("b", "2"), ("a", "3"), ("c", "4"), ("b", "5"), ("a", "6"), ("d", "7")]
+        shards = shard_by_source(pairs, shard_size=4)
+
+        self.assertEqual(shards, [[0, 2, 5], [1, 4, 3, 6]])
+        self.assertEqual(sorted(i for shard in shards for i in shard), list(range(len(pairs))))
+
+        # a source with more pairs than a shard still gets a single shard
+        self.assertEqual(shard_by_source([("a", "1")] * 5 + [("b", "2")], shard_size=2), [[0, 1, 2, 3, 4], [5]])
+        self.assertEqual(shard_by_source([], shard_size=2), [])
+
+    def test_same_scores_as_single_process(self):
+        sources = [SOURCES[i % 3] for i in range(10)]
+        summaries = [f"{source.split('.')[0]}. It was match {i}." for i, source in enumerate(sources)]
+        expected = FactSumm(metrics=["rouge"]).score_pairs(sources, summaries)
+
+        with FactSumm(metrics=["rouge"], workers=2, threads_per_worker=1) as factsumm:
+            factsumm._worker_pool().shard_size = 2
+            self.assertEqual(factsumm.score_pairs(sources, summaries), expected)
+            processes = list(factsumm.worker_pool.pool._pool)
+
+        self.assertIsNone(factsumm.worker_pool)
+        self.assertFalse(any(process.is_alive() for process in processes))
+
+    def test_garbage_collected_pool(self):
+        pool = WorkerPool(2, {"metrics": ["rouge"]}, threads_per_worker=1)
+        processes = list(pool.pool._pool)
+        self.assertTrue(all(process.is_alive() for process in processes))
+
+        del pool
+        gc.collect()
+        self.assertFalse(any(process.is_alive() for process in processes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+import pytest
+import torch
+
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+from factsumm.utils.precision import autocast, quantize
+
+
+class TestPrecision(unittest.TestCase):
+
+    def setUp(self):
+        self.model = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.ReLU(), torch.nn.Linear(8, 2))
+
+    def test_quantize(self):
+        self.assertIs(quantize(self.model, "fp32", "cpu"), self.model)
+        self.assertIs(quantize(self.model, "bf16", "cpu"), self.model)
+
+        quantized = quantize(self.model, "int8", "cpu")
+        self.assertNotIsInstance(quantized[0], torch.nn.Linear)
+        self.assertEqual(quantized(torch.ones(1, 8)).shape, (1, 2))
+
+        with self.assertRaises(ValueError):
+            quantize(self.model, "int8", "cuda")
+
+    def test_autocast(self):
+        with autocast("fp32", "cpu"), torch.no_grad():
+            self.assertEqual(self.model(torch.ones(1, 8)).dtype, torch.float32)
+
+        with autocast("bf16", "cpu"), torch.no_grad():
+            self.assertEqual(self.model(torch.ones(1, 8)).dtype, torch.bfloat16)
+
+
+@pytest.mark.tiny_models
+class TestPrecisionDrift(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        sources, summaries = zip(*make_pairs(2, 1, seed=6))
+        cls.sources, cls.summaries = list(sources), list(summaries)
+
+    def test_report(self):
+        precision = {"qa": "int8", "bert_score": "bf16"}
+        factsumm = FactSumm(**self.models, metrics=["rouge", "bert_score"], precision=precision)
+
+        patch = mock.patch.object(FactSumm, "score_pairs", autospec=True, side_effect=FactSumm.score_pairs)
+        with patch as score_pairs:
+            report = factsumm.precision_drift(self.sources, self.summaries)
+
+        # ROUGE is neither computed nor compared
+        self.assertEqual([call.args[0].metrics for call in score_pairs.call_args_list], [("bert_score",)] * 4)
+
+        self.assertEqual(list(report), ["fp32", "qa", "bert_score", "all"])
+        self.assertEqual(list(report["fp32"]), ["seconds"])
+        self.assertEqual(report["bert_score"]["precision"], {"bert_score": "bf16"})
+        self.assertEqual(report["all"]["precision"], factsumm.precision)
+
+        for name in ("qa", "bert_score", "all"):
+            fields = [key for key in report[name] if key not in ("precision", "seconds")]
+            self.assertEqual(fields, ["bert_score_precision", "bert_score_recall", "bert_score_f1"])
+            self.assertEqual(list(report[name]["bert_score_f1"]), ["mean_abs_diff", "max_abs_diff"])
+
+        # QA is not used by BERTScore, and bf16 changes its scores
+        self.assertEqual(report["qa"]["bert_score_f1"]["max_abs_diff"], 0.0)
+        self.assertGreater(report["bert_score"]["bert_score_f1"]["max_abs_diff"], 0.0)
+
+    def test_zero_drift(self):
+        factsumm = FactSumm(**self.models, metrics=["fact_score", "qa_score"], precision="int8")
+
+        # without quantization, every setting runs in fp32 and scores exactly as fp32
+        with mock.patch("torch.quantization.quantize_dynamic", side_effect=lambda model, *args, **kwargs: model):
+            report = factsumm.precision_drift(self.sources, self.summaries)
+
+        self.assertEqual(list(report), ["fp32", "ner", "rel", "qg", "qa", "bert_score", "all"])
+        for name in list(report)[1:]:
+            for field in ("fact_score", "qa_score"):
+                self.assertEqual(report[name][field], {"mean_abs_diff": 0.0, "max_abs_diff": 0.0})
+
+    def test_rouge_only(self):
+        with self.assertRaises(ValueError):
+            FactSumm(metrics=["rouge"], precision="int8").precision_drift(self.sources, self.summaries)
+
+
+if __name__ == "__main__":
+    unittest.main()
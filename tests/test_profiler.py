@@ -0,0 +1,94 @@
+import threading
+import unittest
+
+import pytest
+
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+from factsumm.utils.profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_disabled(self):
+        with Profiler().stage("ner") as counters:
+            self.assertIsNone(counters)
+
+    def test_hooks(self):
+        calls = []
+        profiler = Profiler([lambda *args: calls.append(args)])
+
+        with profiler.stage("ner") as counters:
+            counters["entities"] += 3
+
+        ((stage, wall, cpu, stage_counters),) = calls
+        self.assertEqual((stage, stage_counters), ("ner", {"entities": 3}))
+        self.assertGreaterEqual(wall, 0.0)
+        self.assertGreaterEqual(cpu, 0.0)
+
+    def test_collect(self):
+        profiler = Profiler()
+
+        def other_thread():
+            with profiler.stage("rel"):
+                pass
+
+        with profiler.collect() as profile:
+            for _ in range(2):
+                with profiler.stage("qa") as counters:
+                    counters["questions_answered"] += 2
+
+            # stages of other threads are not collected
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+
+            with profiler.collect() as nested:
+                with profiler.stage("qg"):
+                    pass
+
+        self.assertIsNone(profiler.current())
+        self.assertEqual(list(nested.stages), ["qg"])
+
+        report = profile.to_dict()
+        self.assertEqual(list(report["stages"]), ["qa"])
+        self.assertEqual(report["stages"]["qa"]["calls"], 2)
+        self.assertEqual(report["counters"], {"questions_answered": 4})
+
+
+@pytest.mark.tiny_models
+class TestProfile(unittest.TestCase):
+
+    def test_rouge(self):
+        calls = []
+        factsumm = FactSumm(metrics=["rouge"], profile=True)
+        factsumm.add_hook(lambda stage, wall, cpu, counters: calls.append(stage))
+
+        (scores,) = factsumm.score_pairs("The cat sat on the mat. It was happy.", "The cat sat.")
+        self.assertEqual(list(scores["profile"]["stages"]), ["segmentation", "rouge"])
+        self.assertEqual(calls, ["segmentation", "rouge"])
+
+        # profiling does not change scores
+        (expected,) = FactSumm(metrics=["rouge"]).score_pairs("The cat sat on the mat. It was happy.", "The cat sat.")
+        self.assertNotIn("profile", expected)
+        self.assertEqual(scores["rouge"], expected["rouge"])
+
+    def test_counters(self):
+        sources, summaries = zip(*make_pairs(2, 2, seed=1))
+
+        for scores in FactSumm(**self.models, profile=True, batch_size=32).score_pairs(list(sources), list(summaries)):
+            stages = scores["profile"]["stages"]
+            counters = scores["profile"]["counters"]
+
+            self.assertEqual(
+                set(stages),
+                {"segmentation", "ner", "build_perm", "rel", "qg", "qa", "rouge", "bert_score"},
+            )
+            self.assertEqual(counters["permutations"], counters["pruned_pairs"] + counters["rel_pairs"])
+            self.assertEqual(counters["rel_forwards"], -(-counters["rel_pairs"] // 32))
+            # each question is answered on both the source and the summary
+            self.assertEqual(counters["questions_answered"], 2 * counters["questions"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import pytest
+
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+from factsumm.utils.utils import qags_interval
+
+
+class TestQagsInterval(unittest.TestCase):
+
+    def test_exact(self):
+        self.assertEqual(qags_interval([], 0), (0.0, 0.0, 0.0))
+        self.assertEqual(qags_interval([0.5, 1.0], 2), (0.75, 0.75, 0.75))
+
+    def test_unknown(self):
+        self.assertEqual(qags_interval([], 3), (0.0, 0.0, 1.0))
+        self.assertEqual(qags_interval([0.4], 3), (0.4, 0.0, 1.0))
+
+    def test_interval(self):
+        estimate, low, high = qags_interval([0.4, 0.6, 0.8], 10, z=2.0)
+        # sample variance 0.04, finite population correction 7 / 9
+        margin = 2.0 * (0.04 / 3 * 7 / 9)**0.5
+
+        self.assertAlmostEqual(estimate, 0.6)
+        self.assertAlmostEqual(low, 0.6 - margin)
+        self.assertAlmostEqual(high, 0.6 + margin)
+
+        # the interval narrows as more of the questions are asked, and is clipped to [0, 1]
+        _, wider_low, _ = qags_interval([0.4, 0.6, 0.8], 100, z=2.0)
+        self.assertLess(wider_low, low)
+        self.assertEqual(qags_interval([0.0, 1.0], 100, z=2.0)[1:], (0.0, 1.0))
+
+
+@pytest.mark.tiny_models
+class TestEstimateQas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pairs = make_pairs(3, 3, seed=1)
+
+    def test_question_budget(self):
+        # a negative tolerance is never met, so questioning only stops at the budget
+        factsumm = FactSumm(**self.models, question_budget=3, question_round_size=2, qa_tolerance=-1.0)
+
+        for source, summary in self.pairs:
+            estimate = factsumm.estimate_qas(source, summary)
+            self.assertEqual(estimate["qa_questions"], 3)
+            self.assertLessEqual(estimate["qa_score_low"], estimate["qa_score"])
+            self.assertLessEqual(estimate["qa_score"], estimate["qa_score_high"])
+
+    def test_every_question(self):
+        factsumm = FactSumm(**self.models, qa_tolerance=-1.0)
+
+        for source, summary in self.pairs:
+            estimate = factsumm.estimate_qas(source, summary)
+            self.assertEqual(estimate["qa_score"], factsumm.extract_qas(source, summary))
+            self.assertEqual(estimate["qa_score_low"], estimate["qa_score_high"])
+
+    def test_invalid_round_size(self):
+        # rounds without any question would never end
+        for question_round_size in (0, -1):
+            with self.assertRaises(ValueError):
+                FactSumm(question_budget=3, question_round_size=question_round_size)
+
+    def test_batch(self):
+        # pairs questioned in the same rounds get the estimates they get alone
+        factsumm = FactSumm(**self.models, question_budget=4, question_round_size=1)
+        expected = [factsumm.estimate_qas(source, summary) for source, summary in self.pairs]
+
+        factsumm = FactSumm(**self.models, question_budget=4, question_round_size=1)
+        documents = [(factsumm._document(source), factsumm._document(summary)) for source, summary in self.pairs]
+        self.assertEqual(factsumm._estimate_qas_batch(documents), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
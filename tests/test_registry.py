@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from factsumm.utils import registry
+
+
+class Holder:
+    pass
+
+
+class TestRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        for key in registry.loaded():
+            if key[1] == "test-model":
+                registry._models.pop(key)
+                registry._load_times.pop(key)
+                registry._holders.pop(key, None)
+
+    def load(self, holder, task="ner", device="cpu"):
+        with registry.held_by(holder):
+            return registry.load(task, "test-model", device, object)
+
+    def test_shared_model_is_kept_for_other_holders(self):
+        first, second = Holder(), Holder()
+        model = self.load(first)
+        self.assertIs(self.load(second), model)
+
+        registry.release(first, "ner")
+        self.assertIn(("ner", "test-model", "cpu", "fp32"), registry.loaded())
+        self.assertIs(self.load(second), model)
+
+        registry.release(second, "ner")
+        self.assertNotIn(("ner", "test-model", "cpu", "fp32"), registry.loaded())
+
+    def test_release_by_task(self):
+        holder, other = Holder(), Holder()
+        self.load(holder, "ner")
+        self.load(holder, "qa")
+        self.load(other, "qa", "cuda")
+
+        registry.release(holder, "ner")
+        registry.release(other, "ner")
+        keys = [key for key in registry.loaded() if key[1] == "test-model"]
+        self.assertEqual(sorted(keys), [("qa", "test-model", "cpu", "fp32"), ("qa", "test-model", "cuda", "fp32")])
+
+        registry.release(holder)
+        keys = [key for key in registry.loaded() if key[1] == "test-model"]
+        self.assertEqual(keys, [("qa", "test-model", "cuda", "fp32")])
+
+    def test_single_load_per_model(self):
+        calls = []
+
+        def loader():
+            calls.append(None)
+            return object()
+
+        holders = [Holder() for _ in range(8)]
+
+        def load(holder):
+            with registry.held_by(holder):
+                registry.load("qg", "test-model", "cpu", loader)
+
+        threads = [threading.Thread(target=load, args=(holder,)) for holder in holders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(registry._holders[("qg", "test-model", "cpu", "fp32")]), len(holders))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import math
+import unittest
+
+from factsumm import FactSumm
+from factsumm.utils.document import Document
+from factsumm.utils.retrieval import LineIndex, tokenize
+
+
+class TestLineIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = [
+            "Lionel Messi was born in Rosario, Argentina.",
+            "He joined Barcelona at the age of thirteen.",
+            "Messi won the Ballon d'Or with Barcelona in 2009.",
+            "The weather in Rosario is mild.",
+            "Barcelona is a city in Spain.",
+        ]
+        self.index = LineIndex(self.lines)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Messi won the Ballon d'Or."), ["messi", "won", "the", "ballon", "d", "or"])
+
+    def test_scores(self):
+        scores = self.index.scores("Where was Messi born?")
+
+        # only lines sharing a term with the query are scored
+        self.assertGreater(scores[0], scores[2])
+        self.assertGreater(scores[2], 0.0)
+        self.assertEqual([scores[1], scores[3], scores[4]], [0.0, 0.0, 0.0])
+
+        # each query term adds its BM25 weight, given by its line frequency and the line length
+        idf = math.log(1 + (5 - 3 + 0.5) / (3 + 0.5))
+        norm = 1.5 * (1 - 0.75 + 0.75 * 6 / (sum(self.index.lengths) / 5))
+        self.assertAlmostEqual(
+            self.index.scores("Spain Barcelona")[4] - self.index.scores("Spain")[4],
+            idf * 2.5 / (1 + norm),
+        )
+
+    def test_search(self):
+        # retrieved lines are those of the highest scores, in document order
+        self.assertEqual(self.index.search("Messi Barcelona Ballon", 2), [0, 2])
+        self.assertEqual(self.index.search("Barcelona in Spain", 2), [2, 4])
+        self.assertEqual(self.index.search("Rosario", 2), [0, 3])
+
+        # ties of lines sharing no term are broken by document order
+        self.assertEqual(self.index.search("unrelated question", 2), [0, 1])
+        self.assertEqual(self.index.search("Rosario", 10), [0, 1, 2, 3, 4])
+
+    def test_empty(self):
+        index = LineIndex([])
+        self.assertEqual(index.scores("Messi"), [])
+        self.assertEqual(index.search("Messi", 3), [])
+
+
+class TestRetrieveLines(unittest.TestCase):
+
+    def setUp(self):
+        self.source = Document(
+            "Lionel Messi was born in Rosario, Argentina. He joined Barcelona at the age of thirteen. "
+            "Messi won the Ballon d'Or with Barcelona in 2009. The weather in Rosario is mild."
+        )
+
+    def test_retrieve_lines(self):
+        factsumm = FactSumm(retrieval_top_k=1)
+        self.assertEqual(factsumm._retrieve_lines(self.source, "Where was Messi born?"), [
+            "Lionel Messi was born in Rosario, Argentina.",
+        ])
+
+        # the source is indexed once and reused by every query
+        index = self.source.artifacts["retrieval"]
+        factsumm._retrieve_lines(self.source, "When did Messi win the Ballon d'Or?")
+        self.assertIs(self.source.artifacts["retrieval"], index)
+
+    def test_bert_source_lines(self):
+        lines = FactSumm()._lines(self.source)
+        self.assertEqual(FactSumm()._bert_source_lines(self.source, ["Messi was born in Rosario."]), [lines])
+
+        # each summary line is matched against the lines retrieved for it, in document order
+        retrieved = FactSumm(retrieval_top_k=2)._bert_source_lines(
+            self.source,
+            ["Messi won the Ballon d'Or in 2009.", "Messi was born in Rosario."],
+        )
+        self.assertEqual(retrieved, [[lines[0], lines[2]], [lines[0], lines[3]]])
+        self.assertEqual(FactSumm(retrieval_top_k=2)._bert_source_lines(self.source, []), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import unittest
+
+from sumeval.metrics.rouge import RougeCalculator
+
+from factsumm.utils.rouge import RougeTable, lcs
+
+
+class TestRouge(unittest.TestCase):
+
+    def setUp(self):
+        self.rouge = RougeCalculator(stopwords=True, lang="en")
+
+        self.sources = [
+            [
+                "Lionel Andrés Messi (born 24 June 1987) is an Argentine professional footballer who plays as a forward and captains both Spanish club Barcelona and the Argentina national team.",
+                "Often considered as the best player in the world and widely regarded as one of the greatest players of all time, Messi has won a record six Ballon d'Or awards, a record six European Golden Shoes, and in 2020 was named to the Ballon d'Or Dream Team.",
+            ],
+            [
+                "The cat sat on the mat.",
+                "The dog sat on the log, and the cat sat on the dog.",
+                "Nothing happened on the mat after that.",
+            ],
+            ["The the the of of and."],
+            [],
+        ]
+        self.summaries = [
+            "Lionel Andrés Messi (born 24 Aug 1997) is an Spanish professional footballer who plays as a forward and captains both Spanish club Barcelona and the Spanish national team.",
+            "The cat sat on the dog, and the dog sat on the mat.",
+            "Messi won six Ballon d'Or awards.",
+            "The of and.",
+            "",
+        ]
+
+    def test_same_scores_as_sumeval(self):
+        for lines in self.sources:
+            table = RougeTable([self.rouge.tokenize(line, True) for line in lines])
+
+            for summary in self.summaries:
+                expected = (
+                    self.rouge.rouge_n(summary, lines, 1),
+                    self.rouge.rouge_n(summary, lines, 2),
+                    self.rouge.rouge_l(summary, lines),
+                )
+                actual = table.score(self.rouge.tokenize(summary))
+
+                for expected_score, actual_score in zip(expected, actual):
+                    self.assertAlmostEqual(expected_score, actual_score, places=12)
+
+    def test_lcs(self):
+        generator = random.Random(0)
+
+        for _ in range(200):
+            a = [generator.choice("abcde") for _ in range(generator.randint(0, 80))]
+            b = [generator.choice("abcde") for _ in range(generator.randint(0, 80))]
+
+            masks = {}
+            for position, token in enumerate(b):
+                masks[token] = masks.get(token, 0) | (1 << position)
+
+            self.assertEqual(self.rouge.lcs(a, b), lcs(masks, len(b), a))
+
+
+if __name__ == "__main__":
+    unittest.main()
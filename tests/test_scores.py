@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+from factsumm import FactSumm
+from factsumm.utils.utils import PairScores, metric_fields
+
+
+class TestPairScores(unittest.TestCase):
+
+    def test_to_dict(self):
+        self.assertEqual(PairScores().to_dict(), {})
+        self.assertEqual(
+            PairScores(fact_score=0.5, rouge_1=0.3, rouge_2=0.2, rouge_l=0.1).to_dict(),
+            {"fact_score": 0.5, "rouge": {"rouge-1": 0.3, "rouge-2": 0.2, "rouge-l": 0.1}},
+        )
+        self.assertEqual(
+            PairScores(qa_score=0.5, qa_score_low=0.25, qa_score_high=0.75, qa_questions=4.0).to_dict(),
+            {"qa_score": 0.5, "qa_interval": (0.25, 0.75), "qa_questions": 4.0},
+        )
+
+    def test_metric_fields(self):
+        self.assertEqual(metric_fields(["fact_score", "rouge"]), ("fact_score", "rouge_1", "rouge_2", "rouge_l"))
+        self.assertEqual(
+            metric_fields(["qa_score"], question_budget=True),
+            ("qa_score", "qa_score_low", "qa_score_high", "qa_questions"),
+        )
+
+
+class TestScorePairs(unittest.TestCase):
+
+    def setUp(self):
+        # ROUGE alone runs without any model
+        self.factsumm = FactSumm(metrics=["rouge"])
+        self.sources = [
+            "The cat sat on the mat. It was happy.",
+            "Messi plays for Barcelona. He was born in Rosario.",
+            "The cat sat on the mat. It was happy.",
+        ]
+        self.summaries = ["The cat sat on the mat.", "Messi was born in Barcelona.", "The dog was happy."]
+
+    def test_iter_scores(self):
+        results = self.factsumm.iter_scores(zip(self.sources, self.summaries))
+        self.assertNotIsInstance(results, list)
+
+        scores = list(results)
+        self.assertEqual(len(scores), len(self.sources))
+        self.assertTrue(all(isinstance(pair_scores, PairScores) for pair_scores in scores))
+        self.assertEqual(
+            [pair_scores.to_dict() for pair_scores in scores],
+            self.factsumm.score_pairs(self.sources, self.summaries),
+        )
+        self.assertIsNone(scores[0].fact_score)
+
+    def test_columnar(self):
+        keys = {"rouge_1": "rouge-1", "rouge_2": "rouge-2", "rouge_l": "rouge-l"}
+        rows = self.factsumm.score_pairs(self.sources, self.summaries)
+        columns = self.factsumm.score_pairs(self.sources, self.summaries, columnar=True)
+
+        self.assertEqual(list(columns), list(keys))
+        for field, key in keys.items():
+            self.assertEqual(columns[field].dtype, np.float64)
+            self.assertEqual(columns[field].tolist(), [row["rouge"][key] for row in rows])
+        self.assertGreater(columns["rouge_1"][0], 0.0)
+
+        # averages of `__call__` are those of the columns
+        averages = self.factsumm(self.sources, self.summaries)
+        self.assertEqual(averages["rouge"], {key: float(columns[field].mean()) for field, key in keys.items()})
+
+    def test_empty(self):
+        columns = self.factsumm.score_pairs([], [], columnar=True)
+        self.assertEqual({field: len(column) for field, column in columns.items()},
+                         {"rouge_1": 0, "rouge_2": 0, "rouge_l": 0})
+        self.assertEqual(self.factsumm.score_pairs([], []), [])
+
+        with self.assertRaises(ValueError):
+            self.factsumm.score_pairs(self.sources, self.summaries[:1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import threading
+import unittest
+
+from factsumm import FactSumm
+from factsumm.server import ScoringServer
+
+SOURCE = "Lionel Messi plays for Barcelona. He was born in Rosario."
+SUMMARY = "Lionel Messi plays for Barcelona."
+
+
+class TestScoringServer(unittest.TestCase):
+
+    def test_abandoned_request_of_failed_stage(self):
+        server = ScoringServer(FactSumm(metrics=["rouge"]), max_wait_ms=1)
+
+        started = threading.Event()
+        resume = threading.Event()
+        name, func = server.stages[0]
+        calls = []
+
+        def fail_once(pairs):
+            calls.append(len(pairs))
+            if len(calls) == 1:
+                started.set()
+                resume.wait(10)
+                raise RuntimeError("stage failed")
+            return func(pairs)
+
+        server.stages[0] = (name, fail_once)
+
+        async def run():
+            await server.start()
+            loop = asyncio.get_running_loop()
+
+            try:
+                # the client disconnects while its pair is failing
+                request = asyncio.create_task(server.score(SOURCE, SUMMARY))
+                await loop.run_in_executor(None, started.wait, 10)
+                request.cancel()
+                resume.set()
+
+                with self.assertRaises(asyncio.CancelledError):
+                    await request
+
+                # the stage keeps serving later requests
+                return await asyncio.wait_for(server.score(SOURCE, SUMMARY), 10)
+            finally:
+                await server.stop()
+
+        scores = asyncio.run(run())
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(scores.rouge_1, FactSumm(metrics=["rouge"]).calculate_rouge(SOURCE, SUMMARY)[0])
+
+    def test_invalid_budget(self):
+        server = ScoringServer(FactSumm(metrics=["rouge"]))
+
+        for budget_ms in ("fast", [100], True, 0, -5):
+            body = json.dumps({"source": SOURCE, "summary": SUMMARY, "budget_ms": budget_ms}).encode("utf-8")
+            status, response = asyncio.run(server._handle_request("POST", "/score", body))
+            self.assertEqual(status, 400)
+            self.assertIn("budget_ms", response["error"])
+
+    def test_low_memory_stages_share_a_thread(self):
+        server = ScoringServer(FactSumm(low_memory=True))
+        self.assertEqual(len(set(server.executors)), 1)
+
+        server = ScoringServer(FactSumm())
+        self.assertEqual(len(set(server.executors)), len(server.stages))
+
+
+if __name__ == "__main__":
+    unittest.main()
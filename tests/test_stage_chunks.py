@@ -0,0 +1,53 @@
+import unittest
+from collections import Counter
+
+import pytest
+
+from benchmarks.run import make_pairs
+from factsumm import FactSumm
+
+
+@pytest.mark.tiny_models
+class TestStageChunks(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pairs = make_pairs(3, 1, seed=2)
+        # consecutive and distant pairs share sources, across chunk boundaries
+        cls.pairs.insert(2, (cls.pairs[1][0], cls.pairs[0][1]))
+        cls.pairs.append((cls.pairs[0][0], cls.pairs[2][1]))
+
+        sources, summaries = zip(*cls.pairs)
+        cls.sources, cls.summaries = list(sources), list(summaries)
+        cls.expected = FactSumm(**cls.models).score_pairs(cls.sources, cls.summaries)
+
+    def score(self, factsumm: FactSumm) -> Counter:
+        calls = Counter()
+        factsumm.add_hook(lambda stage, wall, cpu, counters: calls.update([stage]))
+        self.assertEqual(factsumm.score_pairs(self.sources, self.summaries), self.expected)
+        return calls
+
+    def test_same_scores(self):
+        pair_calls = self.score(FactSumm(**self.models))
+        chunk_calls = self.score(FactSumm(**self.models, stage_chunk_size=3))
+
+        # each stage runs once per chunk instead of once per pair
+        self.assertLess(chunk_calls["rel"], pair_calls["rel"])
+        self.assertLess(chunk_calls["qg"], pair_calls["qg"])
+
+    def test_chunk_sizes(self):
+        for stage_chunk_size in (1, len(self.pairs) + 1):
+            with self.subTest(stage_chunk_size=stage_chunk_size):
+                self.score(FactSumm(**self.models, stage_chunk_size=stage_chunk_size))
+
+    def test_iter_scores(self):
+        results = FactSumm(**self.models, stage_chunk_size=2).iter_scores(iter(self.pairs))
+        self.assertEqual([scores.to_dict() for scores in results], self.expected)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            FactSumm(stage_chunk_size=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from factsumm.utils.store import ArtifactStore, SentenceCache
+
+
+class TestArtifactStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "artifacts.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        store = ArtifactStore(self.path)
+        store.put_many("ner", {"line": [{"word": "Messi", "entity": "PER"}], ("line", (0, 5), (9, 14)): []})
+        self.assertEqual(
+            store.get_many("ner", ["line", ("line", (0, 5), (9, 14)), "other"]),
+            {"line": [{"word": "Messi", "entity": "PER"}], ("line", (0, 5), (9, 14)): []},
+        )
+
+        # namespaces are independent, and artifacts outlive the connection
+        self.assertEqual(store.get_many("qa", ["line"]), {})
+        store.close()
+        store = ArtifactStore(self.path)
+        self.assertEqual(store.get_many("ner", ["line"]), {"line": [{"word": "Messi", "entity": "PER"}]})
+
+    def test_stats(self):
+        store = ArtifactStore(self.path)
+        store.put_many("ner", {"a": 1, "b": 2})
+        store.get_many("ner", ["a", "b", "c"])
+        store.get_many("qa", ["a"])
+
+        stats = store.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["namespaces"]["ner"], {"hits": 2, "misses": 1, "hit_rate": 2 / 3})
+        self.assertEqual(stats["namespaces"]["qa"], {"hits": 0, "misses": 1, "hit_rate": 0.0})
+
+    def test_evicts_least_recently_used(self):
+        store = ArtifactStore(self.path, max_size_mb=0.1)
+        value = "x" * 10_000
+
+        for i in range(8):
+            store.put_many("qg", {i: value})
+        store.get_many("qg", [0])
+        for i in range(8, 12):
+            store.put_many("qg", {i: value})
+
+        found = store.get_many("qg", list(range(12)))
+        self.assertLessEqual(store.stats()["size_mb"], 0.1)
+        self.assertIn(0, found)
+        self.assertIn(11, found)
+        self.assertNotIn(1, found)
+
+
+class TestSentenceCache(unittest.TestCase):
+
+    def test_lru(self):
+        cache = SentenceCache(max_entries=3)
+        cache.put_many("ner", {"a": 1, "b": 2, "c": 3})
+        cache.get_many("ner", ["a"])
+        cache.put_many("ner", {"d": 4})
+        cache.put_many("qa", {"b": 5})
+
+        self.assertEqual(cache.get_many("ner", ["a", "b", "c", "d"]), {"a": 1, "c": 3, "d": 4})
+        self.assertEqual(cache.get_many("qa", ["b", "b"]), {"b": 5})
+
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 4)
+        self.assertEqual(stats["namespaces"]["ner"], {"entries": 3, "hits": 4, "misses": 1, "hit_rate": 0.8})
+        self.assertEqual(stats["namespaces"]["qa"], {"entries": 1, "hits": 1, "misses": 0, "hit_rate": 1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()